@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from shop.admin_utils import ExportAdminMixin, LargeTableAdminMixin, ExactSearchAdminMixin
+from .exports import CustomerExport
 from .models import User, UserFavorite, SupportTicket, SupportMessage
 
 
@@ -7,16 +9,21 @@ class SupportMessageInline(admin.TabularInline):
     model = SupportMessage
     extra = 0
     readonly_fields = ['created_at']
+    raw_id_fields = ['user']
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ExportAdminMixin, LargeTableAdminMixin, ExactSearchAdminMixin, BaseUserAdmin):
     list_display = [
         'username', 'email', 'first_name', 'last_name',
         'phone', 'city', 'is_staff', 'email_verified', 'created_at'
     ]
     list_filter = ['is_staff', 'is_superuser', 'email_verified', 'phone_verified', 'newsletter_subscribed']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'phone']
+    exact_search_fields = ['email', 'phone']
+    prefix_search_fields = ['username']
+    actions = ['export']
+    export_class = CustomerExport
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Дополнительная информация', {
             'fields': ('phone', 'avatar', 'birth_date', 'city', 'address')
@@ -28,27 +35,33 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(UserFavorite)
-class UserFavoriteAdmin(admin.ModelAdmin):
+class UserFavoriteAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['user', 'product', 'added_at']
     list_filter = ['added_at']
+    list_select_related = ['user', 'product__brand']
     search_fields = ['user__username', 'product__name']
+    raw_id_fields = ['user', 'product']
 
 
 @admin.register(SupportTicket)
-class SupportTicketAdmin(admin.ModelAdmin):
+class SupportTicketAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'ticket_number', 'subject', 'category', 'user',
         'status', 'priority', 'created_at', 'updated_at'
     ]
     list_filter = ['status', 'priority', 'category', 'created_at']
+    list_select_related = ['user']
     search_fields = ['ticket_number', 'subject', 'message', 'email', 'phone']
     list_editable = ['status', 'priority']
+    raw_id_fields = ['user']
     inlines = [SupportMessageInline]
     readonly_fields = ['ticket_number', 'created_at', 'updated_at']
 
 
 @admin.register(SupportMessage)
-class SupportMessageAdmin(admin.ModelAdmin):
+class SupportMessageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['ticket', 'user', 'is_staff', 'created_at']
     list_filter = ['is_staff', 'created_at']
+    list_select_related = ['ticket', 'user']
+    raw_id_fields = ['ticket', 'user']
     search_fields = ['ticket__ticket_number', 'message']
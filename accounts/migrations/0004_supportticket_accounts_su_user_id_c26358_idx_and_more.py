@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_accounts_us_email_74c8d6_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['user', '-created_at'], name='accounts_su_user_id_c26358_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['-created_at'], name='accounts_su_created_9356ed_idx'),
+        ),
+    ]
@@ -28,6 +28,10 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(fields=['email']),
+            models.Index(fields=['phone']),
+        ]
 
     def __str__(self):
         return self.get_full_name() or self.username
@@ -110,6 +114,10 @@ class SupportTicket(models.Model):
         verbose_name = 'Обращение в поддержку'
         verbose_name_plural = 'Обращения в поддержку'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
 
     def __str__(self):
         return f"#{self.ticket_number} - {self.subject}"
@@ -70,9 +70,11 @@ class ProfileView(LoginRequiredMixin, UpdateView):
 @login_required
 def favorites_view(request):
     """Избранные товары"""
-    favorites = UserFavorite.objects.filter(
-        user=request.user
-    ).select_related('product__brand').prefetch_related('product__images')
+    from shop.cards import product_cards
+    from shop.models import Product
+    favorites = product_cards(
+        Product.objects.filter(favorited_by__user=request.user).order_by('-favorited_by__id')
+    )
     return render(request, 'accounts/favorites.html', {'favorites': favorites})
 
 
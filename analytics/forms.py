@@ -0,0 +1,24 @@
+from django import forms
+
+from . import reports
+
+MAX_DAYS = 3660
+
+
+class PeriodForm(forms.Form):
+    date_from = forms.DateField(label='С', widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label='По', widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get('date_from') and cleaned.get('date_to') and cleaned['date_from'] > cleaned['date_to']:
+            raise forms.ValidationError('Начало периода позже конца')
+        if cleaned.get('date_from') and cleaned.get('date_to') and (cleaned['date_to'] - cleaned['date_from']).days > MAX_DAYS:
+            raise forms.ValidationError('Период не длиннее десяти лет')
+        return cleaned
+
+    def get_period(self):
+        """(с, по): из формы или первый из reports.PRESETS"""
+        if self.is_bound and self.is_valid():
+            return self.cleaned_data['date_from'], self.cleaned_data['date_to']
+        return reports.presets()[0][1:]
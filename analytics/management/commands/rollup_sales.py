@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics import reports, rollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает итоги продаж за дни, в которых менялись заказы. '
+        'Для cron; задача analytics.rollup_sales делает то же в очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересчитать все дни')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days = rollup.run(full=options['full'])
+        if days:
+            reports.warm()
+        self.stdout.write(f'Пересчитано дней: {days} за {time.perf_counter() - started:.1f} с')
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watermark', models.DateTimeField(blank=True, null=True, verbose_name='Учтены изменения до')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний пересчёт')),
+                ('days', models.PositiveIntegerField(default=0, verbose_name='Дней пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Состояние итогов',
+                'verbose_name_plural': 'Состояние итогов',
+            },
+        ),
+        migrations.CreateModel(
+            name='StaleDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='День')),
+            ],
+            options={
+                'verbose_name': 'День к пересчёту',
+                'verbose_name_plural': 'Дни к пересчёту',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('day', 'День'), ('month', 'Месяц'), ('year', 'Год')], max_length=10, verbose_name='Период')),
+                ('period', models.DateField(verbose_name='Начало периода')),
+                ('dimension', models.CharField(choices=[('total', 'Всего'), ('product', 'Товар'), ('brand', 'Бренд'), ('category', 'Категория'), ('promo', 'Промокод')], max_length=20, verbose_name='Разрез')),
+                ('key', models.CharField(blank=True, max_length=100, verbose_name='Ключ')),
+                ('label', models.CharField(blank=True, max_length=255, verbose_name='Название')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('cancelled', models.PositiveIntegerField(default=0, verbose_name='Отменено')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Штук')),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Выручка')),
+                ('discount', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Скидка')),
+            ],
+            options={
+                'verbose_name': 'Итог продаж',
+                'verbose_name_plural': 'Итоги продаж',
+                'constraints': [models.UniqueConstraint(fields=('grain', 'dimension', 'period', 'key'), name='salesrollup_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import models
+
+
+class SalesRollup(models.Model):
+    """
+    Продажи за день, месяц или год по одному значению разреза
+    (товар, бренд, категория, промокод или магазин целиком).
+    Выручка и скидка — по неотменённым заказам, заказы — все.
+    """
+    GRAIN_CHOICES = [
+        ('day', 'День'),
+        ('month', 'Месяц'),
+        ('year', 'Год'),
+    ]
+    DIMENSION_CHOICES = [
+        ('total', 'Всего'),
+        ('product', 'Товар'),
+        ('brand', 'Бренд'),
+        ('category', 'Категория'),
+        ('promo', 'Промокод'),
+    ]
+
+    grain = models.CharField('Период', max_length=10, choices=GRAIN_CHOICES)
+    period = models.DateField('Начало периода')
+    dimension = models.CharField('Разрез', max_length=20, choices=DIMENSION_CHOICES)
+    # Артикул, название бренда, id категории или промокод; у total пусто
+    key = models.CharField('Ключ', max_length=100, blank=True)
+    label = models.CharField('Название', max_length=255, blank=True)
+    orders = models.PositiveIntegerField('Заказов', default=0)
+    cancelled = models.PositiveIntegerField('Отменено', default=0)
+    units = models.PositiveIntegerField('Штук', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=14, decimal_places=0, default=0)
+    discount = models.DecimalField('Скидка', max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        verbose_name = 'Итог продаж'
+        verbose_name_plural = 'Итоги продаж'
+        constraints = [
+            # Он же индекс отчёта: разрез за диапазон периодов
+            models.UniqueConstraint(fields=['grain', 'dimension', 'period', 'key'], name='salesrollup_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_dimension_display()} {self.label or self.key} за {self.period}'
+
+
+class RollupState(models.Model):
+    """Одна строка: до какого момента изменения заказов учтены в итогах"""
+    watermark = models.DateTimeField('Учтены изменения до', null=True, blank=True)
+    finished_at = models.DateTimeField('Последний пересчёт', null=True, blank=True)
+    days = models.PositiveIntegerField('Дней пересчитано', default=0)
+
+    class Meta:
+        verbose_name = 'Состояние итогов'
+        verbose_name_plural = 'Состояние итогов'
+
+    def __str__(self):
+        return f'Итоги на {self.watermark}'
+
+
+class StaleDay(models.Model):
+    """День, который нужно пересчитать: удалённый заказ не оставляет updated_at"""
+    day = models.DateField('День', unique=True)
+
+    class Meta:
+        verbose_name = 'День к пересчёту'
+        verbose_name_plural = 'Дни к пересчёту'
+
+    def __str__(self):
+        return str(self.day)
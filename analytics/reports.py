@@ -0,0 +1,137 @@
+"""
+Отчёты дашборда — только из итогов SalesRollup.
+
+Диапазон дат раскладывается на полные годы, полные месяцы и дни по краям
+(split), поэтому за три года читается пара годовых строк и до двух
+десятков месячных на значение разреза, а не тысяча дневных. Готовый отчёт лежит в двухуровневом кеше
+(scootermall/caching.py) до следующего пересчёта итогов; отчёты быстрых
+периодов (PRESETS) пересчёт кладёт туда сразу (warm).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from scootermall import caching
+
+from .models import RollupState, SalesRollup
+
+# Разрезы рейтингов дашборда
+DIMENSIONS = [(code, label) for code, label in SalesRollup.DIMENSION_CHOICES if code != 'total']
+
+# Дольше — график по месяцам, короче — по дням
+DAILY_SERIES_DAYS = 92
+
+# Быстрый выбор периода: дней до сегодняшнего включительно; первый — по умолчанию
+PRESETS = [(30, '30 дней'), (90, '90 дней'), (365, 'Год'), (1095, '3 года')]
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def split(date_from, date_to, years=True):
+    """
+    [(grain, начало, конец не включая)], покрывающие [date_from, date_to]
+    ровно один раз: дни до начала месяца, месяцы до начала года, годы и обратно
+    """
+    end = date_to + timedelta(days=1)
+    ranges = []
+    current = date_from
+    while current < end:
+        if years and current.month == 1 and current.day == 1 and current.replace(year=current.year + 1) <= end:
+            grain, following = 'year', current.replace(year=current.year + 1)
+        elif current.day == 1 and _next_month(current) <= end:
+            grain, following = 'month', _next_month(current)
+        else:
+            grain, following = 'day', current + timedelta(days=1)
+        if ranges and ranges[-1][0] == grain and ranges[-1][2] == current:
+            ranges[-1][2] = following
+        else:
+            ranges.append([grain, current, following])
+        current = following
+    return [tuple(item) for item in ranges]
+
+
+def periods(date_from, date_to, dimension, years=True):
+    """Q строк разреза за [date_from, date_to]: каждый день учтён ровно один раз"""
+    q = Q(pk__in=[])
+    for grain, start, end in split(date_from, date_to, years):
+        q |= Q(grain=grain, dimension=dimension, period__gte=start, period__lt=end)
+    return q
+
+
+def _with_rates(row):
+    row['net'] = row['revenue'] - row['discount']
+    row['cancel_rate'] = row['cancelled'] * 100 / row['orders'] if row['orders'] else 0
+    return row
+
+
+def _sums():
+    return {
+        'orders': Sum('orders'), 'cancelled': Sum('cancelled'), 'units': Sum('units'),
+        'revenue': Sum('revenue'), 'discount': Sum('discount'),
+    }
+
+
+def top(dimension, date_from, date_to, limit):
+    rows = (
+        SalesRollup.objects.filter(periods(date_from, date_to, dimension))
+        .values('key').annotate(name=Max('label'), net=Sum('revenue') - Sum('discount'), **_sums())
+        .order_by('-net', 'key')[:limit]
+    )
+    return [_with_rates(row) for row in rows]
+
+
+def series(date_from, date_to):
+    """[(начало периода, выручка за вычетом скидок, высота столбца в %)] по дням или месяцам"""
+    daily = (date_to - date_from).days < DAILY_SERIES_DAYS
+    buckets = {}
+    # Годовые строки график не разложат по месяцам
+    rows = SalesRollup.objects.filter(periods(date_from, date_to, 'total', years=False)).values_list('period', 'revenue', 'discount')
+    for period, revenue, discount in rows:
+        bucket = period if daily else period.replace(day=1)
+        buckets[bucket] = buckets.get(bucket, 0) + revenue - discount
+    result = []
+    bucket = date_from if daily else date_from.replace(day=1)
+    while bucket <= date_to:
+        result.append((bucket, buckets.get(bucket, 0)))
+        bucket = bucket + timedelta(days=1) if daily else _next_month(bucket)
+    peak = max((value for _, value in result), default=0) or 1
+    return [(bucket, value, value * 100 / peak) for bucket, value in result], daily
+
+
+def _compute(date_from, date_to, limit):
+    totals = SalesRollup.objects.filter(periods(date_from, date_to, 'total')).aggregate(**_sums())
+    totals = _with_rates({name: value or 0 for name, value in totals.items()})
+    totals['average'] = totals['net'] / (totals['orders'] - totals['cancelled']) if totals['orders'] > totals['cancelled'] else 0
+    points, daily = series(date_from, date_to)
+    return {
+        'totals': totals,
+        'series': points,
+        'daily': daily,
+        'tops': [(code, label, top(code, date_from, date_to, limit)) for code, label in DIMENSIONS],
+        'state': RollupState.objects.filter(pk=1).first(),
+    }
+
+
+def summary(date_from, date_to, limit=None):
+    limit = limit or settings.ANALYTICS_TOP_SIZE
+    return caching.get_or_compute(
+        f'analytics:summary:{date_from:%Y%m%d}:{date_to:%Y%m%d}:{limit}',
+        lambda: _compute(date_from, date_to, limit),
+        namespaces=['analytics'],
+    )
+
+
+def presets():
+    """[(название, с, по)] для PRESETS"""
+    today = timezone.localdate()
+    return [(label, today - timedelta(days=days - 1), today) for days, label in PRESETS]
+
+
+def warm():
+    """Отчёты быстрых периодов в кеш сразу после пересчёта итогов"""
+    for _, date_from, date_to in presets():
+        summary(date_from, date_to)
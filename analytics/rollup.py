@@ -0,0 +1,198 @@
+"""
+Итоги продаж по дням, месяцам и годам (SalesRollup).
+
+Пересчёт инкрементальный: RollupState.watermark помнит момент начала
+прошлого пересчёта, и пересчитываются только дни (по created_at в часовом
+поясе магазина), в которых с тех пор менялись заказы (updated_at), плюс
+дни удалённых заказов (StaleDay). День считается целиком из его заказов
+и позиций — два запроса по индексам — и заменяет свои строки в короткой
+транзакции; месяцы пересчитанных дней затем собираются из дневных строк,
+годы — из месячных.
+Долгих агрегирующих запросов по Order и OrderItem нет, поэтому пересчёт
+не держит блокировку записи дольше одного дня.
+
+Товар, бренд и цена берутся из снимков позиций (cart/snapshots.py):
+итоги не меняются, когда товар переименовали или удалили. Категория —
+текущая категория товара; у удалённого товара она пустая. Скидка заказа
+делится между позициями пропорционально их сумме.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from cart.models import Order, OrderItem
+from scootermall import caching
+from shop.models import Category
+from tasks import queue
+
+from .models import RollupState, SalesRollup, StaleDay
+
+# Сколько id в одном IN (...)
+CHUNK_SIZE = 500
+
+DIMENSIONS = [code for code, _ in SalesRollup.DIMENSION_CHOICES]
+
+
+def _bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+class _Total:
+    __slots__ = ('label', 'orders', 'cancelled', 'units', 'revenue', 'discount')
+
+    def __init__(self, label):
+        self.label = label
+        self.orders = set()
+        self.cancelled = set()
+        self.units = 0
+        self.revenue = Decimal(0)
+        self.discount = Decimal(0)
+
+    def add(self, order_id, cancelled, units, revenue, discount):
+        self.orders.add(order_id)
+        if cancelled:
+            self.cancelled.add(order_id)
+        else:
+            self.units += units
+            self.revenue += revenue
+            self.discount += discount
+
+
+def compute_day(day, categories):
+    """Строки итогов одного дня; categories — {id категории: название}"""
+    start, end = _bounds(day)
+    orders = list(
+        Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values_list('pk', 'status', 'discount', 'promo_code')
+    )
+    if not orders:
+        return []
+    lines = list(
+        OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+        .values_list('order_id', 'sku', 'product_name', 'brand_name', 'product__category_id', 'price', 'quantity')
+    )
+    gross = defaultdict(Decimal)
+    units = defaultdict(int)
+    for order_id, *_, price, quantity in lines:
+        gross[order_id] += price * quantity
+        units[order_id] += quantity
+
+    totals = {}
+
+    def total(dimension, key, label):
+        item = totals.get((dimension, key))
+        if item is None:
+            item = totals[dimension, key] = _Total(label)
+        return item
+
+    info = {}
+    for pk, status, discount, promo_code in orders:
+        cancelled = status == 'cancelled'
+        info[pk] = (cancelled, discount)
+        total('total', '', 'Все заказы').add(pk, cancelled, units[pk], gross[pk], discount)
+        if promo_code:
+            total('promo', promo_code, promo_code).add(pk, cancelled, units[pk], gross[pk], discount)
+
+    for order_id, sku, name, brand, category_id, price, quantity in lines:
+        cancelled, discount = info[order_id]
+        amount = price * quantity
+        share = discount * amount / gross[order_id] if gross[order_id] else Decimal(0)
+        category = str(category_id) if category_id else ''
+        for item in (
+            total('product', sku, f'{brand} {name}'.strip()),
+            total('brand', brand, brand or 'Без бренда'),
+            total('category', category, categories.get(category_id, 'Без категории')),
+        ):
+            item.add(order_id, cancelled, quantity, amount, share)
+
+    return [
+        SalesRollup(
+            grain='day', period=day, dimension=dimension, key=key, label=item.label[:255],
+            orders=len(item.orders), cancelled=len(item.cancelled), units=item.units,
+            revenue=item.revenue, discount=item.discount.quantize(Decimal(1)),
+        )
+        for (dimension, key), item in totals.items()
+    ]
+
+
+def _period_rows(grain, period):
+    # Все разрезы перечислены: поиск по индексу (grain, dimension, period, key)
+    return SalesRollup.objects.filter(grain=grain, dimension__in=DIMENSIONS, period=period)
+
+
+def write_day(day, rows):
+    with transaction.atomic():
+        _period_rows('day', day).delete()
+        SalesRollup.objects.bulk_create(rows)
+
+
+def _rebuild(grain, period, end, source):
+    """Строки периода [period, end) из строк мельче (source) одним INSERT ... SELECT"""
+    table = connection.ops.quote_name(SalesRollup._meta.db_table)
+    with transaction.atomic():
+        _period_rows(grain, period).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} '
+                f'(grain, period, dimension, key, label, orders, cancelled, units, revenue, discount) '
+                f'SELECT %s, %s, dimension, key, MAX(label), SUM(orders), SUM(cancelled), SUM(units), '
+                f'SUM(revenue), SUM(discount) FROM {table} '
+                f'WHERE grain = %s AND dimension IN ({", ".join(["%s"] * len(DIMENSIONS))}) '
+                f'AND period >= %s AND period < %s GROUP BY dimension, key',
+                [grain, period, source, *DIMENSIONS, period, end],
+            )
+
+
+def rebuild_month(month):
+    _rebuild('month', month, (month + timedelta(days=32)).replace(day=1), 'day')
+
+
+def rebuild_year(year):
+    _rebuild('year', year, year.replace(year=year.year + 1), 'month')
+
+
+def _days(orders):
+    return set(orders.annotate(day=TruncDate('created_at')).order_by().values_list('day', flat=True).distinct())
+
+
+def run(full=False):
+    """
+    Пересчитывает изменившиеся дни (full — все) и их месяцы.
+    Возвращает число пересчитанных дней.
+    """
+    state, _ = RollupState.objects.get_or_create(pk=1)
+    started = timezone.now()
+    if full or state.watermark is None:
+        days = _days(Order.objects.all())
+        # Дни, где заказов не осталось, очищаются
+        days |= set(SalesRollup.objects.filter(grain='day').values_list('period', flat=True).distinct())
+    else:
+        # Перекрытие: транзакция, начатая до прошлого пересчёта, могла зафиксироваться после него
+        since = state.watermark - timedelta(seconds=settings.ANALYTICS_ROLLUP_OVERLAP)
+        days = _days(Order.objects.filter(updated_at__gte=since))
+    stale = list(StaleDay.objects.values_list('pk', 'day'))
+    days |= {day for _, day in stale}
+
+    categories = dict(Category.objects.values_list('pk', 'name'))
+    for day in sorted(days):
+        write_day(day, compute_day(day, categories))
+        # Полный пересчёт дольше аренды задачи
+        queue.renew()
+    for month in sorted({day.replace(day=1) for day in days}):
+        rebuild_month(month)
+    for year in sorted({day.replace(month=1, day=1) for day in days}):
+        rebuild_year(year)
+
+    stale_ids = [pk for pk, _ in stale]
+    for start in range(0, len(stale_ids), CHUNK_SIZE):
+        StaleDay.objects.filter(pk__in=stale_ids[start:start + CHUNK_SIZE]).delete()
+    RollupState.objects.filter(pk=state.pk).update(watermark=started, finished_at=timezone.now(), days=len(days))
+    if days:
+        caching.bump('analytics')
+    return len(days)
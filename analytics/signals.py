@@ -0,0 +1,28 @@
+"""Изменения заказов ставят пересчёт итогов продаж (analytics/rollup.py)"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from cart.models import Order
+from cart.signals import orders_changed
+
+from .models import StaleDay
+from .tasks import schedule
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule()
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    # У удалённого заказа нет updated_at, по которому пересчёт нашёл бы его день
+    StaleDay.objects.get_or_create(day=timezone.localdate(instance.created_at))
+    schedule()
+
+
+@receiver(orders_changed)
+def orders_bulk_changed(sender, order_ids, **kwargs):
+    schedule()
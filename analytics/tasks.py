@@ -0,0 +1,18 @@
+"""Фоновые задачи аналитики; регистрируются при запуске (tasks.apps)"""
+from django.conf import settings
+
+from tasks.queue import task
+
+from . import reports, rollup
+
+
+@task(name='analytics.rollup_sales', priority=-5, max_attempts=2, lease=3600)
+def rollup_sales(full=False):
+    """Пересчёт итогов продаж (см. manage.py rollup_sales)"""
+    if rollup.run(full=full):
+        reports.warm()
+
+
+def schedule():
+    """Пересчёт через ANALYTICS_ROLLUP_DELAY; изменения за это время сливаются в одну задачу"""
+    rollup_sales.enqueue(dedupe_key='analytics-rollup', countdown=settings.ANALYTICS_ROLLUP_DELAY)
@@ -0,0 +1,37 @@
+from django.contrib import admin, messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from . import reports
+from .forms import PeriodForm
+from .tasks import rollup_sales
+
+
+@staff_member_required
+def dashboard(request):
+    """Продажи за период: итоги, график и рейтинги — только из SalesRollup"""
+    form = PeriodForm(request.GET or None)
+    date_from, date_to = form.get_period()
+    if not form.is_bound:
+        form = PeriodForm(initial={'date_from': date_from, 'date_to': date_to})
+    return render(request, 'admin/analytics/dashboard.html', {
+        **admin.site.each_context(request),
+        'title': 'Продажи',
+        'form': form,
+        'presets': reports.presets(),
+        'date_from': date_from,
+        'date_to': date_to,
+        'report': reports.summary(date_from, date_to),
+    })
+
+
+@staff_member_required
+@require_POST
+def refresh(request):
+    """Пересчёт итогов в очереди задач, не дожидаясь ANALYTICS_ROLLUP_DELAY"""
+    rollup_sales.enqueue(dedupe_key='analytics-rollup')
+    messages.success(request, 'Пересчёт итогов поставлен в очередь')
+    # Период дашборда передаётся в строке запроса формы
+    return redirect(f"{reverse('analytics_dashboard')}?{request.GET.urlencode()}")
@@ -1,43 +1,182 @@
-from django.contrib import admin
-from .models import Cart, CartItem, Order, OrderItem, PromoCode
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Q, Subquery, Sum
+from shop.admin_utils import ExportAdminMixin, LargeTableAdminMixin, ExactSearchAdminMixin
+from shop.models import Product
+from . import workflow
+from .exports import OrderExport
+from .forms import OrderAdminForm
+from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory, PromoCode
+from .snapshots import fill_snapshots
+
+# Корзины могут лежать в отдельной базе (scootermall/routers.py), поэтому
+# в админке корзин нет JOIN с пользователями и товарами: связанные объекты
+# подгружаются prefetch_related отдельным запросом к их базе.
+
+
+def attach_items_price(carts):
+    """Сумма позиций для корзин страницы: позиции из базы корзин, цены из каталога"""
+    carts = list(carts)
+    items = list(
+        CartItem.objects.filter(cart__in=carts).values_list('cart_id', 'product_id', 'quantity')
+    )
+    prices = dict(
+        Product.objects.filter(pk__in={product_id for _, product_id, _ in items})
+        .values_list('pk', 'price')
+    )
+    totals = {}
+    for cart_id, product_id, quantity in items:
+        totals[cart_id] = totals.get(cart_id, 0) + prices.get(product_id, 0) * quantity
+    for cart in carts:
+        cart.items_price_sum = totals.get(cart.pk, 0)
+
+
+class CartChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        attach_items_price(self.result_list)
 
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
     readonly_fields = ['total_price']
+    raw_id_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('product__brand')
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ['total_price']
+    fields = ['product', 'product_name', 'brand_name', 'sku', 'quantity', 'price', 'total_price']
+    # Снимок пишется при сохранении новой позиции (OrderAdmin.save_formset)
+    readonly_fields = ['product_name', 'brand_name', 'sku', 'total_price']
+    raw_id_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product__brand')
+
+
+class OrderStatusHistoryInline(admin.TabularInline):
+    model = OrderStatusHistory
+    extra = 0
+    can_delete = False
+    fields = ['created_at', 'from_status', 'to_status', 'changed_by', 'comment']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('changed_by')
+
+
+def transition_action(status, label):
+    """Действие списка заказов: массовый переход в status"""
+    def action(modeladmin, request, queryset):
+        changed, skipped = workflow.bulk_transition(queryset, status, user=request.user)
+        modeladmin.message_user(request, f'Переведено в «{label}»: {changed}', messages.SUCCESS)
+        if skipped:
+            allowed = ', '.join(f'«{workflow.LABELS[source]}»' for source in workflow.sources(status))
+            modeladmin.message_user(
+                request, f'Пропущено {skipped}: в «{label}» переводятся только заказы в статусе {allowed}',
+                messages.WARNING,
+            )
+    action.__name__ = f'transition_to_{status}'
+    return admin.action(description=f'Перевести в «{label}»')(action)
 
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'session_id', 'total_items', 'total_price', 'updated_at']
+class CartAdmin(LargeTableAdminMixin, ExactSearchAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'user', 'session_id', 'items_count', 'items_price', 'updated_at']
     list_filter = ['created_at', 'updated_at']
+    list_select_related = ()
     search_fields = ['user__username', 'session_id']
+    exact_search_fields = ['session_id']
+    raw_id_fields = ['user']
     inlines = [CartItemInline]
     readonly_fields = ['total_items', 'total_price']
 
+    def get_changelist(self, request, **kwargs):
+        return CartChangeList
+
+    def get_queryset(self, request):
+        # Число товаров считается коррелированным подзапросом только для
+        # строк текущей страницы; сумма — в CartChangeList
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        return super().get_queryset(request).prefetch_related('user').annotate(
+            items_count_sum=Subquery(
+                items.annotate(total=Sum('quantity')).values('total')
+            ),
+        )
+
+    def get_exact_search_q(self, search_term):
+        q = super().get_exact_search_q(search_term)
+        term = search_term.strip()
+        if term:
+            user_ids = list(
+                get_user_model().objects.filter(username=term).values_list('pk', flat=True)
+            )
+            if user_ids:
+                q |= Q(user_id__in=user_ids)
+        return q
+
+    @admin.display(description='Товаров', ordering='items_count_sum')
+    def items_count(self, obj):
+        return obj.items_count_sum or 0
+
+    @admin.display(description='Сумма')
+    def items_price(self, obj):
+        return getattr(obj, 'items_price_sum', 0)
+
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(LargeTableAdminMixin, ExactSearchAdminMixin, admin.ModelAdmin):
     list_display = ['cart', 'product', 'quantity', 'total_price', 'added_at']
     list_filter = ['added_at']
-    search_fields = ['cart__id', 'product__name']
+    list_select_related = ['cart']
+    search_fields = ['cart__id', 'product__sku']
+    raw_id_fields = ['cart', 'product']
     readonly_fields = ['total_price']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('cart__user', 'product__brand')
+
+    def get_exact_search_q(self, search_term):
+        term = search_term.strip()
+        q = Q()
+        if not term:
+            return q
+        product_ids = list(
+            Product.objects.filter(sku=term.upper()).values_list('pk', flat=True)
+        )
+        if product_ids:
+            q |= Q(product_id__in=product_ids)
+        if term.isdigit():
+            q |= Q(cart_id=int(term))
+        # Ничего не найдено — пустой результат, а не весь список
+        return q or Q(pk__in=[])
+
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ExportAdminMixin, LargeTableAdminMixin, ExactSearchAdminMixin, admin.ModelAdmin):
     list_display = ['order_number', 'user', 'status', 'total_amount', 'created_at']
     list_filter = ['status', 'created_at']
+    list_select_related = ['user']
     search_fields = ['order_number', 'user__username', 'phone', 'email']
-    inlines = [OrderItemInline]
+    exact_search_fields = ['order_number', 'user__username', 'phone', 'email']
+    raw_id_fields = ['user']
+    inlines = [OrderItemInline, OrderStatusHistoryInline]
     readonly_fields = ['order_number', 'created_at', 'updated_at']
+    form = OrderAdminForm
+    export_class = OrderExport
+    actions = [
+        transition_action(status, label)
+        for status, label in Order.STATUS_CHOICES if workflow.sources(status)
+    ] + ['export']
     fieldsets = (
         ('Основная информация', {
             'fields': ('user', 'order_number', 'status', 'created_at', 'updated_at')
@@ -56,6 +195,35 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def normalize_search_term(self, field, term):
+        return term.upper() if field == 'order_number' else term
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is OrderItem:
+            items = formset.save(commit=False)
+            fill_snapshots([item for item in items if item.product_id and not item.product_name])
+            for item in items:
+                item.save()
+            for item in formset.deleted_objects:
+                item.delete()
+            formset.save_m2m()
+        else:
+            super().save_formset(request, form, formset, change)
+
+    def save_model(self, request, obj, form, change):
+        # Статус меняет workflow: проверка перехода, история, письмо покупателю
+        new_status = obj.status
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if not change:
+            workflow.record_created(obj, request.user)
+        elif new_status != obj.status:
+            try:
+                workflow.transition(obj, new_status, user=request.user)
+            except workflow.TransitionError as exc:
+                self.message_user(request, str(exc), messages.ERROR)
+
 
 @admin.register(PromoCode)
 class PromoCodeAdmin(admin.ModelAdmin):
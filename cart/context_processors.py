@@ -1,4 +1,10 @@
-from .models import Cart
+from scootermall import caching
+from .models import Cart, cart_namespace
+
+
+def _summary(cart):
+    items = list(cart.items.prefetch_related('product'))
+    return sum(item.quantity for item in items), sum(item.total_price for item in items)
 
 
 def cart_context(request):
@@ -8,21 +14,18 @@ def cart_context(request):
     cart_total = 0
     
     if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.prefetch_related('items__product').get(user=request.user)
-        except Cart.DoesNotExist:
-            pass
+        cart = Cart.objects.filter(user=request.user).first()
     else:
         session_id = request.session.session_key
         if session_id:
-            try:
-                cart = Cart.objects.prefetch_related('items__product').get(session_id=session_id, user=None)
-            except Cart.DoesNotExist:
-                pass
+            cart = Cart.objects.filter(session_id=session_id, user=None).first()
     
     if cart:
-        cart_items_count = cart.total_items
-        cart_total = cart.total_price
+        # Сумма зависит и от цен товаров: штамп catalog
+        cart_items_count, cart_total = caching.get_or_compute(
+            f'cart:{cart.pk}:summary', lambda: _summary(cart),
+            namespaces=[cart_namespace(cart.pk), 'catalog'],
+        )
     
     return {
         'cart': cart,
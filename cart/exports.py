@@ -0,0 +1,68 @@
+"""Выгрузка заказов: строка на позицию, поля заказа повторяются в каждой"""
+from django.conf import settings
+
+from scootermall.exports import Column, Export, chunked
+
+from .models import Order, OrderItem
+
+ORDER_FIELDS = [
+    ('order_number', 'Номер заказа'),
+    ('created_at', 'Создан'),
+    ('status', 'Статус'),
+    ('first_name', 'Имя'),
+    ('last_name', 'Фамилия'),
+    ('phone', 'Телефон'),
+    ('email', 'Email'),
+    ('city', 'Город'),
+    ('address', 'Адрес'),
+    ('zip_code', 'Индекс'),
+    ('promo_code', 'Промокод'),
+    ('discount', 'Скидка'),
+    ('delivery_cost', 'Доставка'),
+    ('total_amount', 'Сумма заказа'),
+    ('comment', 'Комментарий'),
+]
+ITEM_FIELDS = [
+    ('sku', 'Артикул'),
+    ('product_name', 'Товар'),
+    ('brand_name', 'Бренд'),
+    ('price', 'Цена'),
+    ('quantity', 'Количество'),
+]
+
+
+def _lines(order_ids):
+    """Позиции пачки заказов одним запросом по индексу order_id"""
+    lines = {}
+    for order_id, *item in (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by('order_id', 'pk').values_list('order_id', *(key for key, _ in ITEM_FIELDS))
+    ):
+        lines.setdefault(order_id, []).append((*item, item[-2] * item[-1]))
+    return lines
+
+
+class OrderExport(Export):
+    name = 'orders'
+    title = 'Заказы'
+    columns = [
+        *(Column(key, label) for key, label in ORDER_FIELDS),
+        *(Column(key, label) for key, label in ITEM_FIELDS),
+        Column('line_total', 'Сумма позиции'),
+    ]
+
+    def rows(self, queryset, selected):
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        statuses = dict(Order.STATUS_CHOICES)
+        status = [key for key, _ in ORDER_FIELDS].index('status')
+        empty = (None,) * (len(ITEM_FIELDS) + 1)
+        # Без колонок позиций — строка на заказ
+        with_items = bool(selected - {key for key, _ in ORDER_FIELDS})
+        orders = queryset.values_list('pk', *(key for key, _ in ORDER_FIELDS)).iterator(chunk_size=chunk_size)
+        for chunk in chunked(orders, chunk_size):
+            lines = _lines([row[0] for row in chunk]) if with_items else {}
+            for pk, *order in chunk:
+                order[status] = statuses.get(order[status], order[status])
+                order = tuple(order)
+                for line in lines.get(pk) or [empty]:
+                    yield order + line
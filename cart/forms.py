@@ -52,3 +52,22 @@ class OrderForm(forms.ModelForm):
                 'rows': 3
             }),
         }
+
+
+class OrderAdminForm(forms.ModelForm):
+    """Заказ в админке: статус — только текущий и допустимые переходы"""
+
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        from .workflow import TRANSITIONS
+
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and 'status' in self.fields:
+            current = self.instance.status
+            reachable = {current, *TRANSITIONS.get(current, ())}
+            self.fields['status'].choices = [
+                (code, label) for code, label in Order.STATUS_CHOICES if code in reachable
+            ]
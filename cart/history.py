@@ -0,0 +1,132 @@
+"""
+История заказов покупателя.
+
+Страницы списка — keyset-пагинация по (created_at, id) на индексе
+(user, -created_at, -id): курсор «<микросекунды created_at>.<id>» задаёт
+границу, поэтому страница читается одним диапазонным запросом при любой
+глубине, без OFFSET и COUNT. Страница с позициями (из снимков,
+cart/snapshots.py) и статус заказа для опроса лежат в двухуровневом кеше
+(scootermall/caching.py) в пространстве имён orders:<id пользователя>;
+его сбрасывают изменения заказов (cart/signals.py, cart/workflow.py).
+
+Статус для опроса отдаётся с ETag: неизменившийся заказ отвечает 304
+из кеша, не читая базу.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+
+from scootermall import caching
+
+from .models import Order, OrderStatusHistory, orders_namespace
+
+
+def bump(user_ids):
+    """Сбрасывает кеш истории заказов пользователей после коммита"""
+    namespaces = {orders_namespace(user_id) for user_id in user_ids}
+    if namespaces:
+        transaction.on_commit(lambda: caching.bump(*namespaces))
+
+
+def encode_cursor(order):
+    created = order.created_at
+    return f'{int(created.timestamp()) * 1_000_000 + created.microsecond}.{order.pk}'
+
+
+def decode_cursor(value):
+    """(created_at, id) или None, если курсор испорчен"""
+    try:
+        micros, pk = (int(part) for part in value.split('.'))
+        created = datetime.fromtimestamp(micros // 1_000_000, dt_timezone.utc).replace(microsecond=micros % 1_000_000)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return created, pk
+
+
+class OrderPage:
+    __slots__ = ('orders', 'newer', 'older')
+
+    def __init__(self, orders, newer, older):
+        self.orders = orders
+        # Курсоры соседних страниц; None — страницы нет
+        self.newer = newer
+        self.older = older
+
+
+def _page(user_id, cursor, direction, size):
+    # created_at__gte/lte — граница диапазона индекса, OR разбирает только равные created_at
+    orders = Order.objects.filter(user_id=user_id).prefetch_related('items')
+    if cursor is None:
+        rows = list(orders.order_by('-created_at', '-id')[:size + 1])
+        return OrderPage(rows[:size], None, encode_cursor(rows[size - 1]) if len(rows) > size else None)
+    created, pk = cursor
+    if direction == 'newer':
+        rows = list(
+            orders.filter(Q(created_at__gt=created) | Q(pk__gt=pk), created_at__gte=created)
+            .order_by('created_at', 'id')[:size + 1]
+        )
+        more = len(rows) > size
+        rows = rows[:size][::-1]
+        if not rows:
+            return OrderPage([], None, None)
+        return OrderPage(rows, encode_cursor(rows[0]) if more else None, encode_cursor(rows[-1]))
+    rows = list(
+        orders.filter(Q(created_at__lt=created) | Q(pk__lt=pk), created_at__lte=created)
+        .order_by('-created_at', '-id')[:size + 1]
+    )
+    more = len(rows) > size
+    rows = rows[:size]
+    if not rows:
+        return OrderPage([], None, None)
+    return OrderPage(rows, encode_cursor(rows[0]), encode_cursor(rows[-1]) if more else None)
+
+
+def page(user_id, cursor=None, direction='older', size=None):
+    """
+    Страница заказов пользователя, от новых к старым. cursor — строка
+    курсора соседней страницы, direction — 'older' или 'newer' от него.
+    """
+    size = size or settings.ORDER_HISTORY_PAGE_SIZE
+    decoded = decode_cursor(cursor) if cursor else None
+    if decoded is None:
+        direction = 'older'
+    key = f'orders:page:{user_id}:{size}:{direction}:{cursor if decoded else ""}'
+    return caching.get_or_compute(
+        key, lambda: _page(user_id, decoded, direction, size),
+        namespaces=[orders_namespace(user_id)], timeout=settings.ORDER_HISTORY_CACHE_TIMEOUT,
+    )
+
+
+def status(user_id, order_number):
+    """Статус заказа с историей и ETag для опроса; None — нет такого заказа у пользователя"""
+    def compute():
+        order = (
+            Order.objects.filter(user_id=user_id, order_number=order_number)
+            .values('pk', 'order_number', 'status', 'updated_at').first()
+        )
+        if order is None:
+            return None
+        labels = dict(Order.STATUS_CHOICES)
+        history = OrderStatusHistory.objects.filter(order_id=order['pk']).order_by('created_at', 'id')
+        data = {
+            'order_number': order['order_number'],
+            'status': order['status'],
+            'status_label': labels.get(order['status'], ''),
+            'updated_at': order['updated_at'],
+            'history': [
+                {'status': to_status, 'status_label': labels.get(to_status, ''), 'at': created}
+                for to_status, created in history.values_list('to_status', 'created_at')
+            ],
+        }
+        body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return {'body': body, 'etag': '"%s"' % hashlib.md5(body.encode()).hexdigest()}
+
+    return caching.get_or_compute(
+        f'orders:status:{user_id}:{order_number}', compute,
+        namespaces=[orders_namespace(user_id)], timeout=settings.ORDER_HISTORY_CACHE_TIMEOUT,
+    )
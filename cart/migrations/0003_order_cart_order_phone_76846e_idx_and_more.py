@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_promocode_order_orderitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['phone'], name='cart_order_phone_76846e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['email'], name='cart_order_email_b79680_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def start_history(apps, schema_editor):
+    # История начинается с текущего статуса каждого заказа: один INSERT ... SELECT
+    Order = apps.get_model('cart', 'Order')
+    OrderStatusHistory = apps.get_model('cart', 'OrderStatusHistory')
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f'INSERT INTO {quote(OrderStatusHistory._meta.db_table)} '
+        f'(order_id, from_status, to_status, comment, created_at) '
+        f'SELECT id, %s, status, %s, updated_at FROM {quote(Order._meta.db_table)}',
+        ['', 'Статус до ведения истории'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0005_alter_cart_user_alter_cartitem_product'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('new', 'Новый'), ('processing', 'В обработке'), ('shipped', 'Отправлен'), ('delivered', 'Доставлен'), ('cancelled', 'Отменён')], max_length=20, verbose_name='Был')),
+                ('to_status', models.CharField(choices=[('new', 'Новый'), ('processing', 'В обработке'), ('shipped', 'Отправлен'), ('delivered', 'Доставлен'), ('cancelled', 'Отменён')], max_length=20, verbose_name='Стал')),
+                ('comment', models.CharField(blank=True, max_length=255, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Когда')),
+            ],
+            options={
+                'verbose_name': 'Смена статуса заказа',
+                'verbose_name_plural': 'История статусов заказов',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, verbose_name='Зарезервировано'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='cart_order_status_6a72f0_idx'),
+        ),
+        migrations.AddField(
+            model_name='orderstatushistory',
+            name='changed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кто изменил'),
+        ),
+        migrations.AddField(
+            model_name='orderstatushistory',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='cart.order', verbose_name='Заказ'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatushistory',
+            index=models.Index(fields=['order', 'created_at'], name='cart_orders_order_i_f47c37_idx'),
+        ),
+        migrations.RunPython(start_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from cart.snapshots import spec_summary
+
+
+def fill_snapshots(apps, schema_editor):
+    # Снимки существующих позиций — из текущего каталога
+    OrderItem = apps.get_model('cart', 'OrderItem')
+    Product = apps.get_model('shop', 'Product')
+    ProductImage = apps.get_model('shop', 'ProductImage')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    image = ProductImage.objects.filter(product=OuterRef('product_id')).order_by('-is_main', 'order', 'id')
+    OrderItem.objects.update(
+        product_name=Coalesce(Subquery(product.values('name')[:1]), Value('')),
+        brand_name=Coalesce(Subquery(product.values('brand__name')[:1]), Value('')),
+        sku=Coalesce(Subquery(product.values('sku')[:1]), Value('')),
+        image=Coalesce(Subquery(image.values('image')[:1]), Value('')),
+    )
+    # Характеристики собираются в Python: один UPDATE на одинаковую строку
+    by_specs = {}
+    rows = Product.objects.values_list('pk', 'max_speed', 'max_range', 'motor_power', 'weight')
+    for pk, *specs in rows.iterator():
+        summary = spec_summary(*specs)
+        if summary:
+            by_specs.setdefault(summary, []).append(pk)
+    for summary, product_ids in by_specs.items():
+        for start in range(0, len(product_ids), 500):
+            OrderItem.objects.filter(product_id__in=product_ids[start:start + 500]).update(specs=summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0006_order_workflow'),
+        ('shop', '0007_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='brand_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Бренд'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='image',
+            field=models.CharField(blank=True, help_text='Путь главного изображения', max_length=100, verbose_name='Изображение'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Название'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='sku',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Артикул'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='specs',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Характеристики'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='shop.product', verbose_name='Товар'),
+        ),
+        migrations.RunPython(fill_snapshots, migrations.RunPython.noop),
+    ]
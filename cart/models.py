@@ -1,15 +1,28 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from shop.models import Product
+from shop.models import Product, ProductImage
 
 User = get_user_model()
 
 
+def cart_namespace(cart_id):
+    """Пространство имён кеша корзины (scootermall/caching.py)"""
+    return f'cart:{cart_id}'
+
+
+def orders_namespace(user_id):
+    """Пространство имён кеша истории заказов пользователя (cart/history.py)"""
+    return f'orders:{user_id}'
+
+
 class Cart(models.Model):
     """Корзина пользователя"""
+    # Корзины могут жить в отдельной базе: без внешнего ключа в БД,
+    # удаление пользователя чистит корзину через cart.signals
     user = models.OneToOneField(
         User,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='cart',
         verbose_name='Пользователь',
         null=True,
@@ -22,6 +35,11 @@ class Cart(models.Model):
     class Meta:
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
+        indexes = [
+            # cart_context ищет анонимную корзину по session_id и user=None
+            models.Index(fields=['session_id'], condition=models.Q(user__isnull=True),
+                         name='cart_anon_session_idx'),
+        ]
 
     def __str__(self):
         if self.user:
@@ -49,7 +67,8 @@ class CartItem(models.Model):
     )
     product = models.ForeignKey(
         Product,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='cart_items',
         verbose_name='Товар'
     )
@@ -119,6 +138,16 @@ class Order(models.Model):
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['phone']),
+            models.Index(fields=['email']),
+            # История заказов покупателя: keyset по (created_at, id), cart/history.py
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['status', '-created_at']),
+            # Заказы дня и изменившиеся заказы для итогов продаж (analytics/rollup.py)
+            models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"Заказ #{self.order_number}"
@@ -132,27 +161,89 @@ class OrderItem(models.Model):
         related_name='items',
         verbose_name='Заказ'
     )
+    # Удаление товара не трогает историю: позиция выводится из снимка ниже
     product = models.ForeignKey(
         Product,
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
         related_name='order_items',
         verbose_name='Товар'
     )
     quantity = models.PositiveIntegerField('Количество', default=1)
     price = models.DecimalField('Цена', max_digits=12, decimal_places=0)
+    # Снимок товара на момент оформления (cart/snapshots.py)
+    product_name = models.CharField('Название', max_length=200, blank=True)
+    brand_name = models.CharField('Бренд', max_length=100, blank=True)
+    sku = models.CharField('Артикул', max_length=50, blank=True)
+    image = models.CharField('Изображение', max_length=100, blank=True, help_text='Путь главного изображения')
+    specs = models.CharField('Характеристики', max_length=255, blank=True)
+    # Сколько списано с остатка при оформлении; возвращается при отмене (cart/workflow.py)
+    reserved = models.PositiveIntegerField('Зарезервировано', default=0)
 
     class Meta:
         verbose_name = 'Товар в заказе'
         verbose_name_plural = 'Товары в заказе'
 
     def __str__(self):
-        return f"{self.product} x {self.quantity}"
+        return f"{self.title} x {self.quantity}"
+
+    @property
+    def title(self):
+        return f'{self.brand_name} {self.product_name}'.strip()
+
+    @property
+    def image_url(self):
+        if not self.image:
+            return ''
+        return ProductImage._meta.get_field('image').storage.url(self.image)
 
     @property
     def total_price(self):
+        # Пустая форма позиции в админке ещё без цены
+        if self.price is None:
+            return 0
         return self.price * self.quantity
 
 
+class OrderStatusHistory(models.Model):
+    """Смена статуса заказа; записи только добавляются (cart/workflow.py)"""
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='status_history',
+        verbose_name='Заказ'
+    )
+    from_status = models.CharField('Был', max_length=20, choices=Order.STATUS_CHOICES, blank=True)
+    to_status = models.CharField('Стал', max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Кто изменил'
+    )
+    comment = models.CharField('Комментарий', max_length=255, blank=True)
+    created_at = models.DateTimeField('Когда', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Смена статуса заказа'
+        verbose_name_plural = 'История статусов заказов'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id}: {self.from_status or '—'} → {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError('История статусов не изменяется')
+        super().save(*args, **kwargs)
+
+
 class PromoCode(models.Model):
     """Промокод"""
     code = models.CharField('Код', max_length=50, unique=True)
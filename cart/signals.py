@@ -0,0 +1,53 @@
+"""
+Каскадное удаление для связей между базами.
+
+Корзины могут лежать в отдельной базе (см. scootermall/routers.py), где
+нет внешних ключей на пользователей и товары, поэтому Cart.user и
+CartItem.product объявлены с DO_NOTHING, а связанные строки удаляются здесь.
+
+Здесь же инвалидируется кеш сводки корзины в шапке (cart.context_processors)
+и кеш истории заказов (cart.history) — после коммита в базе корзин
+и заказов, чтобы под новым штампом не закешировались прежние строки.
+
+orders_changed отправляет cart/workflow.py после смены статуса заказов:
+массовый UPDATE не вызывает post_save.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from scootermall import caching
+from shop.models import Product
+from . import history
+from .models import Cart, CartItem, Order, cart_namespace
+
+# order_ids, status
+orders_changed = Signal()
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_user_cart(sender, instance, **kwargs):
+    Cart.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Product)
+def delete_product_cart_items(sender, instance, **kwargs):
+    CartItem.objects.filter(product_id=instance.pk).delete()
+
+
+@receiver([post_save, post_delete], sender=Cart)
+def bump_cart(sender, instance, using, **kwargs):
+    namespace = cart_namespace(instance.pk)
+    transaction.on_commit(lambda: caching.bump(namespace), using=using)
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def bump_cart_item(sender, instance, using, **kwargs):
+    namespace = cart_namespace(instance.cart_id)
+    transaction.on_commit(lambda: caching.bump(namespace), using=using)
+
+
+@receiver([post_save, post_delete], sender=Order)
+def bump_orders(sender, instance, **kwargs):
+    history.bump([instance.user_id])
@@ -0,0 +1,58 @@
+"""
+Снимок товара в позиции заказа.
+
+Позиция заказа хранит название, бренд, артикул, путь главного
+изображения и краткие характеристики товара на момент оформления:
+история заказов выводится из них без обращений к каталогу и не меняется,
+когда товар правят или удаляют (OrderItem.product тогда становится NULL).
+Снимки всех товаров заказа читаются одним values()-запросом.
+"""
+from django.db.models import F, OuterRef, Subquery
+
+from shop.models import Product, ProductImage
+
+
+def spec_summary(max_speed=None, max_range=None, motor_power=None, weight=None):
+    """Краткие характеристики одной строкой: «25 км/ч · 40 км · 350 Вт · 12.5 кг»"""
+    parts = []
+    if max_speed:
+        parts.append(f'{max_speed} км/ч')
+    if max_range:
+        parts.append(f'{max_range} км')
+    if motor_power:
+        parts.append(f'{motor_power} Вт')
+    if weight:
+        parts.append(f'{weight.normalize():f} кг')
+    return ' · '.join(parts)
+
+
+def product_snapshots(product_ids=None):
+    """{id товара: поля снимка} одним запросом; None — весь каталог"""
+    # Главное изображение — как в карточке товара (shop/cards.py)
+    image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('-is_main', 'order', 'id')
+    products = Product.objects.order_by()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    rows = products.values(
+        'pk', 'name', 'sku', 'max_speed', 'max_range', 'motor_power', 'weight',
+        brand_name=F('brand__name'),
+        image=Subquery(image.values('image')[:1]),
+    )
+    return {
+        row['pk']: {
+            'product_name': row['name'],
+            'brand_name': row['brand_name'] or '',
+            'sku': row['sku'],
+            'image': row['image'] or '',
+            'specs': spec_summary(row['max_speed'], row['max_range'], row['motor_power'], row['weight']),
+        }
+        for row in rows
+    }
+
+
+def fill_snapshots(items):
+    """Заполняет снимки позиций перед bulk_create"""
+    snapshots = product_snapshots({item.product_id for item in items if item.product_id})
+    for item in items:
+        for field, value in snapshots.get(item.product_id, {}).items():
+            setattr(item, field, value)
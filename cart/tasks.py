@@ -0,0 +1,13 @@
+"""Фоновые задачи заказов; регистрируются при запуске (tasks.apps)"""
+from mailer.sending import send_order_emails
+from tasks.queue import task
+
+from . import workflow
+
+
+@task(name='cart.order_status_changed', priority=5, max_attempts=5, backoff=30)
+def order_status_changed(order_ids, status):
+    """Последствия перехода пачки заказов; повтор безопасен"""
+    if status == 'cancelled':
+        workflow.release_stock(order_ids)
+    send_order_emails(order_ids, 'order_status', status)
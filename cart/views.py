@@ -3,10 +3,14 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.db import transaction
 import uuid
+from monitoring import metrics
 from shop.models import Product
 from .models import Cart, CartItem, Order, OrderItem, PromoCode
 from .forms import OrderForm
+from .snapshots import fill_snapshots
+from .workflow import record_created, reserve_stock
 
 
 def get_or_create_cart(request):
@@ -25,6 +29,7 @@ def get_or_create_cart(request):
 def cart_detail(request):
     """Страница корзины"""
     cart = get_or_create_cart(request)
+    metrics.funnel('cart_view')
     return render(request, 'cart/cart_detail.html', {'cart': cart})
 
 
@@ -45,6 +50,7 @@ def cart_add(request, product_slug):
     if not created:
         cart_item.quantity += quantity
         cart_item.save()
+    metrics.funnel('cart_add')
     
     messages.success(request, f'{product} добавлен в корзину')
     
@@ -157,32 +163,45 @@ def checkout(request):
                 except PromoCode.DoesNotExist:
                     messages.warning(request, 'Промокод не найден')
             
-            # Создаём заказ
-            order = form.save(commit=False)
-            order.user = request.user
-            order.order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
-            order.total_amount = cart.total_price - discount
-            order.discount = discount
-            if promo_code_obj:
-                order.promo_code = promo_code_obj.code
-            order.save()
-            
-            # Создаём элементы заказа
-            for cart_item in cart.items.all():
-                OrderItem.objects.create(
-                    order=order,
-                    product=cart_item.product,
-                    quantity=cart_item.quantity,
-                    price=cart_item.product.price
-                )
-            
+            # Заказ пишется в основную базу одной транзакцией. Корзина может
+            # лежать в другой базе (scootermall/routers.py), поэтому позиции
+            # читаются до транзакции, а очищается она после фиксации заказа
+            cart_items = list(cart.items.prefetch_related('product'))
+            with transaction.atomic():
+                order = form.save(commit=False)
+                order.user = request.user
+                order.order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+                order.total_amount = sum(item.total_price for item in cart_items) - discount
+                order.discount = discount
+                if promo_code_obj:
+                    order.promo_code = promo_code_obj.code
+                order.save()
+                record_created(order, request.user)
+
+                # Создаём элементы заказа со снимком товара, товар списывается с остатка
+                order_items = [
+                    OrderItem(
+                        order=order,
+                        product=cart_item.product,
+                        quantity=cart_item.quantity,
+                        price=cart_item.product.price
+                    )
+                    for cart_item in cart_items
+                ]
+                fill_snapshots(order_items)
+                reserve_stock(order_items)
+                OrderItem.objects.bulk_create(order_items)
+
             # Очищаем корзину
             cart.items.all().delete()
+            metrics.funnel('checkout_complete')
+            metrics.order_placed(order.total_amount)
             
             messages.success(request, f'Заказ #{order.order_number} успешно оформлен!')
             return redirect('shop:orders')
     else:
         form = OrderForm(initial=initial_data)
+        metrics.funnel('checkout_view')
     
     return render(request, 'cart/checkout.html', {
         'cart': cart,
@@ -0,0 +1,165 @@
+"""
+Статусы заказа и переходы между ними.
+
+Статус меняется только здесь: transition() — один заказ (форма заказа
+в админке), bulk_transition() — тысячи заказов (действия списка заказов).
+Массовый переход идёт пачками по ORDER_WORKFLOW_CHUNK_SIZE заказов:
+в одной транзакции выбираются id пачки, один UPDATE меняет статус,
+один bulk_create пишет историю. Последствия — письма покупателям
+и возврат резерва на склад при отмене — выполняет задача
+cart.order_status_changed, одна на пачку, после коммита. Тогда же
+сбрасывается кеш истории заказов покупателей (cart/history.py).
+
+При оформлении заказа reserve_stock() списывает товар с остатка
+(не ниже нуля) и запоминает списанное в OrderItem.reserved — именно
+столько возвращает release_stock() при отмене.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from shop.models import Product
+
+from . import history
+from .signals import orders_changed
+from .models import Order, OrderItem, OrderStatusHistory
+
+# Статус -> куда из него можно перейти
+TRANSITIONS = {
+    'new': ('processing', 'cancelled'),
+    'processing': ('shipped', 'cancelled'),
+    'shipped': ('delivered',),
+    'delivered': (),
+    'cancelled': (),
+}
+
+LABELS = dict(Order.STATUS_CHOICES)
+
+
+class TransitionError(ValueError):
+    pass
+
+
+def allowed(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def sources(to_status):
+    """Статусы, из которых можно перейти в to_status"""
+    return [status for status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+def record_created(order, user=None):
+    """Первая запись истории нового заказа"""
+    OrderStatusHistory.objects.create(order=order, to_status=order.status, changed_by=user)
+
+
+def _changed(order_ids, to_status):
+    from .tasks import order_status_changed
+
+    # В транзакции default задача ставится после коммита
+    order_status_changed.delay(order_ids, to_status)
+    orders_changed.send(sender=Order, order_ids=order_ids, status=to_status)
+
+
+def transition(order, to_status, user=None, comment=''):
+    """Переводит один заказ; TransitionError, если переход недопустим"""
+    if not allowed(order.status, to_status):
+        raise TransitionError(
+            f'{order}: нельзя перевести из «{LABELS[order.status]}» в «{LABELS[to_status]}»'
+        )
+    with transaction.atomic():
+        # Условие на прежний статус: параллельное изменение не перезаписывается
+        changed = Order.objects.filter(pk=order.pk, status=order.status).update(
+            status=to_status, updated_at=timezone.now(),
+        )
+        if not changed:
+            raise TransitionError(f'{order}: статус уже изменён')
+        OrderStatusHistory.objects.create(
+            order=order, from_status=order.status, to_status=to_status, changed_by=user, comment=comment,
+        )
+        _changed([order.pk], to_status)
+        history.bump([order.user_id])
+    order.status = to_status
+
+
+def bulk_transition(queryset, to_status, user=None, comment='', chunk_size=None):
+    """
+    Переводит заказы queryset, для которых переход допустим; остальные
+    пропускаются. Возвращает (переведено, пропущено).
+    """
+    chunk_size = chunk_size or settings.ORDER_WORKFLOW_CHUNK_SIZE
+    selected = queryset.count()
+    eligible = (
+        queryset.filter(status__in=sources(to_status))
+        .select_for_update().order_by('pk').values_list('pk', 'status', 'user_id')
+    )
+    changed = 0
+    last = 0
+    while True:
+        # BEGIN IMMEDIATE: блокировка записи взята до SELECT, пачка не меняется до UPDATE
+        with transaction.atomic():
+            rows = list(eligible.filter(pk__gt=last)[:chunk_size])
+            if not rows:
+                break
+            ids = [pk for pk, _, _ in rows]
+            now = timezone.now()
+            Order.objects.filter(pk__in=ids).update(status=to_status, updated_at=now)
+            OrderStatusHistory.objects.bulk_create([
+                OrderStatusHistory(
+                    order_id=pk, from_status=status, to_status=to_status,
+                    changed_by=user, comment=comment, created_at=now,
+                )
+                for pk, status, _ in rows
+            ])
+            _changed(ids, to_status)
+            history.bump(user_id for _, _, user_id in rows)
+        changed += len(rows)
+        last = ids[-1]
+    return changed, selected - changed
+
+
+def reserve_stock(items):
+    """
+    Списывает товар позиций нового заказа с остатка и заполняет
+    item.reserved; вызывается в транзакции оформления до bulk_create.
+    """
+    stock = dict(
+        Product.objects.filter(pk__in={item.product_id for item in items}).values_list('pk', 'stock')
+    )
+    for item in items:
+        item.reserved = min(item.quantity, stock.get(item.product_id, 0))
+        if item.reserved:
+            stock[item.product_id] -= item.reserved
+    _add_stock(items, -1)
+
+
+def _add_stock(lines, sign):
+    """Меняет остаток на sign * reserved; товары с одинаковой суммой — одним UPDATE"""
+    totals = {}
+    for line in lines:
+        if line.reserved:
+            totals[line.product_id] = totals.get(line.product_id, 0) + line.reserved
+    by_amount = {}
+    now = timezone.now()
+    for product_id, amount in totals.items():
+        by_amount.setdefault(amount, []).append(product_id)
+    for amount, product_ids in by_amount.items():
+        # updated_at: остаток выводится в фидах, их сборка ищет изменённые товары по нему
+        Product.objects.filter(pk__in=product_ids).update(stock=F('stock') + sign * amount, updated_at=now)
+
+
+def release_stock(order_ids):
+    """
+    Возвращает на склад зарезервированное заказами и обнуляет резерв:
+    повторный вызов ничего не возвращает дважды. Возвращает число единиц.
+    """
+    with transaction.atomic():
+        lines = OrderItem.objects.filter(order_id__in=order_ids, reserved__gt=0)
+        reserved = list(lines.values_list('product_id', 'reserved'))
+        if not reserved:
+            return 0
+        _add_stock([OrderItem(product_id=product_id, reserved=amount) for product_id, amount in reserved], 1)
+        lines.update(reserved=0)
+    return sum(amount for _, amount in reserved)
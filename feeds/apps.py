@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class FeedsConfig(AppConfig):
+    name = 'feeds'
+    verbose_name = 'Товарные фиды'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,124 @@
+"""
+Сборка файлов фидов (feeds/formats.py) в FEED_ROOT/<формат>.xml.gz.
+
+Товары делятся на пачки по id (id // FEED_CHUNK_SIZE). Предложения пачки
+хранятся в FeedChunk уже сжатыми — отдельным членом gzip; файл фида —
+заголовок, члены пачек по порядку и хвост, склеенные без пересжатия
+(несколько членов подряд — правильный gzip, RFC 1952, его читают gzip,
+zcat и HTTP-клиенты). Файл отдаётся статикой как есть.
+
+Сборка инкрементальная, как пересчёт итогов продаж (analytics/rollup.py):
+Feed.watermark помнит момент начала прошлой сборки, и заново рендерятся
+только пачки товаров с updated_at не раньше него, плюс пачки, помеченные
+stale сигналами (feeds/signals.py): удаление товара, изменения бренда,
+категорий и изображений не меняют updated_at товара.
+"""
+import gzip
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from shop.models import Product
+from tasks import queue
+
+from .formats import FIELDS, FORMATS, Context, Row
+from .models import Feed, FeedChunk
+
+# Сколько номеров пачек в одном IN (...)
+CHUNK_SIZE = 500
+
+
+def path(name):
+    return os.path.join(settings.FEED_ROOT, f'{name}.xml.gz')
+
+
+def _compress(text):
+    # mtime=0: одинаковые предложения дают одинаковые байты
+    return gzip.compress(text.encode(), settings.FEED_COMPRESSLEVEL, mtime=0)
+
+
+def _numbers(products, size):
+    return set(products.annotate(number=F('id') / size).order_by().values_list('number', flat=True).distinct())
+
+
+def render_chunk(feed_format, number, size, context):
+    """Сжатые предложения пачки и их число; (b'', 0), если товаров в пачке нет"""
+    rows = list(
+        Product.objects.filter(id__gte=number * size, id__lt=(number + 1) * size)
+        .order_by('id').values_list(*FIELDS)
+    )
+    if not rows:
+        return b'', 0
+    pictures = context.pictures([row[0] for row in rows])
+    text = ''.join(
+        feed_format.offer(product, pictures.get(product.id, []), context) for product in map(Row._make, rows)
+    )
+    return _compress(text), len(rows)
+
+
+def write(feed, feed_format, context):
+    """Склеивает заголовок, пачки и хвост во временный файл и подменяет фид; возвращает размер"""
+    target = path(feed.name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(_compress(feed_format.header(context)))
+        for data in feed.chunks.order_by('number').values_list('data', flat=True).iterator(chunk_size=50):
+            f.write(data)
+        f.write(_compress(feed_format.footer))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(temp, target)
+    return size
+
+
+def build(name, full=False):
+    """
+    Пересобирает изменившиеся пачки фида (full — все) и файл.
+    Возвращает число пересобранных пачек.
+    """
+    feed_format = FORMATS[name]
+    feed, _ = Feed.objects.get_or_create(name=name)
+    size = settings.FEED_CHUNK_SIZE
+    started = timezone.now()
+    if full or feed.watermark is None or feed.chunk_size != size or not os.path.exists(path(name)):
+        feed.chunks.all().delete()
+        numbers = _numbers(Product.objects.all(), size)
+    else:
+        # Перекрытие: транзакция, начатая до прошлой сборки, могла зафиксироваться после неё
+        since = feed.watermark - timedelta(seconds=settings.FEED_OVERLAP)
+        numbers = _numbers(Product.objects.filter(updated_at__gte=since), size)
+        stale = set(feed.chunks.filter(stale=True).values_list('number', flat=True))
+        # Метка снимается до рендера: поставленная во время сборки дождётся следующей
+        stale_list = sorted(stale)
+        for start in range(0, len(stale_list), CHUNK_SIZE):
+            feed.chunks.filter(number__in=stale_list[start:start + CHUNK_SIZE]).update(stale=False)
+        numbers |= stale
+
+    context = Context()
+    for number in sorted(numbers):
+        data, offers = render_chunk(feed_format, number, size, context)
+        if offers:
+            FeedChunk.objects.update_or_create(feed=feed, number=number, defaults={'offers': offers, 'data': data})
+        else:
+            feed.chunks.filter(number=number).delete()
+        # Полная сборка большого каталога дольше аренды задачи
+        queue.renew()
+
+    file_size = write(feed, feed_format, context)
+    Feed.objects.filter(pk=feed.pk).update(
+        watermark=started, built_at=timezone.now(), chunk_size=size,
+        offers=feed.chunks.aggregate(total=Sum('offers'))['total'] or 0,
+        size=file_size, rebuilt=len(numbers),
+    )
+    return len(numbers)
+
+
+def run(names=None, full=False):
+    """Собирает фиды names (по умолчанию все); возвращает {формат: пересобрано пачек}"""
+    return {name: build(name, full=full) for name in names or FORMATS}
@@ -0,0 +1,189 @@
+"""
+Разметка фидов: YML Яндекс Маркета и RSS 2.0 Google Merchant Center.
+
+Формат отдаёт заголовок файла (магазин, дерево категорий), предложение
+одного товара и хвост. Предложения пишутся строкой за раз и между
+сборками хранятся готовыми (feeds/builder.py), поэтому всё, что в них
+входит, должно зависеть только от товара, его бренда, категорий и
+изображений.
+"""
+from collections import namedtuple
+from decimal import Decimal
+from xml.sax.saxutils import quoteattr
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from shop.models import ProductImage
+from shop.tree import build_tree
+
+# Поля товара, из которых строится предложение
+FIELDS = [
+    'id', 'name', 'slug', 'sku', 'description', 'short_description', 'brand__name', 'category_id',
+    'price', 'old_price', 'stock', 'is_available',
+    'max_speed', 'max_range', 'motor_power', 'battery_capacity', 'weight', 'max_load',
+    'wheel_size', 'waterproof_rating', 'has_app', 'has_cruise_control',
+]
+# Строка values_list(*FIELDS) с доступом по именам
+Row = namedtuple('Row', FIELDS)
+# Характеристика -> (название, единица)
+SPECS = [
+    ('max_speed', 'Максимальная скорость', 'км/ч'),
+    ('max_range', 'Запас хода', 'км'),
+    ('motor_power', 'Мощность мотора', 'Вт'),
+    ('battery_capacity', 'Ёмкость батареи', 'А·ч'),
+    ('weight', 'Вес', 'кг'),
+    ('max_load', 'Максимальная нагрузка', 'кг'),
+    ('wheel_size', 'Диаметр колёс', 'дюйм'),
+    ('waterproof_rating', 'Степень защиты', ''),
+    ('has_app', 'Мобильное приложение', ''),
+    ('has_cruise_control', 'Круиз-контроль', ''),
+]
+# Больше изображений маркетплейсы не принимают
+MAX_PICTURES = 10
+# Описание длиннее обрезается: YML принимает до 3000 символов, Google — до 5000
+MAX_DESCRIPTION = 3000
+
+
+def _text(value):
+    return str(value).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _tag(name, value, attrs=''):
+    if value is None or value == '':
+        return ''
+    return f'<{name}{attrs}>{_text(value)}</{name}>'
+
+
+def _spec_value(value):
+    if value is True:
+        return 'да'
+    if value is False:
+        return 'нет'
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    return value
+
+
+def _category(node):
+    parent = f' parentId="{node.parent_id}"' if node.parent_id else ''
+    return f'<category id="{node.id}"{parent}>{_text(node.name)}</category>'
+
+
+class Context:
+    """Общее для всех предложений одной сборки: адреса, дерево категорий, изображения"""
+
+    def __init__(self):
+        self.site = settings.SITE_URL.rstrip('/')
+        self.tree = build_tree()
+        # reverse() один раз: адрес товара — подстановка slug в шаблон
+        self.product_url = self.site + reverse('shop:product_detail', kwargs={'slug': '__slug__'})
+        # Так же и адрес изображения: storage.url() на каждый файл дороже самого предложения
+        storage = ProductImage._meta.get_field('image').storage
+        image_url = storage.url('__image__')
+        self.image_url = image_url if '://' in image_url else self.site + image_url
+
+    def url(self, slug):
+        return self.product_url.replace('__slug__', slug)
+
+    def image(self, name):
+        return self.image_url.replace('__image__', filepath_to_uri(name))
+
+    def pictures(self, product_ids):
+        """{id товара: [абсолютные адреса изображений, главное первым]} одним запросом"""
+        pictures = {}
+        rows = (
+            ProductImage.objects.filter(product_id__in=product_ids)
+            .order_by('product_id', '-is_main', 'order', 'id').values_list('product_id', 'image')
+        )
+        for product_id, image in rows:
+            urls = pictures.setdefault(product_id, [])
+            if len(urls) < MAX_PICTURES:
+                urls.append(self.image(image))
+        return pictures
+
+    def category_path(self, category_id):
+        node = self.tree.node(category_id)
+        return ' > '.join(item.name for item in node.ancestors(include_self=True)) if node else ''
+
+
+class YmlFormat:
+    name = 'yml'
+    # Открывающие теги характеристик не зависят от товара
+    params = [
+        (field, f'<param name={quoteattr(label)}{f" unit={quoteattr(unit)}" if unit else ""}>')
+        for field, label, unit in SPECS
+    ]
+
+    def header(self, context):
+        categories = ''.join(_category(node) for node in context.tree.nodes.values())
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<yml_catalog date="{timezone.localtime():%Y-%m-%dT%H:%M%z}">'
+            f'<shop>{_tag("name", settings.FEED_SHOP_NAME)}{_tag("company", settings.FEED_COMPANY)}'
+            f'{_tag("url", context.site + "/")}'
+            '<currencies><currency id="RUR" rate="1"/></currencies>'
+            f'<categories>{categories}</categories><offers>\n'
+        )
+
+    def offer(self, product, pictures, context):
+        available = 'true' if product.is_available and product.stock > 0 else 'false'
+        old_price = product.old_price if product.old_price and product.old_price > product.price else None
+        params = ''.join(
+            f'{tag}{_text(_spec_value(value))}</param>'
+            for field, tag in self.params if (value := getattr(product, field)) not in (None, '')
+        )
+        return (
+            f'<offer id="{product.id}" available="{available}">'
+            f'{_tag("url", context.url(product.slug))}{_tag("price", product.price)}{_tag("oldprice", old_price)}'
+            f'<currencyId>RUR</currencyId>{_tag("categoryId", product.category_id)}'
+            f'{"".join(_tag("picture", url) for url in pictures)}'
+            f'{_tag("name", product.name)}{_tag("vendor", product.brand__name)}{_tag("vendorCode", product.sku)}'
+            f'{_tag("description", (product.description or product.short_description)[:MAX_DESCRIPTION])}'
+            f'{_tag("count", product.stock)}{params}</offer>\n'
+        )
+
+    footer = '</offers></shop></yml_catalog>\n'
+
+
+class GoogleFormat:
+    name = 'google'
+
+    def header(self, context):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>'
+            f'{_tag("title", settings.FEED_SHOP_NAME)}{_tag("link", context.site + "/")}'
+            f'{_tag("description", settings.FEED_COMPANY)}\n'
+        )
+
+    def offer(self, product, pictures, context):
+        available = product.is_available and product.stock > 0
+        # Скидка: обычная цена — старая, sale_price — текущая
+        if product.old_price and product.old_price > product.price:
+            price, sale_price = product.old_price, product.price
+        else:
+            price, sale_price = product.price, None
+        details = ''.join(
+            f'<g:product_detail>{_tag("g:attribute_name", label)}'
+            f'{_tag("g:attribute_value", f"{_spec_value(value)} {unit}".strip())}</g:product_detail>'
+            for field, label, unit in SPECS if (value := getattr(product, field)) not in (None, '')
+        )
+        return (
+            f'<item>{_tag("g:id", product.sku)}{_tag("title", f"{product.brand__name} {product.name}")}'
+            f'{_tag("description", (product.description or product.short_description)[:MAX_DESCRIPTION])}'
+            f'{_tag("link", context.url(product.slug))}'
+            f'{_tag("g:image_link", pictures[0] if pictures else "")}'
+            f'{"".join(_tag("g:additional_image_link", url) for url in pictures[1:])}'
+            f'<g:availability>{"in_stock" if available else "out_of_stock"}</g:availability>'
+            f'<g:price>{price} RUB</g:price>{_tag("g:sale_price", f"{sale_price} RUB" if sale_price else "")}'
+            f'{_tag("g:brand", product.brand__name)}{_tag("g:mpn", product.sku)}<g:condition>new</g:condition>'
+            f'{_tag("g:product_type", context.category_path(product.category_id))}{details}</item>\n'
+        )
+
+    footer = '</channel></rss>\n'
+
+
+FORMATS = {format.name: format for format in (YmlFormat(), GoogleFormat())}
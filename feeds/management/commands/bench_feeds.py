@@ -0,0 +1,76 @@
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import time
+from xml.etree.ElementTree import iterparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from feeds import builder
+from feeds.formats import FORMATS
+from shop import synthetic
+
+# Элемент одного предложения в формате
+OFFER_TAGS = {'yml': 'offer', 'google': 'item'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сборка фидов на синтетическом каталоге: полная, без изменений и после '
+        'изменения части товаров; размер файла и проверка, что gzip и XML читаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--images', type=int, default=3, help='Изображений на товар')
+        parser.add_argument('--changed', default='10,100,1000', help='Сколько товаров менять, через запятую')
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp(prefix='bench-feeds-')
+        try:
+            # Без перекрытия: товары только что созданы, с ним каждая сборка брала бы все
+            with override_settings(DEBUG=False, FEED_ROOT=root, FEED_OVERLAP=0), \
+                    synthetic.synthetic_database(name='bench_feeds.sqlite3'):
+                synthetic.populate_catalog(options['products'])
+                synthetic.populate_images(options['images'])
+                synthetic.analyze()
+                self.run([int(n) for n in options['changed'].split(',')])
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def run(self, changes):
+        from shop.models import Product
+
+        product_ids = list(Product.objects.values_list('pk', flat=True))
+        self.stdout.write(f'{"Фид":<8}{"сборка":<22}{"пачек":>7}{"с":>8}{"МиБ":>8}')
+        for name in FORMATS:
+            self.measure(name, 'полная', full=True)
+            self.check_file(name, len(product_ids))
+            self.measure(name, 'без изменений')
+            for count in changes:
+                changed = random.Random(count).sample(product_ids, min(count, len(product_ids)))
+                Product.objects.filter(pk__in=changed).update(price=F('price') + 1, updated_at=timezone.now())
+                self.measure(name, f'изменено {count}')
+            self.check_file(name, len(product_ids))
+
+    def measure(self, name, title, full=False):
+        started = time.perf_counter()
+        chunks = builder.build(name, full=full)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(builder.path(name))
+        self.stdout.write(f'{name:<8}{title:<22}{chunks:>7}{elapsed:>8.2f}{size / 1024 / 1024:>8.1f}')
+
+    def check_file(self, name, expected):
+        offers = 0
+        with gzip.open(builder.path(name)) as f:
+            for _, element in iterparse(f):
+                if element.tag == OFFER_TAGS[name]:
+                    offers += 1
+                    element.clear()
+        if offers != expected:
+            raise CommandError(f'{name}: в файле {offers} предложений, товаров {expected}')
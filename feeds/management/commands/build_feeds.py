@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from feeds import builder
+from feeds.formats import FORMATS
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает фиды для маркетплейсов из изменившихся товаров. '
+        'Для cron; задача feeds.build делает то же в очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересобрать все пачки')
+        parser.add_argument('--feed', action='append', choices=FORMATS, help='Только этот фид; можно несколько')
+
+    def handle(self, *args, **options):
+        for name in options['feed'] or FORMATS:
+            started = time.perf_counter()
+            chunks = builder.build(name, full=options['full'])
+            self.stdout.write(
+                f'{builder.path(name)}: пересобрано пачек {chunks} за {time.perf_counter() - started:.1f} с'
+            )
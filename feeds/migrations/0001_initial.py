@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feed',
+            fields=[
+                ('name', models.CharField(choices=[('yml', 'Яндекс Маркет (YML)'), ('google', 'Google Merchant')], max_length=20, primary_key=True, serialize=False, verbose_name='Формат')),
+                ('watermark', models.DateTimeField(blank=True, null=True, verbose_name='Учтены изменения до')),
+                ('built_at', models.DateTimeField(blank=True, null=True, verbose_name='Собран')),
+                ('chunk_size', models.PositiveIntegerField(default=0, verbose_name='Товаров в пачке')),
+                ('offers', models.PositiveIntegerField(default=0, verbose_name='Товаров')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер файла, байт')),
+                ('rebuilt', models.PositiveIntegerField(default=0, verbose_name='Пачек пересобрано')),
+            ],
+            options={
+                'verbose_name': 'Фид',
+                'verbose_name_plural': 'Фиды',
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер пачки')),
+                ('offers', models.PositiveIntegerField(default=0, verbose_name='Товаров')),
+                ('data', models.BinaryField(verbose_name='Сжатые предложения')),
+                ('stale', models.BooleanField(default=False, verbose_name='Пересобрать')),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='feeds.feed', verbose_name='Фид')),
+            ],
+            options={
+                'verbose_name': 'Пачка фида',
+                'verbose_name_plural': 'Пачки фида',
+                'constraints': [models.UniqueConstraint(fields=('feed', 'number'), name='feedchunk_unique')],
+            },
+        ),
+    ]
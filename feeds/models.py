@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class Feed(models.Model):
+    """Файл фида для маркетплейсов: состояние последней сборки"""
+    FORMAT_CHOICES = [
+        ('yml', 'Яндекс Маркет (YML)'),
+        ('google', 'Google Merchant'),
+    ]
+
+    name = models.CharField('Формат', max_length=20, choices=FORMAT_CHOICES, primary_key=True)
+    watermark = models.DateTimeField('Учтены изменения до', null=True, blank=True)
+    built_at = models.DateTimeField('Собран', null=True, blank=True)
+    # Размер пачки, с которым нарезаны куски; другой размер — полная сборка
+    chunk_size = models.PositiveIntegerField('Товаров в пачке', default=0)
+    offers = models.PositiveIntegerField('Товаров', default=0)
+    size = models.PositiveBigIntegerField('Размер файла, байт', default=0)
+    rebuilt = models.PositiveIntegerField('Пачек пересобрано', default=0)
+
+    class Meta:
+        verbose_name = 'Фид'
+        verbose_name_plural = 'Фиды'
+
+    def __str__(self):
+        return self.get_name_display()
+
+
+class FeedChunk(models.Model):
+    """
+    Готовые предложения пачки товаров (id // chunk_size == number) —
+    отдельный член gzip; файл фида склеивается из них без пересжатия
+    """
+    feed = models.ForeignKey(Feed, on_delete=models.CASCADE, related_name='chunks', verbose_name='Фид')
+    number = models.PositiveIntegerField('Номер пачки')
+    offers = models.PositiveIntegerField('Товаров', default=0)
+    data = models.BinaryField('Сжатые предложения')
+    # Изменились бренд, категории или изображения: updated_at товара этого не видит
+    stale = models.BooleanField('Пересобрать', default=False)
+
+    class Meta:
+        verbose_name = 'Пачка фида'
+        verbose_name_plural = 'Пачки фида'
+        constraints = [
+            models.UniqueConstraint(fields=['feed', 'number'], name='feedchunk_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.feed_id} #{self.number}'
@@ -0,0 +1,61 @@
+"""
+Изменения каталога ставят сборку фидов (feeds/builder.py). Изменённые
+товары сборка находит по updated_at; остальное помечает пачки stale.
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shop.bulk import products_bulk_updated
+from shop.models import Brand, Category, Product, ProductImage
+
+from .models import FeedChunk
+from .tasks import schedule
+
+
+def mark_stale(product_ids=None):
+    """Помечает пачки товаров product_ids (None — все пачки) к пересборке"""
+    chunks = FeedChunk.objects.all()
+    if product_ids is not None:
+        chunks = chunks.filter(number__in={pk // settings.FEED_CHUNK_SIZE for pk in product_ids})
+    chunks.update(stale=True)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule()
+
+
+@receiver(products_bulk_updated, sender=Product)
+def products_bulk_changed(sender, ids, **kwargs):
+    schedule()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # Удалённого товара нет среди изменённых по updated_at
+    mark_stale([instance.pk])
+    schedule()
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def image_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_stale([instance.product_id])
+        schedule()
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_stale(Product.objects.filter(brand=instance).values_list('pk', flat=True))
+        schedule()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, raw=False, **kwargs):
+    # Путь категории (g:product_type) есть в предложениях всех её потомков
+    if not raw:
+        mark_stale()
+        schedule()
@@ -0,0 +1,17 @@
+"""Фоновые задачи фидов; регистрируются при запуске (tasks.apps)"""
+from django.conf import settings
+
+from tasks.queue import task
+
+from . import builder
+
+
+@task(name='feeds.build', priority=-5, max_attempts=2, lease=1800)
+def build_feeds(full=False):
+    """Пересборка фидов (см. manage.py build_feeds)"""
+    builder.run(full=full)
+
+
+def schedule():
+    """Сборка через FEED_BUILD_DELAY; изменения за это время сливаются в одну задачу"""
+    build_feeds.enqueue(dedupe_key='feeds-build', countdown=settings.FEED_BUILD_DELAY)
@@ -0,0 +1,48 @@
+from django.contrib import admin, messages
+
+from shop.admin_utils import LargeTableAdminMixin
+from .models import Campaign, Delivery
+from .sending import retry_failed
+from .tasks import enqueue_campaign
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'total', 'sent', 'failed', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['subject']
+    readonly_fields = ['status', 'total', 'sent', 'failed', 'created_at', 'started_at', 'finished_at']
+    actions = ['send_campaigns', 'retry_failed_deliveries']
+
+    @admin.action(description='Отправить подписчикам')
+    def send_campaigns(self, request, queryset):
+        campaigns = list(queryset.exclude(status='sent'))
+        for campaign in campaigns:
+            enqueue_campaign(campaign.pk)
+        self.message_user(
+            request, f'Рассылок поставлено в очередь: {len(campaigns)}. Отправляет manage.py run_workers',
+            messages.SUCCESS,
+        )
+
+    @admin.action(description='Повторить письма с ошибкой')
+    def retry_failed_deliveries(self, request, queryset):
+        retried = 0
+        for campaign in queryset:
+            count = retry_failed(campaign)
+            if count:
+                enqueue_campaign(campaign.pk)
+            retried += count
+        self.message_user(request, f'Писем возвращено в отправку: {retried}', messages.SUCCESS)
+
+
+@admin.register(Delivery)
+class DeliveryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['email', 'kind', 'status', 'campaign', 'order', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['campaign', 'order']
+    search_fields = ['=email', '=key']
+    raw_id_fields = ['campaign', 'user', 'order']
+    readonly_fields = ['kind', 'campaign', 'user', 'order', 'key', 'email', 'status', 'error', 'created_at', 'sent_at']
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class MailerConfig(AppConfig):
+    name = 'mailer'
+    verbose_name = 'Письма'
+
+    def ready(self):
+        from . import signals  # noqa: F401
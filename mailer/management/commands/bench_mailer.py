@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from mailer import sending
+from mailer.models import Campaign, Delivery
+from mailer.smtp import SinkServer
+from shop import synthetic
+
+TEXT = 'Здравствуйте, {{ first_name|default:"покупатель" }}!\n\nНовые самокаты уже в каталоге.\n\nОтписаться: {{ unsubscribe_url }}'
+HTML = '<p>Здравствуйте, {{ first_name|default:"покупатель" }}!</p><p>Новые самокаты уже в каталоге.</p>'
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность рассылки (mailer/sending.py) на синтетической базе '
+        'через локальный отладочный SMTP: создание писем, отправка с продолжением '
+        'после прерывания и сравнение с соединением на каждое письмо'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--baseline', type=int, default=1000,
+                            help='Писем для замера с отдельным соединением на каждое')
+
+    def handle(self, *args, **options):
+        sink = SinkServer(('127.0.0.1', 0))
+        sink.start()
+        smtp = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=sink.port, EMAIL_USE_TLS=False,
+            MAILER_RATE_LIMIT=0, MAILER_BATCH_PAUSE=0,
+        )
+        try:
+            with smtp, synthetic.synthetic_database(name='bench_mailer.sqlite3'):
+                # Подписан каждый пользователь, кроме каждого третьего
+                synthetic.populate_users(options['subscribers'] * 3 // 2)
+                synthetic.analyze()
+                self.run(sink, options)
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+    def run(self, sink, options):
+        campaign = Campaign.objects.create(subject='Новинки сезона', text_body=TEXT, html_body=HTML)
+
+        started = time.perf_counter()
+        total = sending.prepare_campaign(campaign)
+        self.stdout.write(f'Получателей: {total}, письма созданы за {time.perf_counter() - started:.1f} с')
+
+        # Отправка прерывается после трёх пачек и продолжается
+        started = time.perf_counter()
+        sending.send_campaign(campaign.pk, max_batches=3, batch_size=options['batch_size'])
+        interrupted = sink.received
+        sending.send_campaign(campaign.pk, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено: {sink.received} писем за {elapsed:.1f} с, {sink.received / elapsed:.0f} писем/с, '
+            f'SMTP-соединений: {sink.connections} (прервано после {interrupted})'
+        ))
+
+        campaign.refresh_from_db()
+        sent = Delivery.objects.filter(campaign=campaign, status='sent').count()
+        if campaign.status != 'sent' or sent != total or sink.received != total:
+            raise CommandError(
+                f'Рассылка не сошлась: статус {campaign.status}, отмечено {sent}, '
+                f'принято сервером {sink.received}, получателей {total}'
+            )
+
+        # Для сравнения: отдельное соединение на каждое письмо
+        renderer = sending.CampaignRenderer(campaign)
+        rows = Delivery.objects.filter(campaign=campaign).values_list('email', 'user_id')[:options['baseline']]
+        started = time.perf_counter()
+        for email, user_id in rows:
+            renderer.message(email, user_id, '').send()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Соединение на каждое письмо: {len(rows) / elapsed:.0f} писем/с')
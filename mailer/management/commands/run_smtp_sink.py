@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mailer.smtp import SinkServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Отладочный SMTP-сервер на EMAIL_HOST:EMAIL_PORT: принимает письма, '
+        'печатает получателя и тему и никуда их не отправляет'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=settings.EMAIL_PORT)
+        parser.add_argument('--refuse', action='append', default=[], metavar='TEXT',
+                            help='Отклонять получателей, в адресе которых есть TEXT')
+        parser.add_argument('--quiet', action='store_true', help='Не печатать письма, только счётчик')
+
+    def handle(self, *args, **options):
+        def show(recipients, message):
+            if not options['quiet']:
+                self.stdout.write(f'{", ".join(recipients)}: {message["Subject"]}')
+
+        server = SinkServer(('127.0.0.1', options['port']), refuse=options['refuse'], on_message=show)
+        self.stdout.write(f'SMTP на 127.0.0.1:{server.port}, Ctrl+C — остановить')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Принято писем: {server.received}, соединений: {server.connections}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mailer import sending
+from mailer.models import Campaign
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет рассылку в этом процессе, без очереди задач. Прерванная '
+        'отправка продолжается с первого неотправленного письма'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_id', type=int)
+        parser.add_argument('--batches', type=int, default=None, help='Отправить не больше N пачек')
+        parser.add_argument('--retry-failed', action='store_true', help='Повторить письма с ошибкой')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = Campaign.objects.get(pk=options['campaign_id'])
+        except Campaign.DoesNotExist:
+            raise CommandError(f'Рассылка {options["campaign_id"]} не найдена')
+        if options['retry_failed']:
+            self.stdout.write(f'Возвращено в отправку: {sending.retry_failed(campaign)}')
+        finished = sending.send_campaign(campaign.pk, max_batches=options['batches'])
+        campaign.refresh_from_db()
+        self.stdout.write(
+            f'{campaign}: отправлено {campaign.sent}/{campaign.total}, ошибок {campaign.failed}'
+            + ('' if finished else ' — не завершена')
+        )
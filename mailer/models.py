@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+
+class Campaign(models.Model):
+    """Рассылка подписчикам (newsletter_subscribed)"""
+    STATUS_CHOICES = [
+        ('draft', 'Черновик'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлена'),
+    ]
+
+    subject = models.CharField('Тема', max_length=200)
+    text_body = models.TextField(
+        'Текст письма',
+        help_text='Шаблон Django: {{ first_name }}, {{ unsubscribe_url }}'
+    )
+    html_body = models.TextField('HTML-версия', blank=True, help_text='Необязательно, тот же синтаксис')
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='draft')
+    total = models.PositiveIntegerField('Получателей', default=0)
+    sent = models.PositiveIntegerField('Отправлено', default=0)
+    failed = models.PositiveIntegerField('Ошибок', default=0)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    started_at = models.DateTimeField('Начата', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Рассылка'
+        verbose_name_plural = 'Рассылки'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class Delivery(models.Model):
+    """Письмо одному получателю: по нему продолжается прерванная отправка"""
+    KIND_CHOICES = [
+        ('order_confirmation', 'Подтверждение заказа'),
+        ('order_status', 'Статус заказа'),
+        ('newsletter', 'Рассылка'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    kind = models.CharField('Тип', max_length=20, choices=KIND_CHOICES)
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='deliveries',
+        verbose_name='Рассылка'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='deliveries',
+        verbose_name='Пользователь'
+    )
+    order = models.ForeignKey(
+        'cart.Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='deliveries',
+        verbose_name='Заказ'
+    )
+    # Для писем о заказах: одно письмо на событие, даже если задачу повторили
+    key = models.CharField('Ключ', max_length=100, null=True, blank=True, unique=True)
+    email = models.EmailField('Email')
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Письма'
+        ordering = ['-created_at']
+        indexes = [
+            # Следующая пачка неотправленных писем рассылки
+            models.Index(fields=['campaign', 'status', 'id'], name='delivery_campaign_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campaign', 'user'], condition=Q(campaign__isnull=False), name='delivery_campaign_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.email}'
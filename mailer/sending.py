@@ -0,0 +1,269 @@
+"""
+Отправка писем о заказах и рассылок.
+
+Письмо о заказе — одна запись Delivery с ключом события
+(order:<id>:order_status:shipped): повтор задачи после сбоя не отправит
+письмо второй раз. Рассылка сначала создаёт Delivery на каждого
+подписчика (пользователи читаются iterator() пачками по
+MAILER_CHUNK_SIZE, письма вставляются bulk_create), затем отправляет
+неотправленные пачками по MAILER_BATCH_SIZE: одно SMTP-соединение на
+пачку, не больше MAILER_RATE_LIMIT писем в секунду. Статусы пачки
+записываются двумя UPDATE после неё, поэтому прерванная отправка
+продолжается с первой незаписанной пачки — повторно может уйти не
+больше одной пачки.
+
+Отказ сервера принять конкретного получателя помечает письмо failed,
+обрыв соединения прерывает отправку: задача повторится и продолжит.
+Для проверки локально: manage.py run_smtp_sink.
+"""
+import smtplib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.template import Context, Template
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Campaign, Delivery
+
+# Ошибки одного получателя: письмо помечается failed, отправка продолжается.
+# Остальные (обрыв, таймаут) прерывают её — повтор продолжит с той же пачки
+RECIPIENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+UNSUBSCRIBE_SALT = 'mailer.unsubscribe'
+
+
+class Throttle:
+    """Не больше rate писем в секунду; 0 — без ограничения"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval
+
+
+def absolute_url(path):
+    return settings.SITE_URL.rstrip('/') + path
+
+
+def unsubscribe_url(user_id):
+    return absolute_url(reverse('mailer:unsubscribe', args=[signing.dumps(user_id, salt=UNSUBSCRIBE_SALT)]))
+
+
+def unsubscribe_user_id(token):
+    """id пользователя из ссылки отписки или None, если подпись не сходится"""
+    try:
+        return signing.loads(token, salt=UNSUBSCRIBE_SALT)
+    except signing.BadSignature:
+        return None
+
+
+# Письма о заказах
+
+def order_message(order, kind, status=None):
+    from cart.models import Order
+
+    context = {
+        'order': order,
+        'items': order.items.all(),
+        'status': status,
+        'status_label': dict(Order.STATUS_CHOICES).get(status, ''),
+        'orders_url': absolute_url(reverse('shop:orders')),
+        'site_url': settings.SITE_URL,
+    }
+    subject = render_to_string(f'mailer/{kind}_subject.txt', context).strip()
+    message = EmailMultiAlternatives(subject, render_to_string(f'mailer/{kind}.txt', context), to=[order.email])
+    message.attach_alternative(render_to_string(f'mailer/{kind}.html', context), 'text/html')
+    return message
+
+
+def _orders(order_ids):
+    from cart.models import Order
+
+    return Order.objects.filter(pk__in=order_ids).exclude(email='').prefetch_related('items')
+
+
+def _send_order(order, kind, status, connection=None):
+    key = f'order:{order.pk}:{kind}' + (f':{status}' if status else '')
+    delivery, _ = Delivery.objects.get_or_create(
+        key=key, defaults={'kind': kind, 'order': order, 'user_id': order.user_id, 'email': order.email},
+    )
+    if delivery.status != 'pending':
+        return delivery
+    message = order_message(order, kind, status)
+    message.connection = connection
+    try:
+        message.send()
+    except RECIPIENT_ERRORS as exc:
+        delivery.status, delivery.error = 'failed', str(exc)
+    else:
+        delivery.status, delivery.sent_at = 'sent', timezone.now()
+    Delivery.objects.filter(pk=delivery.pk).update(
+        status=delivery.status, error=delivery.error, sent_at=delivery.sent_at,
+    )
+    return delivery
+
+
+def send_order_email(order_id, kind, status=None):
+    """Письмо о заказе: подтверждение или смена статуса; не отправляется дважды"""
+    order = _orders([order_id]).first()
+    if order is None:
+        return None
+    return _send_order(order, kind, status)
+
+
+def send_order_emails(order_ids, kind, status=None):
+    """Письма по пачке заказов через одно SMTP-соединение"""
+    connection = get_connection()
+    connection.open()
+    try:
+        for order in _orders(order_ids):
+            _send_order(order, kind, status, connection)
+    finally:
+        connection.close()
+
+
+# Рассылки
+
+def prepare_campaign(campaign, chunk_size=None):
+    """
+    Создаёт письма всем подписчикам; повторный вызов добавляет только
+    тех, кого ещё нет. Возвращает число получателей.
+    """
+    chunk_size = chunk_size or settings.MAILER_CHUNK_SIZE
+    subscribers = (
+        get_user_model().objects
+        .filter(newsletter_subscribed=True, is_active=True).exclude(email='')
+        .order_by('pk').values_list('pk', 'email')
+    )
+    batch = []
+    for user_id, email in subscribers.iterator(chunk_size=chunk_size):
+        batch.append(Delivery(kind='newsletter', campaign_id=campaign.pk, user_id=user_id, email=email))
+        if len(batch) >= chunk_size:
+            Delivery.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Delivery.objects.bulk_create(batch, ignore_conflicts=True)
+    total = Delivery.objects.filter(campaign_id=campaign.pk).count()
+    Campaign.objects.filter(pk=campaign.pk).update(total=total)
+    return total
+
+
+class CampaignRenderer:
+    """Шаблоны рассылки компилируются один раз на отправку"""
+
+    def __init__(self, campaign):
+        self.subject = campaign.subject
+        self.text = Template(campaign.text_body)
+        self.html = Template(campaign.html_body) if campaign.html_body else None
+        self.layout = get_template('mailer/newsletter.html')
+
+    def message(self, email, user_id, first_name):
+        url = unsubscribe_url(user_id) if user_id else ''
+        context = {'first_name': first_name, 'unsubscribe_url': url}
+        headers = {}
+        if url:
+            headers = {'List-Unsubscribe': f'<{url}>', 'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click'}
+        message = EmailMultiAlternatives(self.subject, self.text.render(Context(context)), to=[email], headers=headers)
+        if self.html is not None:
+            body = self.html.render(Context(context))
+            message.attach_alternative(
+                self.layout.render({**context, 'body': body, 'site_url': settings.SITE_URL}), 'text/html',
+            )
+        return message
+
+
+def _record(campaign_id, sent, failed):
+    now = timezone.now()
+    if sent:
+        Delivery.objects.filter(pk__in=sent).update(status='sent', sent_at=now)
+    for pk, error in failed.items():
+        Delivery.objects.filter(pk=pk).update(status='failed', error=error)
+    Campaign.objects.filter(pk=campaign_id).update(sent=F('sent') + len(sent), failed=F('failed') + len(failed))
+
+
+def send_batch(campaign_id, renderer, batch, throttle, connection=None):
+    """
+    Отправляет пачку [(id письма, email, id пользователя, имя)] через одно
+    соединение и записывает статусы. Возвращает (отправлено, ошибок).
+    """
+    connection = connection or get_connection()
+    sent, failed = [], {}
+    connection.open()
+    try:
+        for pk, email, user_id, first_name in batch:
+            throttle.wait()
+            message = renderer.message(email, user_id, first_name)
+            message.connection = connection
+            try:
+                message.send()
+            except RECIPIENT_ERRORS as exc:
+                failed[pk] = str(exc)
+            else:
+                sent.append(pk)
+    finally:
+        connection.close()
+        # И после обрыва: отправленное не уйдёт повторно
+        _record(campaign_id, sent, failed)
+    return len(sent), len(failed)
+
+
+def send_campaign(campaign_id, max_batches=None, batch_size=None):
+    """
+    Отправляет неотправленные письма рассылки; max_batches ограничивает
+    число пачек за вызов. Возвращает True, когда рассылка завершена.
+    """
+    campaign = Campaign.objects.get(pk=campaign_id)
+    if campaign.status == 'sent':
+        return True
+    if campaign.status == 'draft':
+        Campaign.objects.filter(pk=campaign.pk).update(status='sending', started_at=timezone.now())
+    if not campaign.total:
+        # Получатели ещё не созданы или создание прервалось
+        prepare_campaign(campaign)
+
+    batch_size = batch_size or settings.MAILER_BATCH_SIZE
+    renderer = CampaignRenderer(campaign)
+    throttle = Throttle(settings.MAILER_RATE_LIMIT)
+    pending = (
+        Delivery.objects.filter(campaign_id=campaign.pk, status='pending')
+        .order_by('pk').values_list('pk', 'email', 'user_id', 'user__first_name')
+    )
+    last = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = list(pending.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            Campaign.objects.filter(pk=campaign.pk).update(status='sent', finished_at=timezone.now())
+            return True
+        send_batch(campaign.pk, renderer, batch, throttle)
+        last = batch[-1][0]
+        batches += 1
+        if settings.MAILER_BATCH_PAUSE:
+            time.sleep(settings.MAILER_BATCH_PAUSE)
+    if not pending.filter(pk__gt=last).exists():
+        Campaign.objects.filter(pk=campaign.pk).update(status='sent', finished_at=timezone.now())
+        return True
+    return False
+
+
+def retry_failed(campaign):
+    """Возвращает письма с ошибкой в отправку"""
+    retried = Delivery.objects.filter(campaign_id=campaign.pk, status='failed').update(status='pending', error='')
+    if retried:
+        Campaign.objects.filter(pk=campaign.pk).update(
+            status='sending', failed=F('failed') - retried, finished_at=None,
+        )
+    return retried
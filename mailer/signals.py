@@ -0,0 +1,14 @@
+"""Подтверждение заказа; письма о смене статуса отправляет cart/workflow.py"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from cart.models import Order
+
+from .tasks import order_email
+
+
+@receiver(post_save, sender=Order)
+def confirm_order(sender, instance, created, raw=False, **kwargs):
+    # Задача ставится после коммита: обработчик увидит и позиции заказа
+    if created and not raw:
+        order_email.delay(instance.pk, 'order_confirmation')
@@ -0,0 +1,89 @@
+"""
+Отладочный SMTP-сервер: принимает письма и никуда их не отправляет.
+
+Нужен для проверки отправки локально (manage.py run_smtp_sink) и для
+замера пропускной способности (manage.py bench_mailer). Поддерживает
+ровно то, что использует smtplib без TLS и авторизации. Получателей,
+адрес которых содержит одну из строк refuse, отклоняет кодом 550 —
+так проверяется обработка ошибок отдельных писем.
+"""
+import socketserver
+import threading
+from email import message_from_bytes, policy
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 scootermall debugging SMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b'HELO', b'EHLO'):
+                self.reply('250 sink')
+            elif command == b'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif command == b'RCPT':
+                address = line[8:].decode(errors='replace').strip()
+                if any(part in address for part in server.refuse):
+                    self.reply('550 Mailbox unavailable')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for line in self.rfile:
+                    if line == b'.\r\n':
+                        break
+                    data.append(line[1:] if line.startswith(b'..') else line)
+                server.deliver(recipients, b''.join(data))
+                recipients = []
+                self.reply('250 OK')
+            elif command in (b'RSET', b'NOOP'):
+                recipients = []
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    """on_message(recipients, message) вызывается на каждое принятое письмо"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 1025), refuse=(), on_message=None):
+        super().__init__(address, SinkHandler)
+        self.refuse = tuple(refuse)
+        self.on_message = on_message
+        self.lock = threading.Lock()
+        self.received = 0
+        self.connections = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def deliver(self, recipients, data):
+        with self.lock:
+            self.received += 1
+        if self.on_message:
+            self.on_message(recipients, message_from_bytes(data, policy=policy.default))
+
+    def start(self):
+        """Запуск в фоновом потоке; остановка — shutdown()"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
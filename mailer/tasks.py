@@ -0,0 +1,25 @@
+"""Фоновые задачи писем; регистрируются при запуске (tasks.apps)"""
+from django.conf import settings
+
+from tasks.queue import task
+
+from . import sending
+
+
+@task(name='mailer.order_email', priority=5, max_attempts=5, backoff=30)
+def order_email(order_id, kind, status=None):
+    sending.send_order_email(order_id, kind, status)
+
+
+@task(name='mailer.send_campaign', max_attempts=10, backoff=60)
+def send_campaign(campaign_id):
+    """
+    Отправляет MAILER_BATCHES_PER_TASK пачек и ставит себя в очередь снова:
+    задача короче аренды, а другие задачи не ждут всю рассылку.
+    """
+    if not sending.send_campaign(campaign_id, max_batches=settings.MAILER_BATCHES_PER_TASK):
+        enqueue_campaign(campaign_id)
+
+
+def enqueue_campaign(campaign_id):
+    return send_campaign.enqueue(args=[campaign_id], dedupe_key=f'mailer.campaign:{campaign_id}')
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+
+from .sending import unsubscribe_user_id
+
+
+@csrf_exempt
+def unsubscribe(request, token):
+    """
+    Отписка по ссылке из письма. GET показывает кнопку, POST отписывает —
+    в том числе one-click из почтового клиента (List-Unsubscribe-Post),
+    поэтому без CSRF: подписанный токен и так подтверждает пользователя.
+    """
+    user_id = unsubscribe_user_id(token)
+    if user_id is None:
+        raise Http404('Ссылка недействительна')
+    users = get_user_model().objects.filter(pk=user_id)
+    if not users.exists():
+        raise Http404('Ссылка недействительна')
+    done = False
+    if request.method == 'POST':
+        users.update(newsletter_subscribed=False)
+        done = True
+    return render(request, 'mailer/unsubscribe.html', {'done': done})
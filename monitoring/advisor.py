@@ -0,0 +1,220 @@
+"""
+Советник по индексам: разбирает журнал медленных запросов и предлагает
+составные и частичные индексы для таблиц, которые читаются целиком.
+
+Разбор рассчитан на SQL, который генерирует ORM Django: условия вида
+"table"."column" = %s и ORDER BY "table"."column" DESC.
+"""
+import hashlib
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import connections, models
+from django.db.models import Q
+
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+_TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+_CONDITION_RE = re.compile(
+    r'"(?P<table>\w+)"\."(?P<column>\w+)"\s*'
+    r'(?P<op>=|IN\s*\(|IS NULL|>=|<=|>|<)'
+)
+# Django пишет filter(flag=True) как "t"."flag", а filter(flag=False) как NOT "t"."flag"
+_BOOL_RE = re.compile(
+    r'(?P<not>NOT\s+)?"(?P<table>\w+)"\."(?P<column>\w+)"(?=\s*(?:AND\b|OR\b|\)|$))'
+)
+_ORDER_RE = re.compile(r'"(?P<table>\w+)"\."(?P<column>\w+)"(?P<desc>\s+DESC)?')
+
+
+class Proposal:
+    """Предлагаемый индекс и запросы, которым он поможет"""
+
+    def __init__(self, table, equality, ordering, condition):
+        self.table = table
+        self.equality = equality
+        self.ordering = ordering
+        self.condition = condition
+        self.entries = []
+
+    @property
+    def key(self):
+        return (self.table, tuple(self.equality), tuple(self.ordering), self.condition)
+
+    @property
+    def columns(self):
+        columns = list(self.equality)
+        for column, _ in self.ordering:
+            if column not in columns:
+                columns.append(column)
+        return columns
+
+    @property
+    def name(self):
+        # Как у Django: не длиннее 30 символов, с хешем для уникальности
+        digest = hashlib.md5(repr(self.key).encode()).hexdigest()[:6]
+        short = '_'.join(column[:4] for column in self.columns)[:8]
+        return f'{self.table[:10]}_{short}_{digest}_idx'
+
+    @property
+    def total_ms(self):
+        return sum(entry['ms'] for entry in self.entries)
+
+    def index(self):
+        """models.Index для модели таблицы (None, если модель не найдена)"""
+        model = _model_for_table(self.table)
+        if model is None:
+            return None, None
+        ordering = dict(self.ordering)
+        fields = [
+            ('-' if ordering.get(column) else '') + _field_name(model, column)
+            for column in self.columns
+        ]
+        condition = None
+        if self.condition:
+            column, value = self.condition
+            condition = Q(**{_field_name(model, column): value})
+        return model, models.Index(fields=fields, condition=condition, name=self.name)
+
+    def create_sql(self, connection=None):
+        """
+        CREATE INDEX в том виде, в каком его создаст миграция.
+
+        Условие частичного индекса должно совпадать с WHERE запросов
+        буквально (SQLite не выводит "flag" = 1 из "flag"), поэтому SQL
+        строится тем же schema_editor, что и запросы ORM.
+        """
+        model, index = self.index()
+        if index is None:
+            return None
+        with (connection or connections['default']).schema_editor(collect_sql=True) as editor:
+            return str(index.create_sql(model, editor))
+
+    def django_index(self):
+        model, index = self.index()
+        if index is None:
+            return None
+        fields = ', '.join(f"'{field}'" for field in index.fields)
+        code = f"models.Index(fields=[{fields}]"
+        if index.condition is not None:
+            (field, value), = index.condition.children
+            code += f", condition=Q({field}={value!r})"
+        return code + f", name='{index.name}')"
+
+
+def _model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def _field_name(model, column):
+    if model is not None:
+        for field in model._meta.concrete_fields:
+            if field.column == column:
+                return field.name
+    return column
+
+
+def _is_boolean(table, column):
+    model = _model_for_table(table)
+    if model is None:
+        return False
+    for field in model._meta.concrete_fields:
+        if field.column == column:
+            return isinstance(field, models.BooleanField)
+    return False
+
+
+def full_scans(plan):
+    """Таблицы, которые план читает целиком"""
+    tables = []
+    for line in plan:
+        match = _SCAN_RE.match(line.strip())
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def needs_sort(plan):
+    return any(_TEMP_SORT in line for line in plan)
+
+
+def _split_sql(sql):
+    upper = sql.upper()
+    where_at = upper.find(' WHERE ')
+    order_at = upper.rfind(' ORDER BY ')
+    limit_at = upper.rfind(' LIMIT ')
+    where = ''
+    if where_at != -1:
+        end = order_at if order_at > where_at else (limit_at if limit_at > where_at else len(sql))
+        where = sql[where_at + 7:end]
+    order = ''
+    if order_at != -1:
+        order = sql[order_at + 10:limit_at if limit_at > order_at else len(sql)]
+    return where, order
+
+
+def analyze_entry(entry, table):
+    """Колонки равенства, сортировки и условие частичного индекса для таблицы"""
+    where, order = _split_sql(entry['sql'])
+    condition = None
+    for match in _BOOL_RE.finditer(where):
+        if match.group('table') == table and _is_boolean(table, match.group('column')):
+            condition = (match.group('column'), not match.group('not'))
+            break
+    equality = []
+    for match in _CONDITION_RE.finditer(where):
+        op = match.group('op')
+        if match.group('table') != table:
+            continue
+        column = match.group('column')
+        if op in ('=', 'IS NULL') or op.startswith('IN'):
+            if column not in equality:
+                equality.append(column)
+    ordering = []
+    for match in _ORDER_RE.finditer(order):
+        if match.group('table') == table:
+            ordering.append((match.group('column'), bool(match.group('desc'))))
+    if not ordering:
+        # Диапазонное условие без сортировки — последняя колонка индекса
+        for match in _CONDITION_RE.finditer(where):
+            if match.group('table') == table and match.group('op') in ('>=', '<=', '>', '<'):
+                ordering.append((match.group('column'), False))
+                break
+    return equality, ordering, condition
+
+
+def propose(entries):
+    """Группирует записи журнала в предложения индексов"""
+    proposals = {}
+    for entry in entries:
+        plan = entry.get('plan') or []
+        tables = full_scans(plan)
+        if not tables and needs_sort(plan):
+            # Индекс нужен таблице, по колонкам которой идёт сортировка
+            _, order = _split_sql(entry['sql'])
+            match = _ORDER_RE.search(order)
+            if match:
+                tables.append(match.group('table'))
+        for table in tables:
+            equality, ordering, condition = analyze_entry(entry, table)
+            if not equality and not ordering:
+                continue
+            proposal = Proposal(table, equality, ordering, condition)
+            proposal = proposals.setdefault(proposal.key, proposal)
+            proposal.entries.append(entry)
+    return sorted(proposals.values(), key=lambda p: p.total_ms, reverse=True)
+
+
+def summarize(entries):
+    """Сводка журнала по отпечаткам запросов"""
+    groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': set()})
+    for entry in entries:
+        group = groups[entry['fingerprint']]
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['max_ms'] = max(group['max_ms'], entry['ms'])
+        group['views'].add(entry.get('view') or '-')
+        group['plan'] = entry.get('plan') or []
+    return sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)
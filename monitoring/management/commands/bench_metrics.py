@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from monitoring.middleware import MetricsMiddleware
+
+BUDGET_US = 50
+
+
+def view(request):
+    return HttpResponse('ok')
+
+
+class Command(BaseCommand):
+    help = 'Измеряет накладные расходы MetricsMiddleware на один запрос'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50000)
+        parser.add_argument('--path', default='/catalog/')
+
+    def run(self, handler, requests, count):
+        started = time.perf_counter()
+        for request in requests[:count]:
+            handler(request)
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        factory = RequestFactory()
+        match = resolve(options['path'])
+        requests = []
+        for _ in range(count):
+            request = factory.get(options['path'])
+            request.resolver_match = match
+            requests.append(request)
+
+        with override_settings(METRICS_ENABLED=True, METRICS_DIR=None):
+            instrumented = MetricsMiddleware(view)
+            # Прогрев: создание серий и первые аллокации не входят в замер
+            self.run(instrumented, requests, 1000)
+            self.run(view, requests, 1000)
+
+            baseline = min(self.run(view, requests, count) for _ in range(3))
+            measured = min(self.run(instrumented, requests, count) for _ in range(3))
+
+        overhead_us = (measured - baseline) / count * 1e6
+        self.stdout.write(f'Без метрик: {baseline / count * 1e6:.2f} мкс/запрос')
+        self.stdout.write(f'С метриками: {measured / count * 1e6:.2f} мкс/запрос')
+        self.stdout.write(f'Накладные расходы: {overhead_us:.2f} мкс/запрос (бюджет {BUDGET_US})')
+        if overhead_us > BUDGET_US:
+            raise CommandError('Накладные расходы на метрики превышают бюджет')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import plans
+from shop import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет на большой синтетической базе, что горячие запросы витрины, заказов, '
+        'обращений и корзины читают индекс, а не всю таблицу (на малой — manage.py test shop)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                            help='Число товаров, заказов, обращений и корзин')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу (повторный запуск без генерации)')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Печатать план каждого запроса')
+
+    def handle(self, *args, **options):
+        with synthetic.synthetic_database(keepdb=options['keepdb'], name='query_plans.sqlite3'):
+            from shop.models import Product
+            if not Product.objects.exists():
+                plans.populate(options['rows'])
+            synthetic.analyze()
+
+            failures = []
+            for title, queryset, index in plans.queries():
+                problems, plan = plans.check(queryset, index)
+                if problems:
+                    failures.append(title)
+                    self.stdout.write(self.style.ERROR(f'FAIL {title}: {", ".join(problems)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok   {title}'))
+                if problems or options['verbose_plans']:
+                    for line in plan:
+                        self.stdout.write(f'       {line}')
+
+        if failures:
+            raise CommandError(f'Запросов без индекса: {len(failures)}')
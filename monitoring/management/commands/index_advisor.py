@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from monitoring import advisor, slowlog
+from shop import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Разбирает журнал медленных запросов и предлагает составные и частичные индексы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Путь к журналу (по умолчанию SLOW_QUERY_LOG)')
+        parser.add_argument('--top', type=int, default=10, help='Сколько запросов показать в сводке')
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Замерить запросы до и после индекса на синтетической базе')
+        parser.add_argument('--rows', type=int, default=100000,
+                            help='Число товаров и заказов в синтетической базе')
+
+    def handle(self, *args, **options):
+        entries = list(slowlog.read_log(options['log'] or slowlog.log_path()))
+        if not entries:
+            raise CommandError('Журнал медленных запросов пуст')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Медленные запросы ({len(entries)} записей)'))
+        for fingerprint, group in advisor.summarize(entries)[:options['top']]:
+            self.stdout.write(
+                f"{group['count']:>6}× {group['total_ms']:>10.1f} мс (макс {group['max_ms']:.1f})"
+                f"  {', '.join(sorted(group['views']))}"
+            )
+            self.stdout.write(f'        {fingerprint[:200]}')
+            for line in group['plan']:
+                self.stdout.write(f'        plan: {line}')
+
+        proposals = [proposal for proposal in advisor.propose(entries) if proposal.create_sql()]
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nПредлагаемые индексы ({len(proposals)})'))
+        for proposal in proposals:
+            self.stdout.write(
+                f'{proposal.table}: {len(proposal.entries)} запросов, {proposal.total_ms:.1f} мс'
+            )
+            self.stdout.write(f'    {proposal.create_sql()};')
+            self.stdout.write(f'    {proposal.django_index()}')
+
+        if options['benchmark'] and proposals:
+            self.benchmark(proposals, options['rows'])
+
+    def benchmark(self, proposals, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nЗамер на синтетической базе ({rows} строк)'))
+        with synthetic.synthetic_database():
+            synthetic.populate_catalog(rows)
+            synthetic.populate_users(max(1000, rows // 100))
+            synthetic.populate_reviews(rows)
+            synthetic.populate_orders(rows)
+            synthetic.analyze()
+            for proposal in proposals:
+                samples = self.samples(proposal)
+                connection = connections[samples[0].get('alias', 'default')]
+                before = self.measure(connection, samples)
+                with connection.cursor() as cursor:
+                    try:
+                        cursor.execute(proposal.create_sql(connection))
+                    except Exception as exc:
+                        self.stderr.write(f'{proposal.name}: {exc}')
+                        continue
+                    cursor.execute('ANALYZE')
+                after = self.measure(connection, samples)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP INDEX "{proposal.name}"')
+                self.stdout.write(f'{proposal.name}: {before:.2f} мс -> {after:.2f} мс')
+
+    def samples(self, proposal):
+        seen = {}
+        for entry in proposal.entries:
+            seen.setdefault(entry['fingerprint'], entry)
+        return list(seen.values())[:3]
+
+    def measure(self, connection, samples, repeat=5):
+        """Медиана суммарного времени выборки запросов, мс"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                for entry in samples:
+                    try:
+                        cursor.execute(entry['sql'], entry['params'])
+                        cursor.fetchall()
+                    except Exception:
+                        continue
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.profiler import HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = 'Выдаёт подписанный заголовок X-Profile для профилирования запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Профилировать только запросы этого пользователя')
+        parser.add_argument('--url', help='Профилировать только это имя URL, например shop:product_list')
+
+    def handle(self, *args, **options):
+        token = make_token(options['user'], options['url'])
+        self.stdout.write(f'{HEADER}: {token}')
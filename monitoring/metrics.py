@@ -0,0 +1,243 @@
+"""
+Реестр метрик в формате Prometheus.
+
+Каждый процесс копит значения в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сбрасывает снимок в
+METRICS_DIR/<pid>-<время запуска>.json (атомарной заменой файла).
+Эндпоинт /metrics, обслуживаемый любым воркером, суммирует снимки
+всех процессов; снимки завершившихся процессов он удаляет — время
+запуска в имени отличает их от нового процесса с тем же pid. Если
+METRICS_DIR не задан, отдаются только метрики текущего процесса.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _start_time(pid):
+    """Время запуска процесса в тиках с загрузки системы (Linux) или None"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Поле 22; имя процесса в скобках может содержать пробелы
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _alive(filename):
+    """Жив ли процесс, записавший снимок <pid>-<время запуска>.json"""
+    pid, _, started = filename.removesuffix('.json').partition('-')
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    current = _start_time(pid)
+    return current is None or current == started
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.register(self)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, *labels):
+        # Значение хранится как [счётчики по корзинам..., +Inf, сумма]
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._created = time.time()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def maybe_flush(self):
+        """Сбрасывает снимок на диск, если прошёл интервал; вызывается после запроса"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if now - self._last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self):
+        directory = self.directory
+        os.makedirs(directory, exist_ok=True)
+        pid = os.getpid()
+        started = _start_time(pid) or int(self._created)
+        path = os.path.join(directory, f'{pid}-{started}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Суммарные значения по всем процессам: {name: {labels: value}}"""
+        snapshots = []
+        if self.directory:
+            self.flush()
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(self.directory, filename)
+                if not _alive(filename):
+                    # Процесс завершился: его счётчики уже не растут, а pid достанется другому
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots.append(self.snapshot())
+
+        merged = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                if name not in merged:
+                    continue
+                values = merged[name]
+                for labels, value in series:
+                    labels = tuple(labels)
+                    if isinstance(value, list):
+                        current = values.get(labels)
+                        values[labels] = value if current is None else [
+                            a + b for a, b in zip(current, value)
+                        ]
+                    else:
+                        values[labels] = values.get(labels, 0) + value
+        return merged
+
+    def exposition(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(values.items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind == 'histogram':
+                    cumulative = 0
+                    bounds = [repr(float(b)) for b in metric.buckets] + ['+Inf']
+                    for bound, count in zip(bounds, value[:-1]):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(pairs + [("le", bound)])} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(pairs)} {value[-1]}')
+                    lines.append(f'{name}_count{_labels(pairs)} {cumulative}')
+                else:
+                    lines.append(f'{name}{_labels(pairs)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса', ['view', 'method']
+)
+RESPONSES = Counter('http_responses_total', 'Ответы по кодам статуса', ['view', 'status'])
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'Число SQL-запросов на запрос', ['view'],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 100, 200, 500),
+)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Обращения к кешу', ['result'])
+TIERED_CACHE = Counter(
+    'tiered_cache_requests_total',
+    'Двухуровневый кеш: local/shared — попадания, wait — ждали чужое вычисление, miss — вычислили',
+    ['namespace', 'result'],
+)
+FUNNEL = Counter('shop_funnel_events_total', 'Шаги воронки корзины и оформления', ['step'])
+ORDERS = Counter('shop_orders_total', 'Оформленные заказы')
+ORDER_AMOUNT = Histogram(
+    'shop_order_amount_rub', 'Сумма заказа, ₽',
+    buckets=(5000, 10000, 25000, 50000, 100000, 200000, 500000),
+)
+TASKS = Counter(
+    'tasks_total',
+    'Фоновые задачи: enqueued/deduplicated — постановка, done/retry/failed/cancelled — итог выполнения',
+    ['task', 'result'],
+)
+TASK_DURATION = Histogram(
+    'task_duration_seconds', 'Время выполнения фоновой задачи', ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+
+def funnel(step):
+    FUNNEL.inc(step)
+
+
+def order_placed(amount):
+    ORDERS.inc()
+    ORDER_AMOUNT.observe(float(amount))
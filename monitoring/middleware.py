@@ -0,0 +1,212 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, profiler, slowlog, stats
+
+logger = logging.getLogger('monitoring.requests')
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет стоимость запроса: число и время SQL, повторяющиеся запросы,
+    время рендеринга шаблонов и обращения к кешу.
+
+    Результат отдаётся заголовком Server-Timing и строкой JSON в логгер
+    monitoring.requests. Запросы сверх бюджета логируются с уровнем WARNING.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        self.query_budget = getattr(settings, 'PERF_QUERY_BUDGET', None)
+        self.time_budget = getattr(settings, 'PERF_TIME_BUDGET_MS', None)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        request_stats = stats.RequestStats()
+        token = stats.activate(request_stats)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_stats.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            stats.deactivate(token)
+
+        self.report(request, response, request_stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request_stats = stats.current()
+        if request_stats is not None and request.resolver_match:
+            request_stats.view = stats.view_path(request.resolver_match)
+
+    def over_budget(self, request_stats, total_ms):
+        if self.query_budget is not None and request_stats.sql_count > self.query_budget:
+            return True
+        return self.time_budget is not None and total_ms > self.time_budget
+
+    def report(self, request, response, request_stats):
+        total_ms = request_stats.elapsed * 1000
+        sql_ms = request_stats.sql_time * 1000
+        template_ms = request_stats.template_time * 1000
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={sql_ms:.1f};desc="{request_stats.sql_count} queries"',
+                f'tpl;dur={template_ms:.1f}',
+                f'cache;desc="hit={request_stats.cache_hits} miss={request_stats.cache_misses}"',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        over_budget = self.over_budget(request_stats, total_ms)
+        record = {
+            'view': request_stats.view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'sql_count': request_stats.sql_count,
+            'sql_ms': round(sql_ms, 1),
+            'template_ms': round(template_ms, 1),
+            'cache_hits': request_stats.cache_hits,
+            'cache_misses': request_stats.cache_misses,
+            'duplicates': [
+                {'count': count, 'sql': sql[:300]}
+                for count, sql in request_stats.duplicates()
+            ],
+            'over_budget': over_budget,
+        }
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
+
+
+class MetricsMiddleware:
+    """
+    Пишет в реестр метрик время ответа, код статуса и число SQL-запросов
+    с меткой имени URL (shop:product_list, cart:cart_add, ...).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        counter = _QueryCounter()
+        request_stats = stats.current()
+        with ExitStack() as stack:
+            if request_stats is None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.REQUEST_LATENCY.observe(elapsed, view, request.method)
+        metrics.RESPONSES.inc(view, response.status_code)
+        queries = request_stats.sql_count if request_stats is not None else counter.count
+        metrics.DB_QUERIES.observe(queries, view)
+        metrics.REGISTRY.maybe_flush()
+        return response
+
+
+class _QueryCounter:
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ProfilerMiddleware:
+    """
+    Включает сэмплирующий профайлер для части запросов.
+
+    Профилируется запрос, если выпал по PROFILER_SAMPLE_RATE, если его имя
+    URL есть в PROFILER_URL_NAMES, пользователь — в PROFILER_USERS, или
+    передан подписанный заголовок X-Profile (manage.py profiler_token).
+    При PROFILER_ENABLED = False middleware не подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+        self.url_names = set(getattr(settings, 'PROFILER_URL_NAMES', ()))
+        self.usernames = set(getattr(settings, 'PROFILER_USERS', ()))
+        self.interval = getattr(settings, 'PROFILER_INTERVAL', 0.005)
+
+    def __call__(self, request):
+        request._profiler = None
+        response = self.get_response(request)
+        sampler = request._profiler
+        if sampler is not None:
+            sampler.stop()
+            match = request.resolver_match
+            profiler.save_profile(sampler, match.view_name if match else 'unresolved')
+        return response
+
+    def should_profile(self, request):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if request.resolver_match.view_name in self.url_names:
+            return True
+        user = getattr(request, 'user', None)
+        if self.usernames and user is not None and user.get_username() in self.usernames:
+            return True
+        token = request.headers.get(profiler.HEADER)
+        return bool(token) and profiler.check_token(token, request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.should_profile(request):
+            sampler = profiler.StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            request._profiler = sampler
+
+
+class SlowQueryMiddleware:
+    """Записывает запросы дольше SLOW_QUERY_MS в журнал медленных запросов"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_QUERY_MS', 100)
+        self.path = slowlog.log_path()
+
+    def __call__(self, request):
+        recorders = [
+            slowlog.SlowQueryRecorder(connection, self.threshold_ms, self.path)
+            for connection in connections.all()
+        ]
+        request._slow_query_recorders = recorders
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(recorder.connection.execute_wrapper(recorder))
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for recorder in request._slow_query_recorders:
+            recorder.view = stats.view_path(request.resolver_match)
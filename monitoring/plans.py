@@ -0,0 +1,114 @@
+"""
+Планы горячих запросов витрины, заказов, обращений и корзины: запросы
+строятся так же, как в представлениях, и не должны читать таблицу целиком
+или сортировать во временном B-дереве. Проверяют тесты (shop/tests.py)
+и manage.py check_query_plans на большой синтетической базе.
+"""
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.test import RequestFactory
+
+from shop import synthetic
+
+from . import advisor, slowlog
+
+
+def populate(rows):
+    """Синтетические товары, заказы, обращения и корзины для проверки планов"""
+    synthetic.populate_catalog(rows)
+    synthetic.populate_users(max(1000, rows // 100))
+    synthetic.populate_images(per_product=2)
+    synthetic.populate_reviews(rows)
+    synthetic.populate_orders(rows, items_per_order=1)
+    synthetic.populate_tickets(rows)
+    synthetic.populate_carts(rows, items_per_cart=1)
+
+
+def check(queryset, index=None):
+    """(проблемы плана, план); index — индекс, который план должен использовать"""
+    sql, params = queryset.query.sql_with_params()
+    plan = slowlog.explain(connections[queryset.db], sql, params)
+    problems = [f'полный просмотр {table}' for table in advisor.full_scans(plan)]
+    if advisor.needs_sort(plan):
+        problems.append('сортировка во временном B-дереве')
+    if index and not any(f'INDEX {index} ' in f'{line} ' for line in plan):
+        problems.append(f'не использует индекс {index}')
+    return problems, plan
+
+
+def _request(path, user=None, **params):
+    request = RequestFactory().get(path, params)
+    request.user = user or AnonymousUser()
+    request.session = {}
+    return request
+
+
+def _view(view_class, request, **kwargs):
+    view = view_class()
+    view.setup(request, **kwargs)
+    return view
+
+
+def queries():
+    """(название, queryset, индекс или None) в том виде, в каком их строят представления"""
+    from accounts.models import User
+    from accounts.views import SupportTicketListView
+    from cart.models import Cart, Order
+    from shop.models import Brand, Category, Product
+    from shop.cards import product_cards
+    from shop.views import HomeView, ProductListView
+
+    category = Category.objects.filter(parent__isnull=False).first()
+    root = Category.objects.filter(parent=None).first()
+    brand = Brand.objects.first()
+    user = User.objects.first()
+    staff = User(username='staff', is_staff=True)
+
+    for sort in ('newest', 'price_asc', 'price_desc', 'name_asc'):
+        view = _view(ProductListView, _request('/catalog/', sort=sort))
+        yield f'Каталог, sort={sort}', view.get_queryset()[:12], None
+        view = _view(
+            ProductListView, _request(f'/catalog/{category.slug}/', sort=sort),
+            category_slug=category.slug,
+        )
+        yield f'Категория, sort={sort}', view.get_queryset()[:12], None
+        # Корневая категория: товары всех подкатегорий (id поддерева из дерева в кеше)
+        view = _view(
+            ProductListView, _request(f'/catalog/{root.slug}/', sort=sort),
+            category_slug=root.slug,
+        )
+        yield f'Категория с подкатегориями, sort={sort}', view.get_queryset()[:12], None
+
+    # Категория новее закешированного дерева: поддерево по диапазону path
+    yield 'Поддерево по пути', product_cards(Product.objects.filter(
+        is_available=True, category__in=root.get_descendants(include_self=True),
+    )).order_by('-created_at')[:12], None
+
+    context = _view(HomeView, _request('/')).get_context_data()
+    yield 'Главная: рекомендуемые', context['featured_products'], None
+    yield 'Главная: новинки', context['new_products'], None
+
+    # Страница бренда берёт карточки из кеша (shop.catalog.brand_cards): тот же запрос
+    yield 'Бренд', product_cards(Product.objects.filter(brand=brand, is_available=True))[:12], None
+
+    product = Product.objects.filter(category=category).first()
+    yield 'Товар: похожие', Product.objects.filter(
+        category=product.category, is_available=True
+    ).exclude(id=product.id)[:4], None
+
+    # Первая страница истории заказов (cart.history._page)
+    yield (
+        'Мои заказы',
+        Order.objects.filter(user_id=user.pk).order_by('-created_at', '-id')[:settings.ORDER_HISTORY_PAGE_SIZE + 1],
+        'cart_order_user_id_9623e4_idx',
+    )
+    yield 'Мои обращения', _view(
+        SupportTicketListView, _request('/support/', user)
+    ).get_queryset()[:10], None
+    yield 'Обращения (персонал)', _view(
+        SupportTicketListView, _request('/support/', staff)
+    ).get_queryset()[:10], None
+
+    session_id = Cart.objects.values_list('session_id', flat=True).first()
+    yield 'Корзина по сессии', Cart.objects.filter(session_id=session_id, user=None), None
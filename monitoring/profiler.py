@@ -0,0 +1,124 @@
+"""
+Сэмплирующий профайлер запросов.
+
+Пока запрос обрабатывается, отдельный поток раз в PROFILER_INTERVAL секунд
+снимает стек потока-обработчика через sys._current_frames(). Стеки
+сохраняются в collapsed-формате («a;b;c 12»), который открывают
+speedscope и flamegraph.pl.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'monitoring.profiler'
+HEADER = 'X-Profile'
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}'
+
+
+class StackSampler:
+    """Снимает стеки одного потока в фоне"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def make_token(username=None, url_name=None):
+    """Подписанное значение заголовка X-Profile"""
+    return signing.dumps({'user': username, 'url': url_name}, salt=TOKEN_SALT)
+
+
+def check_token(token, request):
+    try:
+        data = signing.loads(
+            token, salt=TOKEN_SALT,
+            max_age=getattr(settings, 'PROFILER_TOKEN_MAX_AGE', 3600)
+        )
+    except signing.BadSignature:
+        return False
+    match = request.resolver_match
+    if data.get('url') and (not match or match.view_name != data['url']):
+        return False
+    if data.get('user'):
+        user = getattr(request, 'user', None)
+        if not user or not user.is_authenticated or user.get_username() != data['user']:
+            return False
+    return True
+
+
+def profile_dir():
+    return getattr(settings, 'PROFILER_DIR', settings.BASE_DIR / 'profiles')
+
+
+def save_profile(sampler, view_name):
+    """Записывает профиль и удаляет старые файлы сверх PROFILER_MAX_BYTES"""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    name = f'{stamp}-{view_name.replace(":", "_")}-{int(sampler.elapsed * 1000)}ms.collapsed'
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(sampler.collapsed())
+    rotate(directory, getattr(settings, 'PROFILER_MAX_BYTES', 50 * 1024 * 1024))
+    return path
+
+
+def list_profiles(directory=None):
+    """Профили от новых к старым: [(имя, размер, mtime)]"""
+    directory = directory or profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith('.collapsed'):
+            stat = entry.stat()
+            profiles.append((entry.name, stat.st_size, stat.st_mtime))
+    profiles.sort(key=lambda item: item[2], reverse=True)
+    return profiles
+
+
+def rotate(directory, max_bytes):
+    profiles = list_profiles(directory)
+    total = sum(size for _, size, _ in profiles)
+    while profiles and total > max_bytes:
+        name, size, _ = profiles.pop()
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,112 @@
+"""
+Журнал медленных запросов.
+
+Запросы дольше SLOW_QUERY_MS записываются строкой JSON в SLOW_QUERY_LOG:
+нормализованный SQL, параметры, время, место вызова (view и шаблон)
+и план выполнения (EXPLAIN QUERY PLAN для SQLite, EXPLAIN для остальных).
+Журнал читает manage.py index_advisor.
+"""
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+
+from . import stats
+
+_write_lock = threading.Lock()
+
+
+def jsonable(value):
+    """Параметр запроса в виде, пригодном и для JSON, и для повторного выполнения"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+        return value.isoformat(' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def explain(connection, sql, params):
+    """
+    План выполнения запроса: список строк. EXPLAIN идёт мимо execute_wrapper
+    соединения: не попадает в счётчики запросов и сам не пишется в журнал
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    wrappers = connection.execute_wrappers
+    connection.execute_wrappers = []
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as exc:
+        return [f'EXPLAIN failed: {exc}']
+    finally:
+        connection.execute_wrappers = wrappers
+    if connection.vendor == 'sqlite':
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+class SlowQueryRecorder:
+    """execute_wrapper, пишущий медленные запросы в журнал"""
+
+    def __init__(self, connection, threshold_ms, path, view=None):
+        self.connection = connection
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.view = view
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold and not many:
+                self.record(sql, params, elapsed)
+
+    def record(self, sql, params, elapsed):
+        params = [jsonable(param) for param in params or ()]
+        entry = {
+            'ts': time.time(),
+            'alias': self.connection.alias,
+            'vendor': self.connection.vendor,
+            'ms': round(elapsed * 1000, 2),
+            'fingerprint': stats.fingerprint(sql),
+            'sql': sql,
+            'params': params,
+            'view': self.view,
+            'template': stats.template_name.get(),
+            'plan': explain(self.connection, sql, params),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with _write_lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def read_log(path):
+    """Записи журнала; повреждённые строки пропускаются"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def log_path():
+    return str(getattr(settings, 'SLOW_QUERY_LOG', settings.BASE_DIR / 'logs' / 'slow_queries.jsonl'))
@@ -0,0 +1,101 @@
+"""
+Статистика текущего запроса.
+
+Объект RequestStats живёт в contextvar, пока запрос обрабатывается
+PerformanceMiddleware. Вне запроса (или если запрос не попал в выборку)
+current() возвращает None и все record_* ничего не делают.
+"""
+import re
+import time
+from contextvars import ContextVar
+
+from .metrics import CACHE_REQUESTS
+
+_current = ContextVar('request_stats', default=None)
+
+# Имя шаблона верхнего уровня, который сейчас рендерится (для журнала медленных запросов)
+template_name = ContextVar('template_name', default=None)
+
+# Списки IN (%s, %s, ...) разной длины считаются одним запросом
+_IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+# Управление транзакциями повторяется в каждом atomic() и N+1 не означает
+_TRANSACTION_PREFIXES = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+
+
+def fingerprint(sql):
+    """Нормализованный текст запроса без значений параметров"""
+    return _IN_LIST_RE.sub('(...)', sql)
+
+
+def view_path(match):
+    """Путь представления вида 'shop.views.ProductListView' по request.resolver_match"""
+    func = getattr(match.func, 'view_class', match.func)
+    if not hasattr(func, '__name__'):
+        # Экземпляр класса с __call__
+        func = func.__class__
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def current():
+    return _current.get()
+
+
+def activate(stats):
+    return _current.set(stats)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def record_cache(hit):
+    CACHE_REQUESTS.inc('hit' if hit else 'miss')
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+class RequestStats:
+    """Счётчики стоимости одного запроса"""
+    __slots__ = (
+        'view', 'started', 'sql_count', 'sql_time', 'fingerprints',
+        'template_time', 'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.view = None
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.fingerprints = {}
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """execute_wrapper для connection.execute_wrapper()"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] = self.fingerprints.get(key, 0) + 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def duplicates(self, limit=5):
+        """Самые частые повторяющиеся запросы — признак N+1"""
+        repeated = [
+            (count, sql) for sql, count in self.fingerprints.items()
+            if count > 1 and not sql.startswith(_TRANSACTION_PREFIXES)
+        ]
+        repeated.sort(reverse=True)
+        return repeated[:limit]
@@ -0,0 +1,41 @@
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+from . import stats
+
+
+class InstrumentedTemplate:
+    """Обёртка шаблона, засекающая время render() верхнего уровня"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        token = stats.template_name.set(self.template.origin.template_name)
+        current = stats.current()
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            if current is not None:
+                current.template_time += time.perf_counter() - started
+            stats.template_name.reset(token)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд DjangoTemplates с замером времени рендеринга.
+
+    {% include %} и {% extends %} загружаются движком напрямую, поэтому
+    время вложенных шаблонов учитывается один раз — внутри внешнего.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
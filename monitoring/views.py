@@ -0,0 +1,66 @@
+import ipaddress
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from . import profiler
+from .metrics import REGISTRY
+
+
+def _metrics_allowed(request):
+    """Верный токен METRICS_TOKEN или адрес из METRICS_ALLOWED_IPS; иначе закрыто"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if token and constant_time_compare(supplied, token):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    )
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus"""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        REGISTRY.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@staff_member_required
+def profile_list(request):
+    """Список сохранённых профилей"""
+    return render(request, 'admin/monitoring/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': [
+            (name, size, datetime.fromtimestamp(mtime, tz=timezone.get_current_timezone()))
+            for name, size, mtime in profiler.list_profiles()
+        ],
+        'profiler_enabled': getattr(settings, 'PROFILER_ENABLED', False),
+    })
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Скачать профиль в collapsed-формате"""
+    if os.path.basename(name) != name or not name.endswith('.collapsed'):
+        raise Http404
+    path = os.path.join(profiler.profile_dir(), name)
+    if not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name,
+                        content_type='text/plain; charset=utf-8')
@@ -0,0 +1,231 @@
+"""
+Двухуровневый кеш: LRU в памяти процесса перед общим бэкендом CACHES.
+
+Значения хранятся под ключом, в который входят штампы версий их
+пространств имён (``catalog``, ``brand:<id>``, ``cart:<id>``). Инвалидация —
+bump(namespace): в общий кеш записывается новый штамп (time.time_ns()),
+и все ключи со старым штампом перестают находиться в обоих уровнях,
+ничего не удаляя. Штамп пишется set, а не incr: incr файлового кеша —
+чтение и запись без блокировки, и одновременные bump могли бы дать
+один и тот же штамп. Свежие
+штампы процесс перечитывает из общего кеша не чаще раза в
+TIERED_CACHE_STAMP_TTL секунд, поэтому другие воркеры видят изменение
+с этой задержкой, а сам процесс — сразу.
+
+Промах вычисляет значение один раз (single-flight): потоки процесса ждут
+блокировку на ключ, другие процессы — пока первый положит результат
+в общий кеш (блокировка через cache.add), но не дольше TIERED_CACHE_LOCK_WAIT.
+
+    from scootermall import caching
+
+    brands = caching.get_or_compute(
+        'brands:active', lambda: list(Brand.objects.filter(is_active=True)),
+        namespaces=['catalog'],
+    )
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from monitoring import stats
+from monitoring.metrics import TIERED_CACHE
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Ограниченный по числу записей LRU с TTL; потокобезопасный"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LocalLRU(settings.TIERED_CACHE_LOCAL_SIZE)
+# namespace -> (момент чтения, штамп)
+_stamps = {}
+_stamps_lock = threading.Lock()
+# Single-flight внутри процесса: ключ -> одна из FLIGHT_LOCKS блокировок
+FLIGHT_LOCKS = 64
+_flights = [threading.Lock() for _ in range(FLIGHT_LOCKS)]
+
+
+def shared():
+    return caches[settings.TIERED_CACHE_ALIAS]
+
+
+def _stamp_key(namespace):
+    return f'stamp:{namespace}'
+
+
+def _new_stamp():
+    # Новый штамп не должен совпасть с прежним, даже если тот пропал из кеша
+    return time.time_ns()
+
+
+def stamps(namespaces):
+    """Текущие штампы пространств имён (из памяти, если прочитаны недавно)"""
+    now = time.monotonic()
+    result = {}
+    stale = []
+    with _stamps_lock:
+        for namespace in namespaces:
+            item = _stamps.get(namespace)
+            if item is not None and now - item[0] < settings.TIERED_CACHE_STAMP_TTL:
+                result[namespace] = item[1]
+            else:
+                stale.append(namespace)
+    if stale:
+        cache = shared()
+        found = cache.get_many([_stamp_key(namespace) for namespace in stale])
+        for namespace in stale:
+            value = found.get(_stamp_key(namespace))
+            if value is None:
+                value = _new_stamp()
+                if not cache.add(_stamp_key(namespace), value, None):
+                    value = cache.get(_stamp_key(namespace), value)
+            result[namespace] = value
+        with _stamps_lock:
+            for namespace in stale:
+                _stamps[namespace] = (now, result[namespace])
+    return result
+
+
+def bump(*namespaces):
+    """Инвалидирует всё, что закешировано в этих пространствах имён"""
+    now = time.monotonic()
+    values = {namespace: _new_stamp() for namespace in namespaces}
+    shared().set_many({_stamp_key(namespace): value for namespace, value in values.items()}, None)
+    with _stamps_lock:
+        for namespace, value in values.items():
+            _stamps[namespace] = (now, value)
+
+
+def _versioned_key(key, namespaces):
+    current = stamps(namespaces)
+    return 'tc:' + key + ':' + '.'.join(f'{current[namespace]:x}' for namespace in namespaces)
+
+
+def _label(namespaces):
+    # brand:12 -> brand: метка метрики без идентификаторов
+    return namespaces[0].split(':', 1)[0] if namespaces else '-'
+
+
+def _flight_lock(key):
+    return _flights[hash(key) % FLIGHT_LOCKS]
+
+
+def _wait_shared(cache, key):
+    """Ждёт, пока другой процесс положит значение; _MISSING по таймауту"""
+    deadline = time.monotonic() + settings.TIERED_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return _MISSING
+
+
+def get_or_compute(key, compute, namespaces=('catalog',), timeout=None, local_timeout=None):
+    """
+    Значение из памяти процесса, общего кеша или compute().
+
+    timeout — срок в общем кеше (по умолчанию TIERED_CACHE_TIMEOUT),
+    local_timeout — в памяти процесса (TIERED_CACHE_LOCAL_TIMEOUT, не больше timeout).
+    Значение должно сериализоваться pickle; None кешируется как обычное значение.
+    """
+    namespaces = list(namespaces)
+    timeout = settings.TIERED_CACHE_TIMEOUT if timeout is None else timeout
+    local_timeout = min(
+        timeout, settings.TIERED_CACHE_LOCAL_TIMEOUT if local_timeout is None else local_timeout
+    )
+    label = _label(namespaces)
+    full_key = _versioned_key(key, namespaces)
+
+    value = _local.get(full_key, _MISSING)
+    if value is not _MISSING:
+        TIERED_CACHE.inc(label, 'local')
+        stats.record_cache(True)
+        return value
+
+    cache = shared()
+    with _flight_lock(full_key):
+        # Пока ждали блокировку, значение мог положить соседний поток
+        value = _local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            TIERED_CACHE.inc(label, 'local')
+            stats.record_cache(True)
+            return value
+        value = cache.get(full_key, _MISSING)
+        if value is not _MISSING:
+            TIERED_CACHE.inc(label, 'shared')
+            _local.set(full_key, value, local_timeout)
+            return value
+
+        lock_key = f'lock:{full_key}'
+        token = uuid.uuid4().hex
+        owner = cache.add(lock_key, token, settings.TIERED_CACHE_LOCK_TIMEOUT)
+        if not owner:
+            value = _wait_shared(cache, full_key)
+            if value is not _MISSING:
+                TIERED_CACHE.inc(label, 'wait')
+                _local.set(full_key, value, local_timeout)
+                return value
+        try:
+            value = compute()
+            cache.set(full_key, value, timeout)
+            _local.set(full_key, value, local_timeout)
+        finally:
+            if owner and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        TIERED_CACHE.inc(label, 'miss')
+        return value
+
+
+def cached(key, namespaces=('catalog',), timeout=None, local_timeout=None):
+    """Декоратор функции без аргументов поверх get_or_compute"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper():
+            return get_or_compute(key, func, namespaces, timeout, local_timeout)
+        return wrapper
+    return decorator
+
+
+def clear_local():
+    """Сбрасывает память процесса (тесты, бенчмарки)"""
+    _local.clear()
+    with _stamps_lock:
+        _stamps.clear()
@@ -0,0 +1,323 @@
+"""
+Потоковая выгрузка таблиц в CSV и XLSX.
+
+Выгрузка (Export) описывает колонки и отдаёт строки генератором: данные
+читаются пачками по EXPORT_CHUNK_SIZE строк (QuerySet.iterator, связанные
+строки — одним запросом на пачку) и сразу кодируются, поэтому в памяти
+одновременно только одна пачка, сколько бы строк ни было.
+
+CSV — UTF-8 с BOM и разделителем EXPORT_CSV_DELIMITER: так его без
+вопросов открывает Excel с русской локалью. Текст, который Excel принял
+бы за формулу (=, +, -, @ в начале), получает апостроф спереди. XLSX собирается без сторонних
+библиотек: лист пишется строка за строкой в zip-поток (zipfile пишет
+в поток без seek), текст — inline strings, поэтому общая таблица строк
+не копится до конца файла.
+
+    export = OrderExport()
+    response = export.response(queryset, fmt='xlsx', keys=['order_number', 'sku'])
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from operator import itemgetter
+
+from django import forms
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Начало текста, с которого Excel и LibreOffice читают ячейку CSV как формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def chunked(iterable, size):
+    """Списки по size элементов из итератора"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Column:
+    __slots__ = ('key', 'label')
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+
+
+class Export:
+    """
+    Описание выгрузки. Подкласс задаёт колонки и rows(queryset, selected) —
+    генератор кортежей значений в порядке columns; selected — ключи
+    выбранных колонок, чтобы не читать данные для невыбранных.
+    """
+    name = ''
+    title = ''
+    columns = []
+
+    def rows(self, queryset, selected):
+        raise NotImplementedError
+
+    def choices(self):
+        return [(column.key, column.label) for column in self.columns]
+
+    def select(self, keys=None):
+        """Колонки в порядке columns и функция, вырезающая их из строки"""
+        keys = set(keys or [column.key for column in self.columns])
+        indexes = [i for i, column in enumerate(self.columns) if column.key in keys]
+        if not indexes:
+            raise ValueError('Не выбрано ни одной колонки')
+        columns = [self.columns[i] for i in indexes]
+        if len(indexes) == len(self.columns):
+            return columns, tuple
+        if len(indexes) == 1:
+            return columns, lambda row, i=indexes[0]: (row[i],)
+        return columns, itemgetter(*indexes)
+
+    def stream(self, queryset, fmt='csv', keys=None):
+        """Файл кусками bytes"""
+        columns, pick = self.select(keys)
+        rows = map(pick, self.rows(queryset, {column.key for column in columns}))
+        header = [column.label for column in columns]
+        if fmt == 'xlsx':
+            return xlsx_chunks(header, rows, sheet=self.title or self.name)
+        return csv_chunks(header, rows)
+
+    def filename(self, fmt):
+        return f'{self.name}-{timezone.localtime():%Y%m%d-%H%M}.{fmt}'
+
+    def response(self, queryset, fmt='csv', keys=None):
+        response = StreamingHttpResponse(self.stream(queryset, fmt, keys), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{self.filename(fmt)}"'
+        return response
+
+
+class ExportForm(forms.Form):
+    """Формат и колонки выгрузки; колонки — из описания выгрузки"""
+    format = forms.ChoiceField(
+        label='Формат', choices=[('xlsx', 'Excel (XLSX)'), ('csv', 'CSV')], initial='xlsx',
+        widget=forms.RadioSelect,
+    )
+    columns = forms.MultipleChoiceField(label='Колонки', widget=forms.CheckboxSelectMultiple)
+
+    def __init__(self, export, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['columns'].choices = export.choices()
+        self.fields['columns'].initial = [column.key for column in export.columns]
+
+
+def _local(value, tz):
+    if value.tzinfo is not None:
+        value = value.astimezone(tz)
+    return value.replace(tzinfo=None, microsecond=0)
+
+
+def _text(value, tz):
+    if value is None:
+        return ''
+    if value is True:
+        return 'да'
+    if value is False:
+        return 'нет'
+    if isinstance(value, datetime):
+        return _local(value, tz).isoformat(' ')
+    return value
+
+
+def _csv_text(value, tz):
+    value = _text(value, tz)
+    # Такую ячейку Excel считает формулой: апостроф делает её текстом
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(header, rows, chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    tz = timezone.get_current_timezone()
+    writer = csv.writer(_Echo(), delimiter=settings.EXPORT_CSV_DELIMITER)
+    yield ('\ufeff' + writer.writerow(header)).encode()
+    for chunk in chunked(rows, chunk_size):
+        yield ''.join(writer.writerow([_csv_text(value, tz) for value in row]) for row in chunk).encode()
+
+
+# Символы, запрещённые в XML 1.0
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+# Больше Excel не покажет в ячейке
+XLSX_MAX_TEXT = 32767
+# Нулевой день дат Excel
+_EPOCH = datetime(1899, 12, 30)
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '<Relationship Id="rId2" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    '</Relationships>'
+)
+# Стили ячеек: 0 — обычная, 1 — дата и время, 2 — дата, 3 — жирный заголовок
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd.mm.yyyy hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _letters(index):
+    letters = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _xml_text(value):
+    return _XML_ILLEGAL.sub('', value).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _string(ref, value, style=''):
+    text = _xml_text(value[:XLSX_MAX_TEXT])
+    return f'<c r="{ref}" t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _number(ref, value, tz):
+    return f'<c r="{ref}"><v>{value}</v></c>'
+
+
+def _datetime(ref, value, tz):
+    days = (_local(value, tz) - _EPOCH).total_seconds() / 86400
+    return f'<c r="{ref}" s="1"><v>{days:.6f}</v></c>'
+
+
+# Ячейка по точному типу значения: словарь быстрее цепочки isinstance
+_CELLS = {
+    type(None): lambda ref, value, tz: '',
+    str: lambda ref, value, tz: _string(ref, value) if value else '',
+    int: _number,
+    float: _number,
+    Decimal: _number,
+    bool: lambda ref, value, tz: f'<c r="{ref}" t="b"><v>{int(value)}</v></c>',
+    datetime: _datetime,
+    date: lambda ref, value, tz: f'<c r="{ref}" s="2"><v>{(value - _EPOCH.date()).days}</v></c>',
+}
+
+
+def _cell(ref, value, tz):
+    writer = _CELLS.get(type(value))
+    if writer is None:
+        return _string(ref, str(value))
+    return writer(ref, value, tz)
+
+
+class _Sink:
+    """
+    Файл только для записи без tell и seek: zipfile пишет в него
+    с дескрипторами данных, а генератор забирает накопленные байты
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def xlsx_chunks(header, rows, sheet='Лист1', chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    tz = timezone.get_current_timezone()
+    sink = _Sink()
+    # Имя листа: до 31 символа, без []:*?/\
+    sheet = re.sub(r'[\[\]:*?/\\]', ' ', sheet)[:31]
+    sheet = _xml_text(sheet).replace('"', '&quot;')
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(name=sheet))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', _STYLES)
+        refs = [_letters(i) for i in range(len(header))]
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as worksheet:
+            cells = ''.join(_string(f'{ref}1', label, ' s="3"') for ref, label in zip(refs, header))
+            worksheet.write(f'{_SHEET_START}<row r="1">{cells}</row>'.encode())
+            number = 1
+            for chunk in chunked(rows, chunk_size):
+                parts = []
+                for row in chunk:
+                    number += 1
+                    cells = ''.join(_cell(f'{ref}{number}', value, tz) for ref, value in zip(refs, row))
+                    parts.append(f'<row r="{number}">{cells}</row>')
+                worksheet.write(''.join(parts).encode())
+                yield sink.take()
+            worksheet.write(_SHEET_END.encode())
+    yield sink.take()
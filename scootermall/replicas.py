@@ -0,0 +1,151 @@
+"""
+Реплики для чтения каталога.
+
+Чтения моделей из REPLICA_MODELS внутри запроса уходят на одну из
+REPLICA_DATABASES, если реплика:
+
+* доступна (иначе она исключается на REPLICA_RETRY_SECONDS);
+* отстаёт от основной базы не больше REPLICA_MAX_LAG секунд;
+* уже содержит последнюю запись этого пользователя.
+
+Момент последней записи пользователя хранится в cookie на
+REPLICA_MAX_LAG секунд: пока реплика синхронизирована раньше него,
+чтения идут в основную базу. Позже cookie не нужна — реплики старше
+этого срока не используются вовсе. Запросы с методами, меняющими данные,
+пути из REPLICA_EXCLUDE_PATHS и код вне запроса (команды, фоновые
+задачи) всегда читают основную базу.
+"""
+import os
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+
+COOKIE = 'db_written_at'
+
+_state = ContextVar('replica_state', default=None)
+# alias -> (время проверки, время синхронизации или None, если реплика недоступна)
+_health = {}
+
+
+class RequestState:
+    __slots__ = ('pinned', 'written_at', 'wrote')
+
+    def __init__(self, pinned, written_at):
+        self.pinned = pinned
+        self.written_at = written_at
+        self.wrote = False
+
+
+def current():
+    return _state.get()
+
+
+def mark_write():
+    """Запись в основную базу: до конца запроса и по cookie читаем из неё"""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+        state.wrote = True
+
+
+def sync_marker(alias):
+    return f"{connections[alias].settings_dict['NAME']}.synced"
+
+
+def synced_at(alias):
+    """Момент, по состоянию на который реплика совпадает с основной базой"""
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        # Локальная копия: время записывает manage.py sync_replica
+        if not os.path.exists(connection.settings_dict['NAME']):
+            return None
+        with open(sync_marker(alias)) as f:
+            return float(f.read())
+    connection.ensure_connection()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT EXTRACT(EPOCH FROM CASE '
+                'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN now() '
+                'ELSE pg_last_xact_replay_timestamp() END)'
+            )
+            return float(cursor.fetchone()[0])
+    return time.time()
+
+
+def _check(alias):
+    now = time.time()
+    checked, value = _health.get(alias, (0.0, None))
+    interval = settings.REPLICA_CHECK_INTERVAL if value is not None else settings.REPLICA_RETRY_SECONDS
+    if now - checked < interval:
+        return value
+    try:
+        value = synced_at(alias)
+    except (OSError, ValueError, TypeError, DatabaseError):
+        value = None
+    _health[alias] = (now, value)
+    return value
+
+
+def reopen():
+    """
+    sync_replica подменяет файл SQLite-реплики целиком: соединение,
+    открытое до подмены, читает старую копию. Вызывается в начале
+    запроса и закрывает соединения реплик, синхронизированных с тех пор.
+    """
+    for alias in settings.REPLICA_DATABASES:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        value = _check(alias)
+        if getattr(connection, 'replica_synced_at', None) != value:
+            connection.close()
+            connection.replica_synced_at = value
+
+
+def choose(written_at=0.0):
+    """Алиас подходящей реплики или None, если читать надо из основной базы"""
+    now = time.time()
+    candidates = []
+    for alias in settings.REPLICA_DATABASES:
+        value = _check(alias)
+        if value is None or now - value > settings.REPLICA_MAX_LAG or value < written_at:
+            continue
+        candidates.append(alias)
+    return random.choice(candidates) if candidates else None
+
+
+class ReplicaMiddleware:
+    """Состояние маршрутизации на время запроса и cookie после записи"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REPLICA_DATABASES', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            written_at = float(request.COOKIES.get(COOKIE, 0))
+        except ValueError:
+            written_at = 0.0
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or request.path.startswith(
+            tuple(settings.REPLICA_EXCLUDE_PATHS)
+        )
+        if not pinned:
+            reopen()
+        state = RequestState(pinned, written_at)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                COOKIE, f'{time.time():.3f}', max_age=settings.REPLICA_MAX_LAG,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,66 @@
+"""
+Маршрутизация моделей по базам данных.
+
+Таблицы с частой записью (сессии, корзины) вынесены в отдельные файлы
+SQLite, чтобы запись сессии на каждом просмотре страницы не ждала общую
+блокировку записи вместе с оформлением заказа. Распределение задаётся
+в settings.DATABASE_ROUTING: ключ — метка приложения ('sessions') или
+модели ('cart.cart'), значение — алиас из DATABASES. Если алиас не
+описан в DATABASES, модель остаётся в default.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replicas
+
+
+def database_for(app_label, model_name=None):
+    routing = getattr(settings, 'DATABASE_ROUTING', {})
+    alias = routing.get(app_label, DEFAULT_DB_ALIAS)
+    if model_name:
+        alias = routing.get(f'{app_label}.{model_name}', alias)
+    return alias if alias in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+class WriteHeavyRouter:
+    def db_for_read(self, model, **hints):
+        # Алиас возвращается явно и для default: иначе Django взял бы базу
+        # из hints['instance'], и товар корзины читался бы из базы корзин
+        return database_for(model._meta.app_label, model._meta.model_name)
+
+    def db_for_write(self, model, **hints):
+        return database_for(model._meta.app_label, model._meta.model_name)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Связи между базами хранятся как id без внешнего ключа в БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return database_for(app_label, model_name) == db
+
+
+class ReplicaRouter:
+    """
+    Чтения каталога внутри запроса — на реплику (см. scootermall/replicas.py).
+
+    Стоит в DATABASE_ROUTERS перед WriteHeavyRouter: возвращает None,
+    когда чтение должно идти по обычным правилам.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = replicas.current()
+        if state is None or state.pinned:
+            return None
+        if model._meta.label_lower not in settings.REPLICA_MODELS:
+            return None
+        return replicas.choose(state.written_at)
+
+    def db_for_write(self, model, **hints):
+        if database_for(model._meta.app_label, model._meta.model_name) == DEFAULT_DB_ALIAS:
+            replicas.mark_write()
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
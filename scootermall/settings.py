@@ -2,6 +2,7 @@
 Django settings for scootermall project.
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,9 +35,19 @@ INSTALLED_APPS = [
     'shop',
     'accounts',
     'cart',
+    'monitoring',
+    'tasks',
+    'mailer',
+    'analytics',
+    'feeds',
+    'seo',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.PerformanceMiddleware',
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.SlowQueryMiddleware',
+    'scootermall.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,13 +55,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'monitoring.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'scootermall.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'monitoring.templates.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -60,6 +72,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'cart.context_processors.cart_context',
                 'shop.context_processors.compare_context',
+                'shop.context_processors.catalog_menu',
             ],
         },
     },
@@ -68,13 +81,163 @@ TEMPLATES = [
 WSGI_APPLICATION = 'scootermall.wsgi.application'
 
 # Database
+# SQLite с WAL и BEGIN IMMEDIATE (см. scootermall/sqlite_backend)
+SQLITE_DATABASE = {
+    'ENGINE': 'scootermall.sqlite_backend',
+    'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+    'CONN_HEALTH_CHECKS': True,
+    # PRAGMA соединений — DEFAULT_PRAGMAS бэкенда, 'pragmas' алиаса дополняют их;
+    # atomic() открывает BEGIN IMMEDIATE, если не задан 'transaction_mode'
+    'OPTIONS': {
+        'write_retries': 3,  # повторы BEGIN IMMEDIATE после busy_timeout
+        'retry_backoff': 0.05,  # с, удваивается с каждой попыткой
+    },
+}
+
+# Сессии и корзины пишутся на каждом просмотре страницы и держатся
+# в отдельных файлах, чтобы не делить блокировку записи с заказами.
+# После добавления алиаса: manage.py split_databases
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': {**SQLITE_DATABASE, 'NAME': BASE_DIR / 'db.sqlite3'},
+    'sessions': {**SQLITE_DATABASE, 'NAME': BASE_DIR / 'sessions.sqlite3'},
+    'carts': {**SQLITE_DATABASE, 'NAME': BASE_DIR / 'carts.sqlite3'},
+    # Очередь фоновых задач (tasks/queue.py)
+    'tasks': {**SQLITE_DATABASE, 'NAME': BASE_DIR / 'tasks.sqlite3'},
+    # Реплика каталога: локальная копия db.sqlite3, которую обновляет
+    # manage.py sync_replica --interval N. Пока копии нет, всё читается из default
+    'replica': {
+        **SQLITE_DATABASE,
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'OPTIONS': {
+            **SQLITE_DATABASE['OPTIONS'],
+            'pragmas': {'query_only': 'ON'},
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = [
+    'scootermall.routers.ReplicaRouter',
+    'scootermall.routers.WriteHeavyRouter',
+]
+
+# Метка приложения или модели -> алиас базы (по умолчанию default).
+# Таблицы событий и аналитики добавляются сюда же, например 'analytics': 'analytics'
+DATABASE_ROUTING = {
+    'sessions': 'sessions',
+    'cart.cart': 'carts',
+    'cart.cartitem': 'carts',
+    'tasks': 'tasks',
+}
+
+# Реплики для чтения (см. scootermall/replicas.py)
+REPLICA_DATABASES = ['replica']
+REPLICA_MODELS = [
+    'shop.product', 'shop.brand', 'shop.category',
+    'shop.productimage', 'shop.review', 'shop.banner',
+]
+REPLICA_MAX_LAG = 300  # реплика, отставшая сильнее, не используется; столько же живёт cookie записи
+REPLICA_CHECK_INTERVAL = 1.0  # с, как часто перечитывать время синхронизации
+REPLICA_RETRY_SECONDS = 30  # пауза перед повторной проверкой недоступной реплики
+REPLICA_EXCLUDE_PATHS = ['/admin/']
+
+# Cache
+# Общий для всех воркеров кеш: Redis в продакшене (CACHE_REDIS_URL, нужен пакет
+# redis), локально — файлы в CACHE_DIR. Перед ним — LRU процесса (scootermall/caching.py)
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'monitoring.cache.InstrumentedRedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'scootermall',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'monitoring.cache.InstrumentedFileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+TIERED_CACHE_ALIAS = 'default'
+TIERED_CACHE_TIMEOUT = 3600  # с, срок в общем кеше; устаревание решают штампы версий
+TIERED_CACHE_LOCAL_TIMEOUT = 30  # с, срок в памяти процесса
+TIERED_CACHE_LOCAL_SIZE = 1000  # записей в LRU процесса
+TIERED_CACHE_STAMP_TTL = 1.0  # с, как часто перечитывать штампы из общего кеша
+TIERED_CACHE_LOCK_TIMEOUT = 30  # с, блокировка вычисления, если процесс упал
+TIERED_CACHE_LOCK_WAIT = 5.0  # с, сколько ждать чужого вычисления, прежде чем считать самому
+
+# Снимок каталога для воркеров (shop/snapshot.py, manage.py build_catalog_snapshot)
+CATALOG_SNAPSHOT_ENABLED = True
+CATALOG_SNAPSHOT_PATH = os.environ.get('CATALOG_SNAPSHOT_PATH', BASE_DIR / 'catalog.snapshot')
+CATALOG_SNAPSHOT_REBUILD_DELAY = 2.0  # с, серия сохранений в админке даёт одну пересборку
+
+# Статистика диапазонов для фильтров каталога (shop/ranges.py)
+FILTER_STATS_BUCKETS = 20  # столбцов гистограммы под слайдером
+
+# Фоновые задачи (tasks/queue.py, manage.py run_workers)
+TASKS_EAGER = False  # выполнять задачи сразу при постановке, без обработчика
+TASKS_POLL_INTERVAL = 1.0  # с, пауза обработчика, когда готовых задач нет
+TASKS_MAX_ATTEMPTS = 3  # попыток по умолчанию, включая первую
+TASKS_RETRY_BACKOFF = 10  # с, пауза перед первым повтором, удваивается с каждой попыткой
+TASKS_RETRY_BACKOFF_MAX = 3600  # с, потолок паузы между повторами
+TASKS_LEASE_SECONDS = 600  # с, после этого задача упавшего обработчика возвращается в очередь
+TASKS_MAINTENANCE_INTERVAL = 60  # с, как часто обработчик проверяет аренды и чистит очередь
+TASKS_KEEP_DONE_DAYS = 7  # сколько хранить выполненные задачи
+
+# Смена статусов заказов (cart/workflow.py)
+ORDER_WORKFLOW_CHUNK_SIZE = 500  # заказов на транзакцию и на задачу с письмами
+
+# История заказов покупателя (cart/history.py)
+ORDER_HISTORY_PAGE_SIZE = 10  # заказов на странице «Мои заказы»
+ORDER_HISTORY_CACHE_TIMEOUT = 600  # с, страницы и статусы в кеше; изменения сбрасывают его сразу
+
+# Итоги продаж и дашборд (analytics/rollup.py, /admin/analytics/)
+ANALYTICS_ROLLUP_DELAY = 300  # с, пересчёт после изменения заказа; изменения за это время — одна задача
+ANALYTICS_ROLLUP_OVERLAP = 60  # с, окно изменений захватывает конец прошлого пересчёта
+ANALYTICS_TOP_SIZE = 10  # строк в рейтингах дашборда
+
+# Выгрузки в CSV и XLSX (scootermall/exports.py, действие «Выгрузить», manage.py export_data)
+EXPORT_CHUNK_SIZE = 2000  # строк за одно чтение iterator() и один кусок ответа
+EXPORT_CSV_DELIMITER = ';'  # Excel с русской локалью делит по точке с запятой
+
+# Фиды для маркетплейсов (feeds/builder.py, manage.py build_feeds)
+FEED_ROOT = BASE_DIR / 'media' / 'feeds'  # готовые <формат>.xml.gz, отдаются статикой из MEDIA_URL
+FEED_CHUNK_SIZE = 1000  # товаров (диапазон id) в пачке; изменённый товар пересобирает свою пачку
+FEED_BUILD_DELAY = 120  # с, сборка после изменения товара; изменения за это время — одна задача
+FEED_OVERLAP = 60  # с, окно изменений захватывает конец прошлой сборки
+FEED_COMPRESSLEVEL = 6  # gzip; пачки сжимаются один раз, файл склеивается без пересжатия
+FEED_SHOP_NAME = 'ScooterMall'  # название магазина в фиде
+FEED_COMPANY = 'ScooterMall'  # юридическое название компании (YML company)
+
+# Карта сайта (seo/sitemap.py, /sitemap.xml, manage.py build_sitemap)
+SITEMAP_ROOT = BASE_DIR / 'media' / 'sitemaps'  # готовые .xml.gz, отдаются seo/views.py
+SITEMAP_SHARD_SIZE = 50000  # товаров (диапазон id) в файле; протокол допускает не больше 50 000 адресов
+SITEMAP_BUILD_DELAY = 300  # с, сборка после изменения каталога; изменения за это время — одна задача
+SITEMAP_OVERLAP = 60  # с, окно изменений захватывает конец прошлой сборки
+SITEMAP_COMPRESSLEVEL = 6  # gzip
+
+# Почта. Локально письма принимает manage.py run_smtp_sink
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')  # для ссылок в письмах
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == '1'
+EMAIL_TIMEOUT = 30  # с
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'ScooterMall <noreply@scootermall.ru>')
+
+# Рассылки (mailer/sending.py)
+MAILER_CHUNK_SIZE = 2000  # подписчиков за одно чтение iterator() и одну вставку писем
+MAILER_BATCH_SIZE = 200  # писем на одно SMTP-соединение
+MAILER_RATE_LIMIT = 0  # писем в секунду, 0 — без ограничения
+MAILER_BATCH_PAUSE = 0  # с, пауза между пачками
+MAILER_BATCHES_PER_TASK = 10  # пачек за одно выполнение задачи mailer.send_campaign
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -123,3 +286,49 @@ CART_SESSION_ID = 'cart'
 
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
+
+# Performance instrumentation
+PERF_ENABLED = True
+PERF_SAMPLE_RATE = 1.0  # доля запросов, попадающих в замер
+PERF_QUERY_BUDGET = 30  # запросов к БД на страницу
+PERF_TIME_BUDGET_MS = 500
+PERF_SERVER_TIMING = True
+
+# Slow query log (разбирается командой manage.py index_advisor)
+SLOW_QUERY_ENABLED = True
+SLOW_QUERY_MS = 100
+SLOW_QUERY_LOG = BASE_DIR / 'logs' / 'slow_queries.jsonl'
+
+# Metrics (/metrics)
+METRICS_ENABLED = True
+# Общий каталог снимков для нескольких WSGI-воркеров; без него метрики per-process
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+# /metrics закрыт, пока не задан токен (Authorization: Bearer ...) или адреса сборщика
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Адреса и сети (CIDR), которым /metrics доступен без токена, через запятую
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Sampling profiler (профили смотрятся в /admin/profiles/)
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED') == '1'
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_URL_NAMES = []  # например ['shop:product_list']
+PROFILER_USERS = []
+PROFILER_INTERVAL = 0.005
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_MAX_BYTES = 50 * 1024 * 1024
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'monitoring': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'tasks': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -0,0 +1,55 @@
+"""
+SQLite для продакшена.
+
+Каждое соединение получает PRAGMA из DEFAULT_PRAGMAS, поверх которых
+ложатся OPTIONS['pragmas'] алиаса. Транзакции atomic() по умолчанию
+открываются через BEGIN IMMEDIATE (OPTIONS['transaction_mode'] задаёт
+другой режим): блокировка записи берётся сразу, а не при первом UPDATE,
+поэтому SQLite может дождаться её по busy_timeout вместо мгновенного
+«database is locked» при повышении блокировки.
+Если за busy_timeout блокировку получить не удалось, BEGIN повторяется
+до OPTIONS['write_retries'] раз с экспоненциальной паузой.
+"""
+import random
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # мс
+    'temp_store': 'MEMORY',
+    'cache_size': -64000,  # в КиБ, т.е. 64 МБ
+    'mmap_size': 256 * 1024 * 1024,
+}
+DEFAULT_TRANSACTION_MODE = 'IMMEDIATE'
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.write_retries = params.pop('write_retries', 3)
+        self.retry_backoff = params.pop('retry_backoff', 0.05)
+        # transaction_mode разбирает и проверяет базовый бэкенд; None в OPTIONS — обычный BEGIN
+        if 'transaction_mode' not in self.settings_dict['OPTIONS']:
+            self.transaction_mode = DEFAULT_TRANSACTION_MODE
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        for attempt in range(self.write_retries + 1):
+            try:
+                super()._start_transaction_under_autocommit()
+                return
+            except OperationalError as exc:
+                if 'locked' not in str(exc) or attempt == self.write_retries:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5))
@@ -5,12 +5,21 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from analytics import views as analytics_views
+from monitoring import views as monitoring_views
 
 urlpatterns = [
+    path('admin/profiles/', monitoring_views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>', monitoring_views.profile_download, name='profile_download'),
+    path('admin/analytics/', analytics_views.dashboard, name='analytics_dashboard'),
+    path('admin/analytics/refresh/', analytics_views.refresh, name='analytics_refresh'),
     path('admin/', admin.site.urls),
     path('', include('shop.urls')),
     path('cart/', include('cart.urls')),
     path('accounts/', include('accounts.urls')),
+    path('mail/', include('mailer.urls')),
+    path('', include('monitoring.urls')),
+    path('', include('seo.urls')),
 ]
 
 if settings.DEBUG:
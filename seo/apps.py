@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SeoConfig(AppConfig):
+    name = 'seo'
+    verbose_name = 'Карта сайта'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,76 @@
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import time
+from xml.etree.ElementTree import iterparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from seo import sitemap
+from shop import synthetic
+
+NAMESPACE = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сборка карты сайта на синтетическом каталоге: полная, без изменений и после '
+        'изменения части товаров; размер файлов и проверка, что части читаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=300000)
+        parser.add_argument('--changed', default='10,1000', help='Сколько товаров менять, через запятую')
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp(prefix='bench-sitemap-')
+        try:
+            # Без перекрытия: товары только что созданы, с ним каждая сборка брала бы все
+            with override_settings(DEBUG=False, SITEMAP_ROOT=root, SITEMAP_OVERLAP=0), \
+                    synthetic.synthetic_database(name='bench_sitemap.sqlite3'):
+                synthetic.populate_catalog(options['products'])
+                synthetic.analyze()
+                self.run(root, [int(n) for n in options['changed'].split(',')])
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def run(self, root, changes):
+        from shop.models import Product
+
+        product_ids = list(Product.objects.values_list('pk', flat=True))
+        self.stdout.write(f'{"Сборка":<22}{"частей":>7}{"с":>8}{"МиБ":>8}')
+        self.measure(root, 'полная', full=True)
+        self.check_files(Product.objects.filter(is_available=True).count())
+        self.measure(root, 'без изменений')
+        for count in changes:
+            changed = random.Random(count).sample(product_ids, min(count, len(product_ids)))
+            Product.objects.filter(pk__in=changed).update(updated_at=timezone.now())
+            self.measure(root, f'изменено {count}')
+        self.check_files(Product.objects.filter(is_available=True).count())
+
+    def measure(self, root, title, full=False):
+        started = time.perf_counter()
+        shards = sitemap.run(full=full)
+        elapsed = time.perf_counter() - started
+        size = sum(entry.stat().st_size for entry in os.scandir(root))
+        self.stdout.write(f'{title:<22}{shards:>7}{elapsed:>8.2f}{size / 1024 / 1024:>8.1f}')
+
+    def check_files(self, expected):
+        """Каждая часть из индекса читается и не длиннее 50 000 адресов; товаров столько, сколько в каталоге"""
+        products = 0
+        with gzip.open(sitemap.path('index')) as f:
+            locations = [element.text for _, element in iterparse(f) if element.tag == f'{NAMESPACE}loc']
+        for location in locations:
+            name = location.rsplit('/sitemap-', 1)[1].removesuffix('.xml.gz')
+            with gzip.open(sitemap.path(name)) as f:
+                urls = sum(1 for _, element in iterparse(f) if element.tag == f'{NAMESPACE}url')
+            if urls > 50000:
+                raise CommandError(f'{name}: {urls} адресов, больше 50 000')
+            if name.startswith('products-'):
+                products += urls
+        if products != expected:
+            raise CommandError(f'В карте {products} товаров, в каталоге {expected}')
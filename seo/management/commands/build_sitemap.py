@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from seo import sitemap
+from seo.models import SitemapState
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает части карты сайта с изменившимися товарами, страницы и индекс. '
+        'Для cron; задача seo.build_sitemap делает то же в очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересобрать все части')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        shards = sitemap.run(full=options['full'])
+        urls = SitemapState.objects.values_list('urls', flat=True).get(pk=1)
+        self.stdout.write(
+            f'Пересобрано частей товаров: {shards}, адресов в карте: {urls} за {time.perf_counter() - started:.1f} с'
+        )
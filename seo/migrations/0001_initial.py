@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True, verbose_name='Номер части')),
+                ('urls', models.PositiveIntegerField(default=0, verbose_name='Адресов')),
+                ('lastmod', models.DateTimeField(blank=True, null=True, verbose_name='Последнее изменение')),
+                ('stale', models.BooleanField(default=False, verbose_name='Пересобрать')),
+            ],
+            options={
+                'verbose_name': 'Часть карты сайта',
+                'verbose_name_plural': 'Части карты сайта',
+            },
+        ),
+        migrations.CreateModel(
+            name='SitemapState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watermark', models.DateTimeField(blank=True, null=True, verbose_name='Учтены изменения до')),
+                ('built_at', models.DateTimeField(blank=True, null=True, verbose_name='Собрана')),
+                ('shard_size', models.PositiveIntegerField(default=0, verbose_name='Товаров в части')),
+                ('urls', models.PositiveIntegerField(default=0, verbose_name='Адресов')),
+                ('rebuilt', models.PositiveIntegerField(default=0, verbose_name='Частей пересобрано')),
+            ],
+            options={
+                'verbose_name': 'Состояние карты сайта',
+                'verbose_name_plural': 'Состояние карты сайта',
+            },
+        ),
+    ]
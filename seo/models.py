@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class SitemapState(models.Model):
+    """Одна строка: до какого момента изменения товаров учтены в карте сайта"""
+    watermark = models.DateTimeField('Учтены изменения до', null=True, blank=True)
+    built_at = models.DateTimeField('Собрана', null=True, blank=True)
+    # Размер части, с которым нарезаны файлы; другой размер — полная сборка
+    shard_size = models.PositiveIntegerField('Товаров в части', default=0)
+    urls = models.PositiveIntegerField('Адресов', default=0)
+    rebuilt = models.PositiveIntegerField('Частей пересобрано', default=0)
+
+    class Meta:
+        verbose_name = 'Состояние карты сайта'
+        verbose_name_plural = 'Состояние карты сайта'
+
+    def __str__(self):
+        return f'Карта сайта на {self.watermark}'
+
+
+class SitemapShard(models.Model):
+    """Файл sitemap-products-<number>.xml.gz: товары с id // shard_size == number"""
+    number = models.PositiveIntegerField('Номер части', unique=True)
+    urls = models.PositiveIntegerField('Адресов', default=0)
+    lastmod = models.DateTimeField('Последнее изменение', null=True, blank=True)
+    # Удалён товар: updated_at его больше не покажет
+    stale = models.BooleanField('Пересобрать', default=False)
+
+    class Meta:
+        verbose_name = 'Часть карты сайта'
+        verbose_name_plural = 'Части карты сайта'
+
+    def __str__(self):
+        return f'products-{self.number}'
@@ -0,0 +1,30 @@
+"""Изменения каталога ставят сборку карты сайта (seo/sitemap.py)"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shop.bulk import products_bulk_updated
+from shop.models import Brand, Category, Product
+
+from .models import SitemapShard
+from .tasks import schedule
+
+
+@receiver(post_save, sender=Product)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule()
+
+
+@receiver(products_bulk_updated, sender=Product)
+def products_bulk_changed(sender, ids, **kwargs):
+    schedule()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # Удалённого товара нет среди изменённых по updated_at
+    SitemapShard.objects.filter(number=instance.pk // settings.SITEMAP_SHARD_SIZE).update(stale=True)
+    schedule()
@@ -0,0 +1,190 @@
+"""
+Карта сайта для поисковых роботов: индекс sitemap.xml и файлы частей
+в SITEMAP_ROOT, сжатые gzip заранее и отдаваемые как есть (seo/views.py).
+
+Товары делятся на части по id (id // SITEMAP_SHARD_SIZE, не больше 50 000
+адресов — предел протокола); lastmod товара — updated_at. Страницы,
+бренды и категории — одна часть pages: их сотни, она пересобирается
+при каждой сборке.
+
+Сборка инкрементальная, как у фидов (feeds/builder.py): SitemapState.watermark
+помнит момент начала прошлой сборки, и заново пишутся только части
+товаров с updated_at не раньше него и части удалённых товаров (stale,
+seo/signals.py). Индекс перечисляет части с их lastmod и пишется
+после них.
+"""
+import gzip
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from shop.models import Brand, Category, Product
+from tasks import queue
+
+from .models import SitemapShard, SitemapState
+
+# Сколько номеров частей в одном IN (...)
+CHUNK_SIZE = 500
+# Разделы сайта без параметров: имя адреса в shop.urls
+PAGES = ['home', 'product_list', 'brand_list', 'category_list', 'sales', 'delivery', 'warranty']
+# Строк за одно чтение iterator() и одну запись в gzip
+WRITE_BATCH = 2000
+
+URLSET_START = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_END = '</urlset>\n'
+INDEX_START = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+INDEX_END = '</sitemapindex>\n'
+
+
+def path(name):
+    return os.path.join(settings.SITEMAP_ROOT, f'{name}.xml.gz')
+
+
+def _text(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _lastmod(value):
+    return f'<lastmod>{value.isoformat(timespec="seconds")}</lastmod>' if value else ''
+
+
+def _entry(tag, loc, lastmod=None):
+    return f'<{tag}><loc>{_text(loc)}</loc>{_lastmod(lastmod)}</{tag}>\n'
+
+
+def _absolute(name, **kwargs):
+    return settings.SITE_URL.rstrip('/') + reverse(f'shop:{name}', kwargs=kwargs)
+
+
+def write(name, parts):
+    """Сжимает куски текста во временный файл и подменяет файл карты"""
+    target = path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp, 'wb') as f:
+        # mtime=0: одинаковое содержимое даёт одинаковые байты
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=settings.SITEMAP_COMPRESSLEVEL, mtime=0) as archive:
+            for part in parts:
+                archive.write(part.encode())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, target)
+
+
+def _batched(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= WRITE_BATCH:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def render_pages():
+    """Часть pages: разделы, активные бренды и категории; возвращает число адресов"""
+    urls = [_absolute(name) for name in PAGES]
+    urls += [
+        _absolute('brand_detail', slug=slug)
+        for slug in Brand.objects.filter(is_active=True).order_by('name').values_list('slug', flat=True)
+    ]
+    urls += [
+        _absolute('category_detail', category_slug=slug)
+        for slug in Category.objects.filter(is_active=True).order_by('path').values_list('slug', flat=True)
+    ]
+    write('pages', [URLSET_START, *_batched(_entry('url', url) for url in urls), URLSET_END])
+    return len(urls)
+
+
+def render_shard(number, size):
+    """Пишет часть товаров; возвращает (число адресов, последний updated_at)"""
+    # reverse() один раз: адрес товара — подстановка slug в шаблон
+    template = _absolute('product_detail', slug='__slug__')
+    rows = (
+        Product.objects.filter(id__gte=number * size, id__lt=(number + 1) * size, is_available=True)
+        .order_by('id').values_list('slug', 'updated_at')
+    )
+    count = 0
+    lastmod = None
+
+    def entries():
+        nonlocal count, lastmod
+        for slug, updated_at in rows.iterator(chunk_size=WRITE_BATCH):
+            count += 1
+            if lastmod is None or updated_at > lastmod:
+                lastmod = updated_at
+            yield _entry('url', template.replace('__slug__', slug), updated_at)
+
+    name = f'products-{number}'
+    write(name, [URLSET_START, *_batched(entries()), URLSET_END])
+    if not count and os.path.exists(path(name)):
+        os.unlink(path(name))
+    return count, lastmod
+
+
+def file_url(name):
+    return settings.SITE_URL.rstrip('/') + reverse('seo:sitemap_file', kwargs={'name': name})
+
+
+def write_index(built_at):
+    entries = [_entry('sitemap', file_url('pages'), built_at)]
+    entries += [
+        _entry('sitemap', file_url(f'products-{number}'), lastmod)
+        for number, lastmod in SitemapShard.objects.order_by('number').values_list('number', 'lastmod')
+    ]
+    write('index', [INDEX_START, *entries, INDEX_END])
+
+
+def _numbers(products, size):
+    return set(products.annotate(number=F('id') / size).order_by().values_list('number', flat=True).distinct())
+
+
+def run(full=False):
+    """
+    Пересобирает изменившиеся части товаров (full — все), часть pages и индекс.
+    Возвращает число пересобранных частей товаров.
+    """
+    state, _ = SitemapState.objects.get_or_create(pk=1)
+    size = settings.SITEMAP_SHARD_SIZE
+    started = timezone.now()
+    if full or state.watermark is None or state.shard_size != size or not os.path.exists(path('index')):
+        numbers = _numbers(Product.objects.all(), size)
+        # Части, где товаров не осталось, удаляются
+        numbers |= set(SitemapShard.objects.values_list('number', flat=True))
+        if state.shard_size != size:
+            SitemapShard.objects.all().delete()
+    else:
+        # Перекрытие: транзакция, начатая до прошлой сборки, могла зафиксироваться после неё
+        since = state.watermark - timedelta(seconds=settings.SITEMAP_OVERLAP)
+        numbers = _numbers(Product.objects.filter(updated_at__gte=since), size)
+        stale = sorted(SitemapShard.objects.filter(stale=True).values_list('number', flat=True))
+        # Метка снимается до записи: поставленная во время сборки дождётся следующей
+        for start in range(0, len(stale), CHUNK_SIZE):
+            SitemapShard.objects.filter(number__in=stale[start:start + CHUNK_SIZE]).update(stale=False)
+        numbers |= set(stale)
+
+    for number in sorted(numbers):
+        urls, lastmod = render_shard(number, size)
+        if urls:
+            SitemapShard.objects.update_or_create(number=number, defaults={'urls': urls, 'lastmod': lastmod})
+        else:
+            SitemapShard.objects.filter(number=number).delete()
+        # Полная сборка большого каталога дольше аренды задачи
+        queue.renew()
+    pages = render_pages()
+    write_index(started)
+
+    SitemapState.objects.filter(pk=state.pk).update(
+        watermark=started, built_at=timezone.now(), shard_size=size,
+        urls=pages + (SitemapShard.objects.aggregate(total=Sum('urls'))['total'] or 0), rebuilt=len(numbers),
+    )
+    return len(numbers)
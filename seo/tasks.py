@@ -0,0 +1,17 @@
+"""Фоновые задачи карты сайта; регистрируются при запуске (tasks.apps)"""
+from django.conf import settings
+
+from tasks.queue import task
+
+from . import sitemap
+
+
+@task(name='seo.build_sitemap', priority=-5, max_attempts=2, lease=1800)
+def build_sitemap(full=False):
+    """Пересборка карты сайта (см. manage.py build_sitemap)"""
+    sitemap.run(full=full)
+
+
+def schedule():
+    """Сборка через SITEMAP_BUILD_DELAY; изменения за это время сливаются в одну задачу"""
+    build_sitemap.enqueue(dedupe_key='seo-sitemap', countdown=settings.SITEMAP_BUILD_DELAY)
@@ -0,0 +1,10 @@
+from django.urls import path, re_path
+from . import views
+
+app_name = 'seo'
+
+urlpatterns = [
+    path('robots.txt', views.robots_txt, name='robots'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    re_path(r'^sitemap-(?P<name>pages|products-\d+)\.xml\.gz$', views.sitemap_file, name='sitemap_file'),
+]
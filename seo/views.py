@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from . import sitemap
+
+
+def _open(request, name):
+    """(файл, mtime) части name; None — у клиента та же версия"""
+    try:
+        f = open(sitemap.path(name), 'rb')
+    except FileNotFoundError:
+        raise Http404('Карта сайта ещё не собрана')
+    mtime = os.fstat(f.fileno()).st_mtime
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+        f.close()
+        return None
+    return f, mtime
+
+
+@require_safe
+def sitemap_index(request):
+    """Индекс карты сайта; сжатый файл отдаётся с Content-Encoding: gzip без распаковки"""
+    opened = _open(request, 'index')
+    if opened is None:
+        return HttpResponseNotModified()
+    f, mtime = opened
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = FileResponse(f, content_type='application/xml')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = FileResponse(gzip.GzipFile(fileobj=f), content_type='application/xml')
+    response['Last-Modified'] = http_date(mtime)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@require_safe
+def sitemap_file(request, name):
+    """Часть карты сайта — файл .xml.gz: протокол sitemaps принимает его сжатым"""
+    opened = _open(request, name)
+    if opened is None:
+        return HttpResponseNotModified()
+    f, mtime = opened
+    response = FileResponse(f, content_type='application/gzip')
+    response['Last-Modified'] = http_date(mtime)
+    return response
+
+
+@require_safe
+def robots_txt(request):
+    return render(request, 'seo/robots.txt', {
+        'sitemap_url': settings.SITE_URL.rstrip('/') + reverse('seo:sitemap'),
+    }, content_type='text/plain; charset=utf-8')
@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Brand, Category, Product, ProductImage, Review, Banner
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.shortcuts import render
+from .admin_utils import ExportAdminMixin, LargeTableAdminMixin, ExactSearchAdminMixin, selection_count
+from .bulk import describe_changes, start_job
+from .catalog import bump_products
+from .exports import ProductExport
+from .forms import BulkEditForm
+from .models import Brand, Category, Product, ProductImage, Review, Banner, BulkEditJob
 
 
 class ProductImageInline(admin.TabularInline):
@@ -20,24 +29,34 @@ class BrandAdmin(admin.ModelAdmin):
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'parent', 'is_active', 'order']
     list_filter = ['is_active', 'parent']
+    list_select_related = ['parent']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['order']
+    autocomplete_fields = ['parent']
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ExportAdminMixin, LargeTableAdminMixin, ExactSearchAdminMixin, admin.ModelAdmin):
     list_display = [
         'name', 'brand', 'category', 'price', 'old_price',
         'stock', 'is_available', 'is_featured', 'is_new', 'created_at'
     ]
+    # Только бренды и категории, у которых есть товары
     list_filter = [
         'is_available', 'is_featured', 'is_new',
-        'brand', 'category', 'waterproof_rating'
+        ('brand', admin.RelatedOnlyFieldListFilter),
+        ('category', admin.RelatedOnlyFieldListFilter),
+        'waterproof_rating'
     ]
-    search_fields = ['name', 'sku', 'description']
+    list_select_related = ['brand', 'category']
+    search_fields = ['name', 'sku']
+    exact_search_fields = ['sku', 'slug']
+    prefix_search_fields = ['name']
     prepopulated_fields = {'slug': ('name',)}
-    list_editable = ['price', 'old_price', 'stock', 'is_available', 'is_featured', 'is_new']
+    autocomplete_fields = ['brand', 'category']
+    actions = ['bulk_edit', 'export']
+    export_class = ProductExport
     inlines = [ProductImageInline]
     fieldsets = (
         ('Основная информация', {
@@ -65,18 +84,75 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def normalize_search_term(self, field, term):
+        return term.upper() if field == 'sku' else term
+
+    @admin.action(description='Массово изменить цены, остатки и флаги')
+    def bulk_edit(self, request, queryset):
+        if 'apply' in request.POST:
+            form = BulkEditForm(request.POST)
+            if form.is_valid():
+                changes = form.get_changes()
+                product_ids = list(queryset.values_list('id', flat=True))
+                job = BulkEditJob.objects.create(
+                    created_by=request.user,
+                    description=describe_changes(changes),
+                    changes=changes,
+                    product_ids=product_ids,
+                    total=len(product_ids),
+                )
+                start_job(job)
+                self.message_user(
+                    request,
+                    f'Задание #{job.pk} запущено для {job.total} товаров. '
+                    f'Прогресс — в разделе «Массовые изменения».'
+                )
+                return None
+        else:
+            form = BulkEditForm()
+        return render(request, 'admin/shop/product/bulk_edit.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Массовое изменение товаров',
+            'opts': self.model._meta,
+            'form': form,
+            'queryset': queryset,
+            'count': selection_count(request, queryset),
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
+
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdminMixin, ExactSearchAdminMixin, admin.ModelAdmin):
     list_display = ['product', 'user', 'rating', 'is_approved', 'created_at']
     list_filter = ['is_approved', 'rating', 'created_at']
+    list_select_related = ['product__brand', 'user']
     search_fields = ['product__name', 'user__username', 'text']
+    exact_search_fields = ['user__username', 'product__sku']
     list_editable = ['is_approved']
+    raw_id_fields = ['product', 'user']
     actions = ['approve_reviews']
 
+    def get_search_results(self, request, queryset, search_term):
+        """Полнотекстовый поиск по индексу shop_review_fts"""
+        words = search_term.split()
+        if not words or connection.vendor != 'sqlite':
+            return super().get_search_results(request, queryset, search_term)
+        # Каждое слово ищется как префикс: "самок"* найдёт «самокат»
+        match = ' '.join('"%s"*' % word.replace('"', '""') for word in words)
+        q = self.get_exact_search_q(search_term)
+        q |= Q(id__in=RawSQL(
+            'SELECT rowid FROM shop_review_fts WHERE shop_review_fts MATCH %s',
+            [match]
+        ))
+        return queryset.filter(q), False
+
     @admin.action(description='Одобрить выбранные отзывы')
     def approve_reviews(self, request, queryset):
+        product_ids = list(queryset.values_list('product_id', flat=True))
         queryset.update(is_approved=True)
+        bump_products(product_ids)
 
 
 @admin.register(Banner)
@@ -85,3 +161,22 @@ class BannerAdmin(admin.ModelAdmin):
     list_filter = ['is_active']
     list_editable = ['is_active', 'order']
     search_fields = ['title', 'subtitle']
+
+
+@admin.register(BulkEditJob)
+class BulkEditJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'description', 'status', 'progress', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    list_select_related = ['created_by']
+    readonly_fields = [
+        'created_by', 'description', 'changes', 'status', 'total',
+        'processed', 'error', 'created_at', 'finished_at'
+    ]
+    exclude = ['product_ids']
+
+    @admin.display(description='Прогресс')
+    def progress(self, obj):
+        return f'{obj.processed}/{obj.total} ({obj.progress_percent}%)'
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,138 @@
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import render
+from django.utils.functional import cached_property
+
+from scootermall.exports import ExportForm
+
+# Ниже этого порога точный COUNT(*) дешевле любых оценок
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimate_row_count(model, using='default'):
+    """Приблизительное число строк таблицы без полного COUNT(*)"""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 заполняется командой ANALYZE. Первое число stat — строки
+            # таблицы (idx IS NULL) или индекса; частичный индекс покрывает не все строки
+            try:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND (idx IS NULL OR idx IN '
+                    '(SELECT name FROM pragma_index_list(%s) WHERE partial = 0))',
+                    [model._meta.db_table, model._meta.db_table]
+                )
+                rows = cursor.fetchall()
+            except Exception:
+                rows = []
+            counts = [int(stat.split()[0]) for stat, in rows if stat]
+            if counts:
+                return max(counts)
+        # Максимальный первичный ключ читается из индекса за O(log n)
+        pk = connection.ops.quote_name(model._meta.pk.column)
+        cursor.execute(f'SELECT MAX({pk}) FROM {table}')
+        row = cursor.fetchone()
+    return row[0] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает COUNT(*) для больших нефильтрованных таблиц"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(queryset.model, using=queryset.db)
+            if estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def selection_count(request, queryset):
+    """
+    Сколько строк затронет действие: отмеченные — по числу id в запросе,
+    «выбрать все» — как в списке, оценкой для большой таблицы без фильтров
+    """
+    if request.POST.get('select_across', '0') == '0':
+        return len(request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME))
+    return EstimatedCountPaginator(queryset, 1).count
+
+
+class LargeTableAdminMixin:
+    """Настройки списка для таблиц с миллионами строк"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class ExactSearchAdminMixin:
+    """
+    Поиск только по индексируемым условиям.
+
+    icontains превращается в LIKE '%...%' и всегда читает таблицу целиком.
+    Точное сравнение и префикс, записанный как диапазон [term, term + U+10FFFF),
+    отвечаются поиском по индексу.
+    """
+    exact_search_fields = ()
+    prefix_search_fields = ()
+
+    def normalize_search_term(self, field, term):
+        return term
+
+    def get_exact_search_q(self, search_term):
+        term = search_term.strip()
+        q = Q()
+        if not term:
+            return q
+        for field in self.exact_search_fields:
+            q |= Q(**{field: self.normalize_search_term(field, term)})
+        for field in self.prefix_search_fields:
+            q |= Q(**{f'{field}__gte': term, f'{field}__lt': term + '\U0010ffff'})
+        return q
+
+    def get_search_results(self, request, queryset, search_term):
+        q = self.get_exact_search_q(search_term)
+        if not q:
+            return queryset, False
+        return queryset.filter(q), False
+
+
+class ExportAdminMixin:
+    """
+    Действие «Выгрузить»: выбранные строки или, с «выбрать все», все строки
+    с фильтрами и поиском списка уходят потоковой выгрузкой export_class
+    (scootermall/exports.py) в CSV или XLSX
+    """
+    export_class = None
+
+    @admin.action(description='Выгрузить в Excel или CSV')
+    def export(self, request, queryset):
+        export = self.export_class()
+        if 'apply' in request.POST:
+            form = ExportForm(export, request.POST)
+            if form.is_valid():
+                return export.response(queryset, form.cleaned_data['format'], form.cleaned_data['columns'])
+        else:
+            form = ExportForm(export)
+        return render(request, 'admin/export.html', {
+            **self.admin_site.each_context(request),
+            'title': f'Выгрузка: {export.title.lower()}',
+            'opts': self.model._meta,
+            'form': form,
+            'count': selection_count(request, queryset),
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
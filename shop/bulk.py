@@ -0,0 +1,176 @@
+"""
+Массовое изменение цен, остатков и флагов товаров.
+
+Изменения применяются set-based UPDATE-ами по пачкам id, без загрузки
+моделей и без full_clean на каждую строку. После каждой пачки один раз
+отправляется сигнал products_bulk_updated — на него подписываются кеши
+и поисковые индексы. Задания из админки выполняет обработчик очереди
+задач (manage.py run_workers).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest, Round
+from django.dispatch import Signal
+from django.utils import timezone
+
+from tasks import queue
+from tasks.queue import task
+
+from .models import BulkEditJob, Product
+
+# Отправляется один раз на пачку: sender=Product, ids=[...]
+products_bulk_updated = Signal()
+
+CHUNK_SIZE = 1000
+
+FLAG_FIELDS = ('is_available', 'is_featured', 'is_new')
+
+
+def _new_price(mode, value):
+    if mode == 'percent':
+        return Greatest(Round(F('price') * (1 + value / 100)), Value(0))
+    if mode == 'delta':
+        return Greatest(F('price') + value, Value(0))
+    if mode == 'set':
+        return Value(value)
+    raise ValueError(f'Неизвестный режим цены: {mode}')
+
+
+def build_updates(changes):
+    """
+    Переводит описание изменений в аргументы QuerySet.update().
+
+    changes — словарь, который можно сохранить в JSON:
+        price_mode: 'percent' | 'delta' | 'set', price_value: число
+        track_old_price: при снижении цены старая цена запоминается в old_price,
+            при повышении до уровня old_price скидка снимается
+        stock_mode: 'set' | 'delta', stock_value: целое
+        is_available / is_featured / is_new: True | False
+    """
+    updates = {}
+    price_mode = changes.get('price_mode')
+    if price_mode:
+        value = Decimal(str(changes['price_value']))
+        new_price = _new_price(price_mode, value)
+        updates['price'] = new_price
+        if changes.get('track_old_price', True):
+            # В UPDATE справа используются значения колонок до изменения
+            updates['old_price'] = Case(
+                When(price__gt=new_price, old_price__isnull=True, then=F('price')),
+                When(old_price__lte=new_price, then=Value(None)),
+                default=F('old_price'),
+            )
+
+    stock_mode = changes.get('stock_mode')
+    if stock_mode == 'set':
+        updates['stock'] = Value(max(int(changes['stock_value']), 0))
+    elif stock_mode == 'delta':
+        updates['stock'] = Greatest(F('stock') + int(changes['stock_value']), Value(0))
+    elif stock_mode:
+        raise ValueError(f'Неизвестный режим остатка: {stock_mode}')
+
+    for field in FLAG_FIELDS:
+        if changes.get(field) is not None:
+            updates[field] = Value(bool(changes[field]))
+
+    if updates:
+        updates['updated_at'] = timezone.now()
+    return updates
+
+
+def describe_changes(changes):
+    """Краткое описание изменений для списка заданий"""
+    parts = []
+    if changes.get('price_mode') == 'percent':
+        parts.append(f"цена {changes['price_value']}%")
+    elif changes.get('price_mode') == 'delta':
+        parts.append(f"цена {changes['price_value']} ₽")
+    elif changes.get('price_mode') == 'set':
+        parts.append(f"цена = {changes['price_value']} ₽")
+    if changes.get('stock_mode') == 'delta':
+        parts.append(f"остаток {changes['stock_value']:+d}")
+    elif changes.get('stock_mode') == 'set':
+        parts.append(f"остаток = {changes['stock_value']}")
+    for field in FLAG_FIELDS:
+        if changes.get(field) is not None:
+            parts.append(f"{field}={'да' if changes[field] else 'нет'}")
+    return ', '.join(parts)
+
+
+def iter_id_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Keyset-обход id без OFFSET"""
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        chunk = list(ids.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def split_ids(ids, chunk_size=CHUNK_SIZE):
+    ids = sorted(ids)
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def apply_bulk_edit(chunks, changes, progress=None):
+    """
+    Применяет изменения к пачкам id товаров, возвращает число строк.
+
+    chunks — результат iter_id_chunks(queryset) или split_ids(ids).
+    """
+    updates = build_updates(changes)
+    if not updates:
+        return 0
+    done = 0
+    for chunk in chunks:
+        with transaction.atomic():
+            done += Product.objects.filter(pk__in=chunk).update(**updates)
+        products_bulk_updated.send(sender=Product, ids=chunk)
+        if progress:
+            progress(done)
+    return done
+
+
+def job_failed(error, job_id):
+    """Задача не завершилась (обработчик упал, аренда истекла): processed — сколько успели"""
+    BulkEditJob.objects.filter(pk=job_id, status__in=['pending', 'running']).update(
+        status='failed', error=error, finished_at=timezone.now()
+    )
+
+
+# Одна попытка: повтор применил бы процентное изменение цены дважды
+@task(name='shop.bulk_edit', max_attempts=1, lease=3600, on_failure=job_failed)
+def run_job(job_id):
+    """Выполняет задание BulkEditJob, сохраняя прогресс после каждой пачки"""
+    job = BulkEditJob.objects.get(pk=job_id)
+    job.status = 'running'
+    job.save(update_fields=['status'])
+
+    def progress(done):
+        BulkEditJob.objects.filter(pk=job.pk).update(processed=done)
+        if not queue.renew():
+            # Аренду забрали, задание уже помечено ошибкой — дальше не менять
+            raise RuntimeError(f'Аренда задачи истекла, обработано {done}')
+
+    try:
+        processed = apply_bulk_edit(
+            split_ids(job.product_ids), job.changes, progress=progress
+        )
+    except Exception as exc:
+        BulkEditJob.objects.filter(pk=job.pk).update(
+            status='failed', error=repr(exc), finished_at=timezone.now()
+        )
+    else:
+        BulkEditJob.objects.filter(pk=job.pk).update(
+            status='done', processed=processed, finished_at=timezone.now()
+        )
+
+
+def start_job(job):
+    """Ставит задание в очередь задач после коммита транзакции"""
+    run_job.enqueue(args=[job.pk], dedupe_key=f'bulk-edit:{job.pk}')
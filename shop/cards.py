@@ -0,0 +1,96 @@
+"""
+Карточки товаров для списков.
+
+Витрина (каталог, главная, акции, страница бренда) показывает в карточке
+десяток полей товара, а модель Product тянет за собой описание, SEO-тексты
+и по три запроса на карточку (главное фото, рейтинг, число отзывов).
+product_cards() превращает QuerySet товаров в узкий values()-запрос:
+бренд, путь главного изображения и рейтинг приходят в той же строке,
+а строки собираются в ProductCard со __slots__.
+"""
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.query import ValuesIterable
+from django.urls import reverse
+
+from .models import Brand, ProductImage, Review
+
+CARD_FIELDS = (
+    'id', 'name', 'slug', 'price', 'old_price', 'is_new', 'is_featured',
+    'max_speed', 'max_range', 'motor_power',
+)
+
+
+class ProductCard:
+    """Строка списка товаров: только то, что выводит карточка"""
+    __slots__ = CARD_FIELDS + (
+        'brand_name', 'brand_slug', 'image', 'rating', 'reviews_total',
+    )
+
+    def __init__(self, **row):
+        for name in self.__slots__:
+            setattr(self, name, row[name])
+
+    def __str__(self):
+        return f'{self.brand_name} {self.name}'
+
+    def get_absolute_url(self):
+        return reverse('shop:product_detail', kwargs={'slug': self.slug})
+
+    def get_brand_url(self):
+        return reverse('shop:brand_detail', kwargs={'slug': self.brand_slug})
+
+    @property
+    def image_url(self):
+        if not self.image:
+            return ''
+        return ProductImage._meta.get_field('image').storage.url(self.image)
+
+    @property
+    def discount_percent(self):
+        """Процент скидки"""
+        if self.old_price and self.old_price > self.price:
+            return int((self.old_price - self.price) / self.old_price * 100)
+        return 0
+
+    @property
+    def average_rating(self):
+        """Средний рейтинг одобренных отзывов"""
+        return round(self.rating, 1) if self.rating is not None else 0
+
+    @property
+    def review_count(self):
+        return self.reviews_total or 0
+
+
+class ProductCardIterable(ValuesIterable):
+    def __iter__(self):
+        for row in super().__iter__():
+            yield ProductCard(**row)
+
+
+def _approved_reviews():
+    return Review.objects.filter(product=OuterRef('pk'), is_approved=True).order_by().values('product')
+
+
+def product_cards(queryset):
+    """
+    QuerySet товаров -> QuerySet карточек.
+
+    Фильтры, сортировка и срезы исходного запроса сохраняются, результат
+    можно передавать в Paginator. Главное изображение — is_main, иначе
+    первое по порядку, как в админке.
+    """
+    image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('-is_main', 'order', 'id')
+    # Бренд подзапросом по PK, а не JOIN: иначе при фильтре по нескольким
+    # категориям SQLite начинает с shop_brand и сортирует во временном B-дереве
+    brand = Brand.objects.filter(pk=OuterRef('brand_id'))
+    queryset = queryset.values(
+        *CARD_FIELDS,
+        brand_name=Subquery(brand.values('name')),
+        brand_slug=Subquery(brand.values('slug')),
+        image=Subquery(image.values('image')[:1]),
+        rating=Subquery(_approved_reviews().annotate(value=Avg('rating')).values('value')),
+        reviews_total=Subquery(_approved_reviews().annotate(value=Count('id')).values('value')),
+    )
+    queryset._iterable_class = ProductCardIterable
+    return queryset
@@ -0,0 +1,54 @@
+"""
+Справочники витрины в двухуровневом кеше (scootermall/caching.py).
+
+Пространства имён:
+
+* ``catalog`` — дерево категорий, активные бренды, баннеры;
+* ``brand:<id>`` — карточки товаров на странице бренда.
+
+Штампы увеличиваются из сигналов моделей (shop/signals.py), после
+массового изменения товаров и одобрения отзывов в админке.
+"""
+from django.db.models import Count
+
+from scootermall import caching
+
+from .cards import product_cards
+from .models import Banner, Brand, Product
+from .tree import build_tree
+
+
+def brand_namespace(brand_id):
+    return f'brand:{brand_id}'
+
+
+def bump_products(ids):
+    """Инвалидация после изменения товаров в обход save()"""
+    brand_ids = Product.objects.filter(pk__in=ids).values_list('brand_id', flat=True).distinct()
+    caching.bump('catalog', *(brand_namespace(brand_id) for brand_id in brand_ids))
+
+
+@caching.cached('catalog:tree')
+def category_tree():
+    """Дерево категорий с числом товаров (shop/tree.py): меню, крошки, каталог"""
+    return build_tree()
+
+
+@caching.cached('catalog:brands')
+def active_brands():
+    """Бренды для фильтра каталога и главной"""
+    return list(Brand.objects.filter(is_active=True).annotate(product_count=Count('products')))
+
+
+@caching.cached('catalog:banners')
+def active_banners():
+    return list(Banner.objects.filter(is_active=True)[:3])
+
+
+def brand_cards(brand, limit=12):
+    """Карточки товаров бренда"""
+    return caching.get_or_compute(
+        f'brand:{brand.pk}:cards:{limit}',
+        lambda: list(product_cards(Product.objects.filter(brand=brand, is_available=True))[:limit]),
+        namespaces=[brand_namespace(brand.pk)],
+    )
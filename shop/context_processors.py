@@ -1,4 +1,4 @@
-from .models import Product
+from .catalog import category_tree
 
 
 def compare_context(request):
@@ -10,3 +10,9 @@ def compare_context(request):
         'compare_count': compare_count,
         'compare_list': compare_list,
     }
+
+
+def catalog_menu(request):
+    """Дерево категорий для меню в шапке (из кеша, см. shop/catalog.py)"""
+    tree = category_tree()
+    return {'category_tree': tree, 'menu_categories': tree.roots}
@@ -0,0 +1,28 @@
+"""Выгрузка товаров с характеристиками: один запрос с JOIN брендов и категорий"""
+from django.conf import settings
+
+from scootermall.exports import Column, Export
+
+from .models import Product
+
+FIELDS = [
+    'sku', 'name', 'slug', 'brand__name', 'category__name',
+    'price', 'old_price', 'stock', 'is_available', 'is_featured', 'is_new',
+    'max_speed', 'max_range', 'motor_power', 'battery_capacity', 'weight',
+    'max_load', 'wheel_size', 'waterproof_rating', 'has_app', 'has_cruise_control',
+    'created_at', 'updated_at',
+]
+
+
+def _label(path):
+    field = Product._meta.get_field(path.split('__')[0])
+    return str(field.verbose_name)
+
+
+class ProductExport(Export):
+    name = 'products'
+    title = 'Товары'
+    columns = [Column(path, _label(path)) for path in FIELDS]
+
+    def rows(self, queryset, selected):
+        return queryset.values_list(*FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
@@ -0,0 +1,228 @@
+"""
+Подбор самоката по требованиям покупателя.
+
+Жёсткие ограничения (запас хода от 30 км, нагрузка от 110 кг, вес до 15 кг,
+степень защиты не ниже IP54, обязательные функции) отсекают товары,
+мягкие предпочтения с весами ранжируют оставшиеся. Весь каталог
+оценивается за один проход векторными операциями numpy над матрицей
+характеристик: колонки снимка каталога (shop/snapshot.py) читаются
+через np.frombuffer без копирования, а если снимка нет — матрица
+собирается одним запросом и кешируется в пространстве имён ``catalog``.
+
+Оценка по критерию — положение значения между худшим и лучшим среди
+подошедших товаров (0..1), итог — взвешенное среднее. Для каждого
+результата возвращается разбор по критериям.
+"""
+import time
+
+import numpy as np
+
+from scootermall import caching
+
+from . import snapshot
+
+# Критерий -> (подпись, единица, 1 — чем больше, тем лучше, -1 — чем меньше)
+CRITERIA = {
+    'max_range': ('Запас хода', 'км', 1),
+    'max_load': ('Макс. нагрузка', 'кг', 1),
+    'weight': ('Вес', 'кг', -1),
+    'max_speed': ('Макс. скорость', 'км/ч', 1),
+    'motor_power': ('Мощность мотора', 'Вт', 1),
+    'waterproof': ('Защита', 'IP', 1),
+    'price': ('Цена', '₽', -1),
+}
+FEATURES = {
+    'has_app': 'Мобильное приложение',
+    'has_cruise_control': 'Круиз-контроль',
+}
+COLUMNS = ('id', 'flags') + tuple(CRITERIA)
+
+# Веса предпочтений по умолчанию: дешевле и дальше
+DEFAULT_WEIGHTS = {'price': 2, 'max_range': 1}
+
+
+class SpecMatrix:
+    """Колонки характеристик в кодировке снимка: целые, -1 — NULL"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_snapshot(cls, current):
+        return cls({name: np.frombuffer(current.column(name), dtype=current.column(name).format) for name in COLUMNS})
+
+    @classmethod
+    def from_database(cls):
+        from .models import Product
+
+        fields = ['id', 'waterproof_rating'] + list(snapshot.FLAGS) + [name for name in CRITERIA if name != 'waterproof']
+        columns = {name: [] for name in COLUMNS}
+        for row in Product.objects.order_by('-created_at', '-id').values_list(*fields).iterator(chunk_size=5000):
+            values = dict(zip(fields, row))
+            columns['id'].append(values['id'])
+            columns['flags'].append(sum(snapshot.flag(name) for name in snapshot.FLAGS if values[name]))
+            columns['waterproof'].append(snapshot.waterproof_code(values['waterproof_rating']))
+            for name in CRITERIA:
+                if name != 'waterproof':
+                    columns[name].append(snapshot.encode(values[name], snapshot.NUMERIC[name][1]))
+        return cls({
+            name: np.array(values, dtype=snapshot.NUMERIC[name][0]) for name, values in columns.items()
+        })
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+
+def matrix():
+    """Матрица из текущего снимка, иначе из базы (кеш до изменения каталога)"""
+    current = snapshot.current()
+    if current is not None:
+        return SpecMatrix.from_snapshot(current)
+    return caching.get_or_compute('finder:matrix', SpecMatrix.from_database, namespaces=['catalog'])
+
+
+def _scale(name):
+    return snapshot.NUMERIC[name][1] or 1
+
+
+def decode(name, raw):
+    """Значение колонки для вывода: None для NULL, IP54 для защиты"""
+    if raw == -1:
+        return None
+    if name == 'waterproof':
+        return f'IP{raw:02d}'
+    scale = snapshot.NUMERIC[name][1]
+    return raw / scale if scale else int(raw)
+
+
+class Criterion:
+    """Разбор одного критерия для одного результата"""
+    __slots__ = ('field', 'label', 'unit', 'value', 'constraint', 'weight', 'score')
+
+    def __init__(self, field, label, unit, value, constraint, weight, score):
+        self.field = field
+        self.label = label
+        self.unit = unit
+        self.value = value
+        self.constraint = constraint
+        self.weight = weight
+        self.score = score
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FinderResult:
+    __slots__ = ('matched', 'total', 'items', 'elapsed_ms')
+
+    def __init__(self, matched, total, items, elapsed_ms):
+        # Сколько товаров прошло ограничения и сколько оценено всего
+        self.matched = matched
+        self.total = total
+        # [(id товара, итоговая оценка 0..1, [Criterion])] по убыванию оценки
+        self.items = items
+        self.elapsed_ms = elapsed_ms
+
+
+def _constraint_text(name, low, high):
+    label, unit, _ = CRITERIA[name]
+    if name == 'waterproof':
+        return f'не ниже IP{low:02d}' if low is not None else ''
+    parts = []
+    if low is not None:
+        parts.append(f'от {low:g} {unit}')
+    if high is not None:
+        parts.append(f'до {high:g} {unit}')
+    return ' '.join(parts)
+
+
+def find(constraints=None, weights=None, features=None, limit=20, spec=None):
+    """
+    Ранжирует каталог.
+
+    constraints — {критерий: (от, до)}, любая граница может быть None;
+        для waterproof граница «от» — код IP (54), сравнивается по каждой цифре.
+    weights — {критерий или функция: вес 0..10} мягких предпочтений.
+    features — функции, без которых товар не подходит ('has_app', ...).
+    """
+    started = time.perf_counter()
+    constraints = {
+        name: tuple(None if value is None else (int if name == 'waterproof' else float)(value) for value in bounds)
+        for name, bounds in (constraints or {}).items() if name in CRITERIA
+    }
+    weights = {name: weight for name, weight in (weights or DEFAULT_WEIGHTS).items() if weight}
+    features = list(features or [])
+    spec = spec if spec is not None else matrix()
+    columns = spec.columns
+
+    flags = columns['flags']
+    mask = (flags & snapshot.flag('is_available')) != 0
+    for name in features:
+        mask &= (flags & snapshot.flag(name)) != 0
+    for name, (low, high) in constraints.items():
+        column = columns[name]
+        mask &= column != -1
+        if name == 'waterproof':
+            if low is not None:
+                mask &= (column // 10 >= low // 10) & (column % 10 >= low % 10)
+            continue
+        if low is not None:
+            mask &= column >= low * _scale(name)
+        if high is not None:
+            mask &= column <= high * _scale(name)
+    rows = np.flatnonzero(mask)
+
+    scores = {}
+    total = np.zeros(len(rows))
+    weight_sum = sum(weights.values())
+    for name, weight in weights.items():
+        if name in FEATURES:
+            score = ((flags[rows] & snapshot.flag(name)) != 0).astype(float)
+        else:
+            values = columns[name][rows]
+            known = values != -1
+            score = np.zeros(len(rows))
+            if known.any():
+                low, high = values[known].min(), values[known].max()
+                if high > low:
+                    score[known] = (values[known] - low) / (high - low)
+                else:
+                    score[known] = 1.0
+                if CRITERIA[name][2] < 0:
+                    score[known] = 1.0 - score[known]
+        scores[name] = score
+        total += weight * score
+    if weight_sum:
+        total /= weight_sum
+
+    # Лучшие limit: частичная сортировка, при равенстве — порядок витрины (новые первыми)
+    if len(rows) > limit:
+        top = np.argpartition(-total, limit - 1)[:limit]
+    else:
+        top = np.arange(len(rows))
+    top = top[np.lexsort((rows[top], -total[top]))]
+
+    items = []
+    shown = list(dict.fromkeys(list(constraints) + [name for name in weights if name in CRITERIA]))
+    for position in top:
+        row = rows[position]
+        explanation = []
+        for name in shown:
+            label, unit, _ = CRITERIA[name]
+            bounds = constraints.get(name, (None, None))
+            score = scores.get(name)
+            explanation.append(Criterion(
+                name, label, unit, decode(name, int(columns[name][row])),
+                _constraint_text(name, *bounds), weights.get(name, 0),
+                round(float(score[position]), 3) if score is not None else None,
+            ))
+        for name in dict.fromkeys(features + [name for name in weights if name in FEATURES]):
+            score = scores.get(name)
+            explanation.append(Criterion(
+                name, FEATURES[name], '', bool(flags[row] & snapshot.flag(name)),
+                'обязательно' if name in features else '', weights.get(name, 0),
+                round(float(score[position]), 3) if score is not None else None,
+            ))
+        items.append((int(columns['id'][row]), round(float(total[position]), 3), explanation))
+
+    return FinderResult(len(rows), len(spec), items, (time.perf_counter() - started) * 1000)
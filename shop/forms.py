@@ -1,5 +1,6 @@
 from django import forms
-from .models import Review
+from .finder import CRITERIA, DEFAULT_WEIGHTS, FEATURES
+from .models import Product, Review
 
 
 class ReviewForm(forms.ModelForm):
@@ -105,3 +106,169 @@ class ProductFilterForm(forms.Form):
             'class': 'form-checkbox h-4 w-4 text-blue-600 rounded border-gray-300'
         })
     )
+
+
+class BulkEditForm(forms.Form):
+    """Форма массового изменения товаров"""
+    FLAG_CHOICES = [
+        ('', 'Не менять'),
+        ('on', 'Включить'),
+        ('off', 'Выключить'),
+    ]
+
+    price_mode = forms.ChoiceField(
+        label='Цена',
+        required=False,
+        choices=[
+            ('', 'Не менять'),
+            ('percent', 'Изменить на %'),
+            ('delta', 'Изменить на сумму'),
+            ('set', 'Установить'),
+        ]
+    )
+    price_value = forms.DecimalField(label='Значение цены', required=False, decimal_places=2)
+    track_old_price = forms.BooleanField(
+        label='Вести старую цену',
+        required=False,
+        initial=True,
+        help_text='При снижении цены текущая цена сохраняется как старая, '
+                  'при возврате цены скидка снимается'
+    )
+    stock_mode = forms.ChoiceField(
+        label='Остаток',
+        required=False,
+        choices=[
+            ('', 'Не менять'),
+            ('delta', 'Изменить на'),
+            ('set', 'Установить'),
+        ]
+    )
+    stock_value = forms.IntegerField(label='Значение остатка', required=False)
+    is_available = forms.ChoiceField(label='Доступен', required=False, choices=FLAG_CHOICES)
+    is_featured = forms.ChoiceField(label='Рекомендуемый', required=False, choices=FLAG_CHOICES)
+    is_new = forms.ChoiceField(label='Новинка', required=False, choices=FLAG_CHOICES)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('price_mode') and cleaned_data.get('price_value') is None:
+            self.add_error('price_value', 'Укажите значение цены')
+        if cleaned_data.get('stock_mode') and cleaned_data.get('stock_value') is None:
+            self.add_error('stock_value', 'Укажите значение остатка')
+        return cleaned_data
+
+    def get_changes(self):
+        """Изменения в формате shop.bulk.build_updates"""
+        data = self.cleaned_data
+        changes = {}
+        if data.get('price_mode'):
+            changes['price_mode'] = data['price_mode']
+            changes['price_value'] = str(data['price_value'])
+            changes['track_old_price'] = data['track_old_price']
+        if data.get('stock_mode'):
+            changes['stock_mode'] = data['stock_mode']
+            changes['stock_value'] = data['stock_value']
+        for field in ('is_available', 'is_featured', 'is_new'):
+            if data.get(field):
+                changes[field] = data[field] == 'on'
+        return changes
+
+
+class FinderForm(forms.Form):
+    """Подбор самоката: ограничения и веса предпочтений (shop.finder)"""
+    WEIGHT_CHOICES = [(0, 'Неважно'), (1, 'Желательно'), (2, 'Важно'), (3, 'Очень важно')]
+
+    max_range_min = forms.IntegerField(
+        label='Запас хода от, км', required=False, min_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm',
+            'placeholder': '30'
+        })
+    )
+    max_load_min = forms.IntegerField(
+        label='Выдерживает от, кг', required=False, min_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm',
+            'placeholder': '110'
+        })
+    )
+    weight_max = forms.DecimalField(
+        label='Вес до, кг', required=False, min_value=0, decimal_places=2,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm',
+            'placeholder': '15'
+        })
+    )
+    max_speed_min = forms.IntegerField(
+        label='Скорость от, км/ч', required=False, min_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm',
+            'placeholder': '25'
+        })
+    )
+    motor_power_min = forms.IntegerField(
+        label='Мощность от, Вт', required=False, min_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm',
+            'placeholder': '500'
+        })
+    )
+    price_max = forms.IntegerField(
+        label='Цена до, ₽', required=False, min_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm',
+            'placeholder': '50000'
+        })
+    )
+    waterproof_min = forms.ChoiceField(
+        label='Защита не ниже',
+        required=False,
+        choices=[('', 'Любая')] + Product._meta.get_field('waterproof_rating').choices,
+        widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm'})
+    )
+    features = forms.MultipleChoiceField(
+        label='Обязательно',
+        required=False,
+        choices=list(FEATURES.items()),
+        widget=forms.CheckboxSelectMultiple()
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Веса предпочтений: w_<критерий> для каждой характеристики и функции
+        labels = {name: label for name, (label, _, _) in CRITERIA.items()}
+        labels.update(FEATURES)
+        for name, label in labels.items():
+            self.fields[f'w_{name}'] = forms.TypedChoiceField(
+                label=label,
+                required=False,
+                coerce=int,
+                empty_value=0,
+                choices=self.WEIGHT_CHOICES,
+                initial=DEFAULT_WEIGHTS.get(name, 0),
+                widget=forms.Select(attrs={'class': 'px-2 py-1 border border-gray-200 rounded-lg text-sm'})
+            )
+
+    @property
+    def constraint_fields(self):
+        return [self[name] for name in self.fields if not name.startswith('w_')]
+
+    @property
+    def weight_fields(self):
+        return [self[name] for name in self.fields if name.startswith('w_')]
+
+    def get_query(self):
+        """Аргументы shop.finder.find(): ограничения, веса, обязательные функции"""
+        data = self.cleaned_data
+        constraints = {}
+        for name in CRITERIA:
+            if name == 'waterproof':
+                continue
+            low, high = data.get(f'{name}_min'), data.get(f'{name}_max')
+            if low is not None or high is not None:
+                constraints[name] = (low, high)
+        if data.get('waterproof_min'):
+            constraints['waterproof'] = (int(data['waterproof_min'][2:]), None)
+        weights = {
+            name[2:]: data[name] for name in self.fields if name.startswith('w_') and data.get(name)
+        }
+        return {'constraints': constraints, 'weights': weights, 'features': data.get('features') or []}
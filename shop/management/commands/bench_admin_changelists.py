@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from shop import synthetic
+
+CHANGELISTS = [
+    ('Товары', '/admin/shop/product/'),
+    ('Товары: поиск', '/admin/shop/product/?q=Scooter%20100'),
+    ('Товары: фильтр', '/admin/shop/product/?is_available__exact=1&brand__id__exact=1'),
+    ('Отзывы', '/admin/shop/review/'),
+    ('Отзывы: поиск', '/admin/shop/review/?q=заряда'),
+    ('Заказы', '/admin/cart/order/'),
+    ('Заказы: поиск', '/admin/cart/order/?q=ORD-00000042'),
+    ('Заказы: статус', '/admin/cart/order/?status__exact=shipped'),
+    ('Корзины', '/admin/cart/cart/'),
+    ('Позиции корзин', '/admin/cart/cartitem/'),
+    ('Пользователи', '/admin/accounts/user/'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Загружает списки админки на синтетической базе и печатает время и число запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help='Число строк в каждой большой таблице')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу (повторный запуск без генерации)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with synthetic.synthetic_database(keepdb=options['keepdb'], name='bench_admin.sqlite3'):
+            from accounts.models import User
+            if not User.objects.filter(username='bench-admin').exists():
+                self.populate(rows)
+                User.objects.create_superuser('bench-admin', 'admin@example.com', 'bench')
+            connection.cursor().execute('ANALYZE')
+
+            client = Client()
+            client.force_login(User.objects.get(username='bench-admin'))
+            self.stdout.write(f'{"Список":<20}{"запросов":>10}{"мс":>10}')
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                for title, url in CHANGELISTS:
+                    self.measure(client, title, url, options['repeat'])
+
+    def populate(self, rows):
+        def progress(label, done, total):
+            if done == total or done % 100000 == 0:
+                self.stdout.write(f'  {label}: {done}/{total}')
+
+        users = max(1000, rows // 100)
+        synthetic.populate_catalog(rows, progress=progress)
+        synthetic.populate_users(users, progress=progress)
+        synthetic.populate_reviews(rows, progress=progress)
+        synthetic.populate_orders(rows, progress=progress)
+        synthetic.populate_carts(rows, progress=progress)
+
+    def measure(self, client, title, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                self.stderr.write(f'{url}: HTTP {response.status_code}')
+                return
+        self.stdout.write(f'{title:<20}{len(queries):>10}{min(timings) * 1000:>10.1f}')
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from shop import snapshot, synthetic
+
+QUERIES = ('scooter 1', 'brand 7 scooter 42', 'scooter 9999', 'нет такого')
+
+
+def _mapping_kb(path):
+    """Rss и Pss отображения файла в /proc/self/smaps, КБ"""
+    rss = pss = 0
+    inside = False
+    try:
+        with open('/proc/self/smaps') as f:
+            for line in f:
+                if '-' in line.split(' ', 1)[0]:
+                    inside = line.rstrip().endswith(path)
+                elif inside and line.startswith('Rss:'):
+                    rss += int(line.split()[1])
+                elif inside and line.startswith('Pss:'):
+                    pss += int(line.split()[1])
+    except OSError:
+        return None, None
+    return rss, pss
+
+
+def _worker(path, start, queue):
+    current = snapshot.Snapshot(path)
+    # Воркер читает все колонки: страницы файла подтягиваются в память
+    for name in snapshot.NUMERIC:
+        sum(current.column(name))
+    current.search('scooter', limit=10 ** 9)
+    start.wait()
+    queue.put(_mapping_kb(path))
+    start.wait()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает снимок каталога в общей памяти с каталогом в памяти каждого '
+        'воркера и с запросом к базе: сборка, память, поиск для автодополнения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        with synthetic.synthetic_database(name='bench_snapshot.sqlite3'):
+            synthetic.populate_catalog(options['products'])
+            synthetic.analyze()
+            path = os.path.join(tempfile.gettempdir(), f'bench-{os.getpid()}.snapshot')
+            try:
+                self.run(path, options['workers'])
+            finally:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def run(self, path, workers):
+        from shop.models import Product
+
+        started = time.perf_counter()
+        count = snapshot.build(path)
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(
+            f'Снимок: {count} товаров, {os.path.getsize(path) / 1024:.0f} КБ, сборка {build_ms:.0f} мс'
+        )
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        current = snapshot.Snapshot(path)
+        open_ms = (time.perf_counter() - started) * 1000
+        snapshot_heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        # Как строил бы каждый воркер: словари товаров в памяти процесса
+        fields = snapshot.SCALAR + list(snapshot.FLAGS) + ['name', 'slug', 'created_at']
+        in_memory = list(Product.objects.select_related('brand').values(*fields, 'brand__name'))
+        dicts_ms = (time.perf_counter() - started) * 1000
+        dicts_heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.stdout.write(f'{"":<34}{"мс":>10}{"куча КБ":>12}')
+        self.stdout.write(f'{"Открыть снимок (mmap)":<34}{open_ms:>10.2f}{snapshot_heap / 1024:>12.0f}')
+        self.stdout.write(f'{"Загрузить словари в воркер":<34}{dicts_ms:>10.2f}{dicts_heap / 1024:>12.0f}')
+
+        self.stdout.write(f'\n{"Автодополнение, медиана мкс":<34}{"снимок":>10}{"словари":>12}{"база":>10}')
+        for query in QUERIES:
+            self.stdout.write(
+                f'{query!r:<34}'
+                f'{self.measure(lambda: current.search(query, limit=5)):>10.0f}'
+                f'{self.measure(lambda: self.search_dicts(in_memory, query)):>12.0f}'
+                f'{self.measure(lambda: self.search_db(query)):>10.0f}'
+            )
+        del in_memory
+
+        shared = self.shared_memory(path, workers)
+        if shared:
+            rss = sum(r for r, _ in shared) / len(shared)
+            pss = sum(p for _, p in shared) / len(shared)
+            self.stdout.write(
+                f'\n{workers} воркеров с открытым снимком: Rss отображения {rss:.0f} КБ, '
+                f'Pss {pss:.0f} КБ на воркер (страницы общие)'
+            )
+
+    def measure(self, func):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1e6)
+        return statistics.median(timings)
+
+    def search_dicts(self, products, query):
+        query = query.lower()
+        found = []
+        for product in products:
+            if product['is_available'] and query in f"{product['brand__name']} {product['name']}".lower():
+                found.append(product)
+                if len(found) == 5:
+                    break
+        return found
+
+    def search_db(self, query):
+        from shop.models import Product
+
+        return list(Product.objects.filter(
+            Q(name__icontains=query) | Q(brand__name__icontains=query)
+        ).filter(is_available=True).values_list('id', flat=True)[:5])
+
+    def shared_memory(self, path, workers):
+        if not os.path.exists('/proc/self/smaps'):
+            return None
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        start = context.Barrier(workers + 1)
+        processes = [context.Process(target=_worker, args=(path, start, queue)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        start.wait()
+        results = [queue.get() for _ in processes]
+        start.wait()
+        for process in processes:
+            process.join()
+        return [result for result in results if result[0] is not None]
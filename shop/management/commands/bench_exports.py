@@ -0,0 +1,84 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from accounts.exports import CustomerExport
+from accounts.models import User
+from cart.exports import OrderExport
+from cart.models import Order
+from shop import synthetic
+from shop.exports import ProductExport
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка (scootermall/exports.py) на синтетической базе: время, размер файла '
+        'и пик памяти для десятой части строк и для всех — пик не должен расти со строками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=1_000_000, help='Позиций заказов')
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--formats', default='csv,xlsx')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу (повторный запуск без генерации)')
+
+    def handle(self, *args, **options):
+        # Без DEBUG: журнал запросов соединения не попадает в пик памяти
+        debug_off = override_settings(DEBUG=False)
+        with debug_off, synthetic.synthetic_database(keepdb=options['keepdb'], name='bench_exports.sqlite3'):
+            if not Order.objects.exists():
+                self.populate(options)
+            synthetic.analyze()
+            orders = Order.objects.order_by('-created_at', '-pk')
+            tenth = Order.objects.count() // 10
+            cases = [
+                ('заказы, 1/10', OrderExport(), orders.filter(pk__lte=tenth)),
+                ('заказы', OrderExport(), orders),
+                ('товары', ProductExport(), Product.objects.order_by('-created_at', '-pk')),
+                ('покупатели', CustomerExport(), User.objects.order_by('-pk')),
+            ]
+            self.stdout.write(f'{"Выгрузка":<16}{"формат":>7}{"строк":>10}{"МиБ":>8}{"с":>8}{"строк/с":>10}{"пик МиБ":>9}')
+            for fmt in options['formats'].split(','):
+                for title, export, queryset in cases:
+                    self.measure(title, export, queryset, fmt)
+
+    def populate(self, options):
+        def progress(label, done, total):
+            if done == total or done % 100000 == 0:
+                self.stdout.write(f'  {label}: {done}/{total}')
+
+        synthetic.populate_catalog(options['products'], progress=progress)
+        synthetic.populate_users(options['users'], progress=progress)
+        synthetic.populate_orders(options['lines'] // 3, items_per_order=3, progress=progress)
+
+    def measure(self, title, export, queryset, fmt):
+        rows = 0
+        rows_of = export.rows
+
+        def counted(*args):
+            nonlocal rows
+            for row in rows_of(*args):
+                rows += 1
+                yield row
+
+        export.rows = counted
+        # Время — без tracemalloc, он замедляет выгрузку в разы
+        started = time.perf_counter()
+        size = sum(len(chunk) for chunk in export.stream(queryset, fmt))
+        elapsed = time.perf_counter() - started
+
+        export.rows = rows_of
+        tracemalloc.start()
+        for _ in export.stream(queryset, fmt):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{title:<16}{fmt:>7}{rows:>10}{size / 1024 / 1024:>8.1f}{elapsed:>8.1f}'
+            f'{rows / elapsed:>10.0f}{peak / 1024 / 1024:>9.1f}'
+        )
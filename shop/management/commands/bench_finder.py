@@ -0,0 +1,72 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop import finder, snapshot, synthetic
+
+# «30 км до работы, вешу 110 кг, самокат не тяжелее 15 кг» и варианты
+QUERIES = {
+    'Без ограничений': {},
+    'Поездка 30 км, 110 кг, до 15 кг': {
+        'constraints': {'max_range': (30, None), 'max_load': (110, None), 'weight': (None, 15)},
+        'weights': {'price': 2, 'weight': 1},
+    },
+    'IP55+, круиз, все веса': {
+        'constraints': {'waterproof': (55, None), 'price': (None, 120000)},
+        'weights': {name: 1 for name in list(finder.CRITERIA) + list(finder.FEATURES)},
+        'features': ['has_cruise_control'],
+    },
+    'Ничего не подходит': {'constraints': {'max_range': (1000, None)}},
+}
+TARGET_MS = 10
+
+
+class Command(BaseCommand):
+    help = 'Время ранжирования всего каталога подбором самоката (shop.finder) на снимке и на матрице из базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        with synthetic.synthetic_database(name='bench_finder.sqlite3'):
+            synthetic.populate_catalog(options['products'])
+            synthetic.analyze()
+            path = os.path.join(tempfile.gettempdir(), f'bench-finder-{os.getpid()}.snapshot')
+            try:
+                snapshot.build(path)
+                self.run(snapshot.Snapshot(path))
+            finally:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def run(self, current):
+        started = time.perf_counter()
+        from_database = finder.SpecMatrix.from_database()
+        self.stdout.write(
+            f'Матрица из базы: {len(from_database)} товаров, {(time.perf_counter() - started) * 1000:.0f} мс'
+        )
+        started = time.perf_counter()
+        from_snapshot = finder.SpecMatrix.from_snapshot(current)
+        self.stdout.write(f'Матрица из снимка: {(time.perf_counter() - started) * 1e6:.0f} мкс (без копирования)\n')
+
+        self.stdout.write(f'{"":<36}{"подошло":>10}{"медиана мс":>12}{"p95 мс":>10}')
+        for title, query in QUERIES.items():
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                result = finder.find(spec=from_snapshot, **query)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            median = statistics.median(timings)
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            style = self.style.SUCCESS if median < TARGET_MS else self.style.ERROR
+            self.stdout.write(style(f'{title:<36}{result.matched:>10}{median:>12.2f}{p95:>10.2f}'))
+            # Тот же результат на матрице из базы
+            expected = [pk for pk, _, _ in finder.find(spec=from_database, **query).items]
+            if expected != [pk for pk, _, _ in result.items]:
+                raise CommandError(f'{title}: снимок и база ранжируют по-разному')
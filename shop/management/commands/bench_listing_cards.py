@@ -0,0 +1,115 @@
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg, Count, Prefetch, Subquery
+
+from shop import synthetic
+from shop.cards import _approved_reviews, product_cards
+
+
+def _touch(product, image_url, rating, reviews):
+    """То, что карточка выводит в шаблоне"""
+    return (
+        product.get_absolute_url(), str(product), product.name, product.price, product.old_price,
+        product.discount_percent, product.is_new, product.max_speed, product.max_range,
+        product.motor_power, rating, reviews, image_url,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время, число запросов и память страниц списка товаров: '
+        'модели Product и карточки ProductCard из values()-запроса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help='Число товаров в базе')
+        parser.add_argument('--sizes', default='12,100,1000', help='Размеры страниц через запятую')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.repeat = options['repeat']
+        with synthetic.synthetic_database(name='bench_cards.sqlite3'):
+            self.populate(options['products'])
+            self.stdout.write(
+                f'{"Строк":>6}  {"Способ":<28}{"мс":>9}{"запросов":>10}{"пик КБ":>10}{"хранит КБ":>11}'
+            )
+            for size in sizes:
+                for title, page in self.paths():
+                    ms, queries, peak, retained = self.measure(page, size)
+                    self.stdout.write(
+                        f'{size:>6}  {title:<28}{ms:>9.2f}{queries:>10}{peak / 1024:>10.0f}{retained / 1024:>11.0f}'
+                    )
+
+    def populate(self, products):
+        synthetic.populate_catalog(products)
+        synthetic.populate_users(max(100, products // 50))
+        synthetic.populate_reviews(products * 4)
+        synthetic.populate_images(per_product=3)
+        synthetic.analyze()
+
+    def paths(self):
+        from shop.models import Product, ProductImage
+
+        base = Product.objects.filter(is_available=True).order_by('-created_at')
+
+        def models(size):
+            # Как шаблоны до карточек: изображение, рейтинг и отзывы запросом на товар
+            products = list(base.select_related('brand')[:size])
+            for product in products:
+                image = product.images.all().first()
+                _touch(product, image.image.url if image else '', product.average_rating, product.review_count)
+            return products
+
+        def models_prefetched(size):
+            # Лучшее, что можно сделать с моделями: prefetch изображений и подзапросы рейтинга
+            queryset = base.select_related('brand').prefetch_related(
+                Prefetch('images', queryset=ProductImage.objects.order_by('-is_main', 'order', 'id'))
+            ).annotate(
+                rating=Subquery(_approved_reviews().annotate(value=Avg('rating')).values('value')),
+                reviews_total=Subquery(_approved_reviews().annotate(value=Count('id')).values('value')),
+            )
+            products = list(queryset[:size])
+            for product in products:
+                images = product.images.all()
+                _touch(product, images[0].image.url if images else '', product.rating, product.reviews_total)
+            return products
+
+        def cards(size):
+            cards = list(product_cards(base)[:size])
+            for card in cards:
+                _touch(card, card.image_url, card.average_rating, card.review_count)
+            return cards
+
+        return [
+            ('модели (N+1)', models),
+            ('модели + prefetch', models_prefetched),
+            ('карточки', cards),
+        ]
+
+    def measure(self, page, size):
+        """Медиана времени, число запросов, пик памяти и память, которую держит страница"""
+        page(size)  # прогрев кеша страниц SQLite и reverse()
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            page(size)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            tracemalloc.start()
+            rows = page(size)
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        del rows
+        return statistics.median(timings), queries, peak, retained
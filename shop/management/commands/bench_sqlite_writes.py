@@ -0,0 +1,213 @@
+import multiprocessing
+import random
+import sqlite3
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.test.utils import override_settings
+
+from shop import synthetic
+
+# Доли операций: просмотр страницы (запись сессии), добавление в корзину, оформление
+MIX = (('session', 0.55), ('cart_add', 0.30), ('checkout', 0.15))
+
+
+def _session_write():
+    from django.contrib.sessions.backends.db import SessionStore
+
+    session = SessionStore()
+    session['compare_list'] = [time.time()]
+    session.save()
+
+
+def _cart_add(rng, product_ids, session_key):
+    """Как cart.views.cart_add: корзина сессии и позиция"""
+    from cart.models import Cart, CartItem
+    from shop.models import Product
+
+    cart, _ = Cart.objects.get_or_create(session_id=session_key, user=None)
+    product = Product.objects.get(pk=rng.choice(product_ids))
+    item, created = CartItem.objects.get_or_create(
+        cart=cart, product=product, defaults={'quantity': 1}
+    )
+    if not created:
+        CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + 1)
+
+
+def _checkout(rng, product_ids, user_ids, number, session_key):
+    """Как cart.views.checkout: заказ в основной базе, затем очистка корзины"""
+    from cart.models import Cart, Order, OrderItem
+    from cart.snapshots import fill_snapshots
+    from shop.models import Product
+
+    cart = Cart.objects.filter(session_id=session_key, user=None).first()
+    items = list(cart.items.prefetch_related('product')) if cart else []
+    started = time.perf_counter()
+    with transaction.atomic():
+        product = Product.objects.get(pk=rng.choice(product_ids))
+        order = Order.objects.create(
+            user_id=rng.choice(user_ids),
+            order_number=number,
+            first_name='Иван',
+            last_name='Петров',
+            phone='+79000000000',
+            email='bench@example.com',
+            city='Москва',
+            address='ул. Тверская, 1',
+            total_amount=product.price,
+        )
+        lines = (
+            [OrderItem(order=order, product=item.product, quantity=item.quantity,
+                       price=item.product.price) for item in items]
+            or [OrderItem(order=order, product=product, quantity=1, price=product.price)]
+        )
+        fill_snapshots(lines)
+        OrderItem.objects.bulk_create(lines)
+        Product.objects.filter(pk=product.pk, stock__gt=0).update(stock=F('stock') - 1)
+    order_ms = (time.perf_counter() - started) * 1000
+    if cart:
+        cart.items.all().delete()
+    return order_ms
+
+
+def _worker(profiles, prefix, seconds, seed, ids, queue):
+    for alias, profile in profiles.items():
+        connections.settings[alias] = profile
+        connections[alias] = connections.create_connection(alias)
+    rng = random.Random(seed)
+    sessions = [f'{prefix}{seed:03d}-{i:04d}' for i in range(20)]
+    operations = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    result = {
+        'checkout': 0, 'cart_add': 0, 'session': 0, 'errors': 0, 'checkout_ms': [], 'order_ms': [],
+    }
+    deadline = time.monotonic() + seconds
+    number = 0
+    try:
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                if operation == 'checkout':
+                    number += 1
+                    order_ms = _checkout(
+                        rng, *ids, f'{prefix}{seed:03d}-{number:09d}', rng.choice(sessions)
+                    )
+                    result['order_ms'].append(order_ms)
+                    result['checkout_ms'].append((time.perf_counter() - started) * 1000)
+                elif operation == 'cart_add':
+                    _cart_add(rng, ids[0], rng.choice(sessions))
+                else:
+                    _session_write()
+                result[operation] += 1
+            except OperationalError as exc:
+                result['errors'] += 1
+                result.setdefault('error', str(exc))
+            # Как request_finished: соединение закрывается, если CONN_MAX_AGE = 0
+            close_old_connections()
+    except Exception as exc:
+        result['error'] = repr(exc)
+    finally:
+        for alias in profiles:
+            connections[alias].close()
+        queue.put(result)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает SQLite параллельными записями (сессии, корзины, оформление заказов): '
+        'настройки SQLite по умолчанию, продакшен-профиль и отдельные базы для сессий и корзин'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Число параллельных процессов')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Длительность каждого прогона')
+
+    def handle(self, *args, **options):
+        self.options = options
+        mix = ', '.join(f'{name} {weight:.0%}' for name, weight in MIX)
+        self.stdout.write(f'{options["workers"]} процессов, {options["seconds"]:.0f} с, {mix}')
+        self.stdout.write(
+            f'{"Сценарий":<34}{"заказов/с":>10}{"корзин/с":>10}{"сессий/с":>10}'
+            f'{"ошибок":>8}{"p50 мс":>9}{"p95 мс":>9}{"заказ p95":>11}'
+        )
+        production = settings.DATABASES['default']
+        stock = {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}, 'CONN_MAX_AGE': 0}
+        tuned = {
+            'ENGINE': production['ENGINE'],
+            'OPTIONS': production.get('OPTIONS', {}),
+            'CONN_MAX_AGE': production.get('CONN_MAX_AGE', 0),
+            'CONN_HEALTH_CHECKS': production.get('CONN_HEALTH_CHECKS', False),
+        }
+
+        # Все таблицы в одном файле, как до появления DATABASE_ROUTING
+        with override_settings(DATABASE_ROUTING={}):
+            with synthetic.synthetic_database(name='bench_writes.sqlite3'):
+                ids = self.populate()
+                self.scenario('SQLite по умолчанию, один файл', 'DELETE', ['default'], stock, 'D', ids)
+                self.scenario('WAL + IMMEDIATE, один файл', 'WAL', ['default'], tuned, 'W', ids)
+
+        with synthetic.synthetic_database(name='bench_writes.sqlite3'):
+            ids = self.populate()
+            self.scenario('WAL, сессии и корзины отдельно', 'WAL', list(connections), tuned, 'S', ids)
+
+    def populate(self):
+        from accounts.models import User
+        from shop.models import Product
+
+        synthetic.populate_catalog(500)
+        synthetic.populate_users(100)
+        return (
+            list(Product.objects.values_list('id', flat=True)),
+            list(User.objects.values_list('id', flat=True)),
+        )
+
+    def scenario(self, title, journal_mode, aliases, overrides, prefix, ids):
+        profiles = {
+            alias: {**connections[alias].settings_dict, **overrides} for alias in aliases
+        }
+        # Процессы открывают свои соединения; родительские закрыты до fork
+        connections.close_all()
+        for profile in profiles.values():
+            raw = sqlite3.connect(profile['NAME'])
+            raw.execute(f'PRAGMA journal_mode = {journal_mode}')
+            raw.close()
+        results = self.run(profiles, prefix, ids)
+        self.report(title, results)
+
+    def run(self, profiles, prefix, ids):
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [
+            context.Process(
+                target=_worker, args=(profiles, prefix, self.options['seconds'], seed, ids, queue)
+            )
+            for seed in range(self.options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return results
+
+    def report(self, title, results):
+        seconds = self.options['seconds']
+        totals = {key: sum(r[key] for r in results) for key in ('checkout', 'cart_add', 'session', 'errors')}
+        latencies = sorted(ms for r in results for ms in r['checkout_ms'])
+        p50 = statistics.median(latencies) if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        # Время транзакции заказа в основной базе (ожидание блокировки записи)
+        orders = sorted(ms for r in results for ms in r['order_ms'])
+        order_p95 = orders[int(len(orders) * 0.95)] if orders else 0
+        messages = {r['error'] for r in results if 'error' in r}
+        self.stdout.write(
+            f'{title:<34}{totals["checkout"] / seconds:>10.1f}{totals["cart_add"] / seconds:>10.1f}'
+            f'{totals["session"] / seconds:>10.1f}{totals["errors"]:>8}{p50:>9.1f}{p95:>9.1f}{order_p95:>11.1f}'
+        )
+        for message in sorted(messages):
+            self.stdout.write(f'    {message}')
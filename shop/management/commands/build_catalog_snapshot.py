@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Собирает снимок каталога для воркеров (CATALOG_SNAPSHOT_PATH) и атомарно подменяет файл'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Куда писать снимок (по умолчанию CATALOG_SNAPSHOT_PATH)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Пересобирать каждые N секунд, пока команду не остановят')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.CATALOG_SNAPSHOT_PATH
+        while True:
+            started = time.perf_counter()
+            count = snapshot.build(path)
+            current = snapshot.Snapshot(path)
+            self.stdout.write(
+                f'{path}: {count} товаров, поколение {current.generation}, '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from shop.bulk import apply_bulk_edit, describe_changes, split_ids
+from shop.models import BulkEditJob, Product
+
+FLAG_VALUES = {'on': True, 'off': False}
+
+
+class Command(BaseCommand):
+    help = 'Массово меняет цены, остатки и флаги товаров, выбранных фильтрами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--brand', action='append', default=[], help='Slug бренда')
+        parser.add_argument('--category', action='append', default=[], help='Slug категории')
+        parser.add_argument('--sku-prefix', help='Префикс артикула')
+        parser.add_argument('--only-available', action='store_true')
+
+        price = parser.add_mutually_exclusive_group()
+        price.add_argument('--price-percent', type=float, help='Изменить цену на процент, например -15')
+        price.add_argument('--price-delta', type=int, help='Изменить цену на сумму')
+        price.add_argument('--price-set', type=int, help='Установить цену')
+        parser.add_argument('--no-old-price', action='store_true',
+                            help='Не вести old_price при изменении цены')
+
+        stock = parser.add_mutually_exclusive_group()
+        stock.add_argument('--stock-delta', type=int)
+        stock.add_argument('--stock-set', type=int)
+
+        for flag in ('available', 'featured', 'new'):
+            parser.add_argument(f'--{flag}', choices=FLAG_VALUES)
+
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def get_queryset(self, options):
+        queryset = Product.objects.all()
+        if options['brand']:
+            queryset = queryset.filter(brand__slug__in=options['brand'])
+        if options['category']:
+            queryset = queryset.filter(category__slug__in=options['category'])
+        if options['sku_prefix']:
+            queryset = queryset.filter(sku__startswith=options['sku_prefix'])
+        if options['only_available']:
+            queryset = queryset.filter(is_available=True)
+        return queryset
+
+    def get_changes(self, options):
+        changes = {}
+        for mode in ('percent', 'delta', 'set'):
+            value = options[f'price_{mode}']
+            if value is not None:
+                changes.update(price_mode=mode, price_value=str(value),
+                               track_old_price=not options['no_old_price'])
+        for mode in ('delta', 'set'):
+            value = options[f'stock_{mode}']
+            if value is not None:
+                changes.update(stock_mode=mode, stock_value=value)
+        for flag in ('available', 'featured', 'new'):
+            if options[flag]:
+                changes[f'is_{flag}'] = FLAG_VALUES[options[flag]]
+        return changes
+
+    def handle(self, *args, **options):
+        changes = self.get_changes(options)
+        if not changes:
+            raise CommandError('Не задано ни одного изменения')
+
+        product_ids = list(self.get_queryset(options).values_list('id', flat=True))
+        description = describe_changes(changes)
+        self.stdout.write(f'{description}: {len(product_ids)} товаров')
+        if options['dry_run'] or not product_ids:
+            return
+
+        job = BulkEditJob.objects.create(
+            description=description,
+            changes=changes,
+            product_ids=product_ids,
+            total=len(product_ids),
+            status='running',
+        )
+
+        def progress(done):
+            BulkEditJob.objects.filter(pk=job.pk).update(processed=done)
+            self.stdout.write(f'  {done}/{job.total}')
+
+        processed = apply_bulk_edit(
+            split_ids(product_ids, options['chunk_size']), changes, progress=progress
+        )
+        BulkEditJob.objects.filter(pk=job.pk).update(
+            status='done', processed=processed, finished_at=timezone.now()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Задание #{job.pk}: изменено {processed} товаров'))
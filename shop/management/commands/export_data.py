@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+
+from django.contrib import admin
+from django.contrib.admin.utils import prepare_lookup_value
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from django.utils.module_loading import import_string
+
+from scootermall.exports import FORMATS
+
+EXPORTS = {
+    'orders': 'cart.exports.OrderExport',
+    'products': 'shop.exports.ProductExport',
+    'customers': 'accounts.exports.CustomerExport',
+}
+MODELS = {
+    'orders': 'cart.models.Order',
+    'products': 'shop.models.Product',
+    'customers': 'accounts.models.User',
+}
+# Параметры списка админки, которые не фильтруют
+IGNORED_PARAMS = {'o', 'p', 'q', 'e', 'all', '_changelist_filters'}
+
+
+def changelist_queryset(model, query_string):
+    """
+    Строки списка админки с параметрами из его адреса: фильтры, поиск (q)
+    и порядок ModelAdmin, как при «выбрать все» в списке
+    """
+    model_admin = admin.site._registry[model]
+    params = QueryDict(query_string)
+    queryset = model_admin.get_queryset(None)
+    for key, values in params.lists():
+        if key in IGNORED_PARAMS:
+            continue
+        for value in values:
+            queryset = queryset.filter(**{key: prepare_lookup_value(key, value)})
+    if params.get('q'):
+        queryset, _ = model_admin.get_search_results(None, queryset, params['q'])
+    ordering = model_admin.get_ordering(None) or model._meta.ordering
+    return queryset.order_by(*ordering, '-pk')
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка заказов с позициями, товаров или покупателей в CSV или XLSX. '
+        'Фильтры — параметры адреса списка админки, например "status__exact=shipped&q=ORD-00000042"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', choices=EXPORTS)
+        parser.add_argument('output', nargs='?', help='Файл; формат по расширению. "-" — в stdout')
+        parser.add_argument('--format', choices=FORMATS, help='Формат, если не по расширению')
+        parser.add_argument('--filter', default='', help='Строка параметров списка админки')
+        parser.add_argument('--columns', help='Ключи колонок через запятую; по умолчанию все')
+        parser.add_argument('--list-columns', action='store_true', help='Показать колонки и выйти')
+
+    def handle(self, *args, **options):
+        export = import_string(EXPORTS[options['export']])()
+        if options['list_columns']:
+            for key, label in export.choices():
+                self.stdout.write(f'{key:<24}{label}')
+            return
+
+        output = options['output']
+        if not output:
+            raise CommandError('Укажите файл выгрузки или "-"')
+        fmt = options['format'] or os.path.splitext(output)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Формат не задан: укажите --format {"/".join(FORMATS)}')
+        keys = options['columns'].split(',') if options['columns'] else None
+        unknown = set(keys or ()) - {key for key, _ in export.choices()}
+        if unknown:
+            raise CommandError(f'Нет колонок: {", ".join(sorted(unknown))}. Список: --list-columns')
+
+        queryset = changelist_queryset(import_string(MODELS[options['export']]), options['filter'])
+        started = time.perf_counter()
+        size = 0
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in export.stream(queryset, fmt, keys):
+                stream.write(chunk)
+                size += len(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        if output != '-':
+            self.stdout.write(f'{output}: {size / 1024 / 1024:.1f} МиБ за {time.perf_counter() - started:.1f} с')
@@ -0,0 +1,73 @@
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from scootermall.routers import database_for
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт таблицы в базах из DATABASE_ROUTING и переносит в них '
+        'существующие строки (сессии, корзины) из основной базы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--delete-source', action='store_true',
+                            help='Очистить перенесённые таблицы в основной базе')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, сколько строк будет перенесено')
+
+    def handle(self, *args, **options):
+        routed = [
+            (model, database_for(model._meta.app_label, model._meta.model_name))
+            for model in apps.get_models()
+        ]
+        routed = [(model, alias) for model, alias in routed if alias != DEFAULT_DB_ALIAS]
+        if not routed:
+            self.stdout.write('Все модели живут в основной базе, переносить нечего')
+            return
+
+        source = connections[DEFAULT_DB_ALIAS]
+        source_tables = set(source.introspection.table_names())
+
+        if not options['dry_run']:
+            for alias in sorted({alias for _, alias in routed}):
+                self.stdout.write(self.style.MIGRATE_HEADING(f'migrate --database={alias}'))
+                call_command('migrate', database=alias, verbosity=0, interactive=False)
+
+        for model, alias in routed:
+            table = model._meta.db_table
+            if table not in source_tables:
+                continue
+            total = model._base_manager.using(DEFAULT_DB_ALIAS).count()
+            if options['dry_run']:
+                self.stdout.write(f'{model._meta.label}: {total} строк -> {alias}')
+                continue
+            copied = self.copy(model, alias, options['batch_size'])
+            self.stdout.write(f'{model._meta.label}: {copied}/{total} строк -> {alias}')
+
+        if options['delete_source'] and not options['dry_run']:
+            # Позиции раньше корзин: порядок, обратный порядку моделей
+            with source.cursor() as cursor:
+                for model, _ in reversed(routed):
+                    table = model._meta.db_table
+                    if table in source_tables:
+                        cursor.execute(f'DELETE FROM {source.ops.quote_name(table)}')
+            self.stdout.write(self.style.SUCCESS('Перенесённые таблицы в основной базе очищены'))
+
+    def copy(self, model, alias, batch_size):
+        """Копирует строки с сохранением первичных ключей; повторный запуск безопасен"""
+        source = model._base_manager.using(DEFAULT_DB_ALIAS).order_by('pk')
+        target = model._base_manager.using(alias)
+        copied = 0
+        last_pk = None
+        while True:
+            batch = source if last_pk is None else source.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return copied
+            target.bulk_create(batch, ignore_conflicts=True)
+            copied += len(batch)
+            last_pk = batch[-1].pk
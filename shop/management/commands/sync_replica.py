@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from scootermall import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в локальные реплики через backup API '
+        'и записывает время синхронизации (см. scootermall/replicas.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='aliases',
+                            help='Алиас реплики (по умолчанию все REPLICA_DATABASES)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд; 0 — один раз')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.REPLICA_DATABASES
+        source = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'Нет базы {alias} в DATABASES')
+            if source.vendor != 'sqlite' or connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias}: синхронизация поддерживается только для SQLite')
+
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                self.sync(source.settings_dict['NAME'], alias)
+                self.stdout.write(f'{alias}: {(time.perf_counter() - started) * 1000:.0f} мс')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, source_path, alias):
+        target_path = str(connections[alias].settings_dict['NAME'])
+        # Копия пишется рядом и подменяет реплику целиком: читатели не видят
+        # наполовину скопированный файл и не блокируют копирование
+        temp_path = f'{target_path}.{os.getpid()}.tmp'
+        # Всё, что зафиксировано до начала копирования, попадёт в реплику
+        synced_at = time.time()
+        source = sqlite3.connect(source_path, timeout=30)
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target)
+        except BaseException:
+            target.close()
+            os.unlink(temp_path)
+            raise
+        else:
+            target.close()
+        finally:
+            source.close()
+        os.replace(temp_path, target_path)
+        # Открытые соединения читают старый файл; воркеры переоткрывают их,
+        # увидев новое время синхронизации (replicas.choose)
+        connections[alias].close()
+        marker = replicas.sync_marker(alias)
+        with open(f'{marker}.tmp', 'w') as f:
+            f.write(f'{synced_at:.3f}')
+        os.replace(f'{marker}.tmp', marker)
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop import ranges
+from shop.tasks import warm_filter_stats
+
+
+class Command(BaseCommand):
+    help = 'Заранее считает статистику диапазонов фильтров для каталога, всех брендов и категорий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Поставить в очередь фоновых задач вместо расчёта здесь')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = warm_filter_stats.enqueue(dedupe_key='shop.warm_filter_stats')
+            self.stdout.write(f'Задача {job} в очереди')
+            return
+        started = time.perf_counter()
+        scopes = ranges.warm()
+        self.stdout.write(f'Областей: {scopes}, {(time.perf_counter() - started) * 1000:.0f} мс')
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='shop_produc_name_a2070e_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Полнотекстовый индекс отзывов (SQLite FTS5, внешнее содержимое из shop_review).
+# На других СУБД миграция ничего не делает, и админка ищет обычным способом.
+# SQLite удаляет триггеры вместе с таблицей, поэтому миграция, которая
+# пересоздаёт shop_review (AlterField и т.п.), должна снова вызвать create_fts.
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS shop_review_fts
+    USING fts5(title, text, content='shop_review', content_rowid='id')
+    """,
+    "INSERT INTO shop_review_fts(shop_review_fts) VALUES ('rebuild')",
+    """
+    CREATE TRIGGER IF NOT EXISTS shop_review_fts_ai AFTER INSERT ON shop_review BEGIN
+        INSERT INTO shop_review_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS shop_review_fts_ad AFTER DELETE ON shop_review BEGIN
+        INSERT INTO shop_review_fts(shop_review_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS shop_review_fts_au AFTER UPDATE OF title, text ON shop_review BEGIN
+        INSERT INTO shop_review_fts(shop_review_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO shop_review_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END
+    """,
+]
+
+DROP_FTS = [
+    'DROP TRIGGER IF EXISTS shop_review_fts_au',
+    'DROP TRIGGER IF EXISTS shop_review_fts_ad',
+    'DROP TRIGGER IF EXISTS shop_review_fts_ai',
+    'DROP TABLE IF EXISTS shop_review_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_FTS:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_product_shop_produc_name_a2070e_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
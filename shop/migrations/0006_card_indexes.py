@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_product_product_avail_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', '-is_main', 'order', 'id'], name='productimage_main_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['product', 'rating'], name='review_approved_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:15
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    # Та же логика, что Category.rebuild_paths(): в миграции доступна только историческая модель
+    Category = apps.get_model('shop', 'Category')
+    rows = dict(Category.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def path(pk):
+        if pk not in paths:
+            parent = rows[pk]
+            paths[pk] = (path(parent) if parent else '/') + f'{pk}/'
+        return paths[pk]
+
+    categories = list(Category.objects.only('id'))
+    for category in categories:
+        category.path = path(category.pk)
+        category.depth = category.path.count('/') - 2
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_card_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Уровень'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='Путь'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.urls import reverse
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 
@@ -45,6 +48,10 @@ class Category(models.Model):
     )
     is_active = models.BooleanField('Активна', default=True)
     order = models.PositiveIntegerField('Порядок', default=0)
+    # Материализованный путь: id предков и самой категории, '/1/5/12/'.
+    # Поддерживается в save(); после bulk_create вызовите rebuild_paths()
+    path = models.CharField('Путь', max_length=255, default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField('Уровень', default=0, editable=False)
 
     class Meta:
         verbose_name = 'Категория'
@@ -57,6 +64,81 @@ class Category(models.Model):
     def get_absolute_url(self):
       return reverse('shop:category_detail', kwargs={'category_slug': self.slug})
 
+    @staticmethod
+    def subtree_range(path):
+        """Границы путей поддерева: path <= p < upper ('/' + 1 == '0')"""
+        return path, path[:-1] + '0'
+
+    def get_descendants(self, include_self=False):
+        """Поддерево одним запросом по индексу path"""
+        low, high = self.subtree_range(self.path)
+        queryset = Category.objects.filter(path__gte=low, path__lt=high)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    def get_ancestors(self):
+        """Предки от корня, без самой категории"""
+        ids = [int(pk) for pk in self.path.strip('/').split('/')[:-1]]
+        return Category.objects.filter(pk__in=ids).order_by('depth')
+
+    def clean(self):
+        if self.parent_id and self.pk:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first()
+            if self.parent_id == self.pk or (parent_path or '').startswith(self.path or '\0'):
+                raise ValidationError({'parent': 'Категорию нельзя вложить в саму себя или в её подкатегорию'})
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields and 'parent_id' not in update_fields:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            self._move()
+
+    def _move(self):
+        """Пересчитывает путь категории и одним UPDATE — путь её поддерева"""
+        categories = Category.objects.select_for_update()
+        old_path = categories.filter(pk=self.pk).values_list('path', flat=True).get()
+        parent_path = '/'
+        if self.parent_id:
+            parent_path = categories.filter(pk=self.parent_id).values_list('path', flat=True).get()
+            if parent_path.startswith(old_path or '\0'):
+                raise ValueError('Категорию нельзя вложить в саму себя или в её подкатегорию')
+        new_path = f'{parent_path}{self.pk}/'
+        if new_path == old_path:
+            return
+        depth = new_path.count('/') - 2
+        categories.filter(pk=self.pk).update(path=new_path, depth=depth)
+        if old_path:
+            low, high = self.subtree_range(old_path)
+            categories.filter(path__gt=low, path__lt=high).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (depth - (old_path.count('/') - 2)),
+            )
+        self.path, self.depth = new_path, depth
+
+    @classmethod
+    def rebuild_paths(cls):
+        """Пути всех категорий заново (после bulk_create/update в обход save)"""
+        rows = dict(cls.objects.values_list('id', 'parent_id'))
+        paths = {}
+
+        def path(pk):
+            if pk not in paths:
+                parent = rows[pk]
+                paths[pk] = (path(parent) if parent else '/') + f'{pk}/'
+            return paths[pk]
+
+        changed = []
+        for category in cls.objects.only('id', 'path', 'depth'):
+            category_path = path(category.pk)
+            if category.path != category_path:
+                category.path, category.depth = category_path, category_path.count('/') - 2
+                changed.append(category)
+        cls.objects.bulk_update(changed, ['path', 'depth'], batch_size=500)
+        return len(changed)
+
 
 class Product(models.Model):
     """Товар - электросамокат"""
@@ -166,6 +248,29 @@ class Product(models.Model):
             models.Index(fields=['is_featured']),
             models.Index(fields=['brand']),
             models.Index(fields=['category']),
+            models.Index(fields=['name']),
+            # Витрина всегда фильтрует is_available=True: частичные индексы
+            # под сортировки списка, страницы категории и бренда, главной
+            models.Index(fields=['-created_at'], condition=models.Q(is_available=True),
+                         name='product_avail_created_idx'),
+            models.Index(fields=['price'], condition=models.Q(is_available=True),
+                         name='product_avail_price_idx'),
+            models.Index(fields=['name'], condition=models.Q(is_available=True),
+                         name='product_avail_name_idx'),
+            models.Index(fields=['category', '-created_at'], condition=models.Q(is_available=True),
+                         name='product_avail_cat_created_idx'),
+            models.Index(fields=['category', 'price'], condition=models.Q(is_available=True),
+                         name='product_avail_cat_price_idx'),
+            models.Index(fields=['category', 'name'], condition=models.Q(is_available=True),
+                         name='product_avail_cat_name_idx'),
+            models.Index(fields=['brand', '-created_at'], condition=models.Q(is_available=True),
+                         name='product_avail_brand_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_available=True, is_featured=True),
+                         name='product_featured_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_available=True, is_new=True),
+                         name='product_new_idx'),
+            # Товары, изменённые с прошлой сборки фидов (feeds/builder.py)
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
         ]
 
     def __str__(self):
@@ -212,6 +317,10 @@ class ProductImage(models.Model):
         verbose_name = 'Изображение товара'
         verbose_name_plural = 'Изображения товаров'
         ordering = ['order', 'id']
+        indexes = [
+            # Главное изображение для карточки товара (shop.cards)
+            models.Index(fields=['product', '-is_main', 'order', 'id'], name='productimage_main_idx'),
+        ]
 
     def __str__(self):
         return f"Изображение {self.product}"
@@ -257,6 +366,11 @@ class Review(models.Model):
         verbose_name_plural = 'Отзывы'
         ordering = ['-created_at']
         unique_together = ['product', 'user']
+        indexes = [
+            # Рейтинг и число одобренных отзывов в карточке читаются только из индекса
+            models.Index(fields=['product', 'rating'], condition=models.Q(is_approved=True),
+                         name='review_approved_rating_idx'),
+        ]
 
     def __str__(self):
         return f"Отзыв {self.user} о {self.product}"
@@ -280,3 +394,46 @@ class Banner(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class BulkEditJob(models.Model):
+    """Задание массового изменения товаров"""
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Завершено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bulk_edit_jobs',
+        verbose_name='Автор'
+    )
+    description = models.CharField('Описание', max_length=300, blank=True)
+    changes = models.JSONField('Изменения', default=dict)
+    product_ids = models.JSONField('Товары', default=list)
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField('Всего товаров', default=0)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Массовое изменение'
+        verbose_name_plural = 'Массовые изменения'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Изменение #{self.pk}: {self.description}"
+
+    @property
+    def progress_percent(self):
+        """Прогресс выполнения в процентах"""
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return int(self.processed * 100 / self.total)
@@ -0,0 +1,218 @@
+"""
+Статистика диапазонов для фильтров каталога.
+
+Для каждой области — весь каталог, категория (с подкатегориями), бренд —
+считаются мин/макс и гистограмма по FILTER_STATS_BUCKETS столбцам для
+характеристик RANGE_FIELDS и различные значения размера колёс и степени
+защиты с числом товаров. Всё агрегирует база тремя set-based запросами
+(MIN/MAX, GROUP BY по номеру столбца, GROUP BY по значениям), без загрузки
+товаров в Python.
+
+Результат лежит в двухуровневом кеше (scootermall/caching.py) под своим
+пространством имён на область: изменение товара увеличивает штампы только
+его областей — каталога, его бренда и его категории со всеми предками
+(shop/signals.py). Перемещение категорий сбрасывает все категории
+(``ranges:tree``).
+"""
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, Max, Min, Value
+from django.db.models.functions import Cast, Least
+
+from scootermall import caching
+
+from .models import Brand, Category, Product
+
+# Поле -> (подпись, единица, шаг слайдера)
+RANGE_FIELDS = {
+    'price': ('Цена', '₽', Decimal('1000')),
+    'max_speed': ('Макс. скорость', 'км/ч', Decimal('1')),
+    'max_range': ('Запас хода', 'км', Decimal('1')),
+    'motor_power': ('Мощность мотора', 'Вт', Decimal('50')),
+    'weight': ('Вес', 'кг', Decimal('0.5')),
+    'battery_capacity': ('Ёмкость батареи', 'Ач', Decimal('0.5')),
+}
+
+
+def plain(value):
+    """Decimal без хвостовых нулей и экспоненты: 10.0 -> '10', 8.50 -> '8.5'"""
+    text = format(value, 'f')
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
+
+
+class RangeStats:
+    """Мин/макс характеристики и число товаров в столбцах гистограммы"""
+    __slots__ = ('field', 'label', 'unit', 'step', 'min', 'max', 'counts')
+
+    def __init__(self, field, low, high, counts):
+        self.field = field
+        self.label, self.unit, self.step = RANGE_FIELDS[field]
+        self.min = low
+        self.max = high
+        self.counts = counts
+
+    def __bool__(self):
+        return self.min is not None
+
+    @property
+    def bins(self):
+        """(от, до, товаров, высота столбца в %) для подсказки под слайдером"""
+        if not self.counts:
+            return []
+        width = (self.max - self.min) / len(self.counts)
+        peak = max(self.counts) or 1
+        return [
+            (self.min + width * i, self.min + width * (i + 1), count, round(count * 100 / peak))
+            for i, count in enumerate(self.counts)
+        ]
+
+
+class FilterStats:
+    """Статистика одной области каталога"""
+    __slots__ = ('count', 'ranges', 'wheel_sizes', 'waterproof_ratings')
+
+    def __init__(self, count, ranges, wheel_sizes, waterproof_ratings):
+        self.count = count
+        self.ranges = ranges
+        # [(значение, товаров)] по возрастанию
+        self.wheel_sizes = wheel_sizes
+        self.waterproof_ratings = waterproof_ratings
+
+    def __getitem__(self, field):
+        for stats in self.ranges:
+            if stats.field == field:
+                return stats
+        raise KeyError(field)
+
+
+def _bounds(low, high, step):
+    """Границы слайдера, выровненные по шагу"""
+    low = (Decimal(low) / step).to_integral_value(ROUND_FLOOR) * step
+    high = (Decimal(high) / step).to_integral_value(ROUND_CEILING) * step
+    return low, max(high, low + step)
+
+
+def _bucket(field, low, high, buckets):
+    """Номер столбца гистограммы: CAST((x - low) * k AS INTEGER), последний включает high"""
+    scale = buckets / float(high - low)
+    position = ExpressionWrapper((F(field) - Value(float(low))) * Value(scale), output_field=FloatField())
+    return Least(Cast(position, IntegerField()), Value(buckets - 1))
+
+
+def compute(queryset):
+    """Статистика для QuerySet товаров (фильтр области уже применён)"""
+    buckets = settings.FILTER_STATS_BUCKETS
+    queryset = queryset.order_by()
+
+    aggregates = {'count': Count('pk')}
+    for field in RANGE_FIELDS:
+        aggregates[f'{field}__min'] = Min(field)
+        aggregates[f'{field}__max'] = Max(field)
+    totals = queryset.aggregate(**aggregates)
+
+    bounds = {}
+    parts = []
+    for field, (_, _, step) in RANGE_FIELDS.items():
+        if totals[f'{field}__min'] is None:
+            continue
+        low, high = bounds[field] = _bounds(totals[f'{field}__min'], totals[f'{field}__max'], step)
+        parts.append(
+            queryset.filter(**{f'{field}__isnull': False})
+            .annotate(stat=Value(field), bucket=_bucket(field, low, high, buckets))
+            .values('stat', 'bucket')
+            .annotate(total=Count('pk'))
+        )
+    counts = {field: [0] * buckets for field in bounds}
+    if parts:
+        for row in parts[0].union(*parts[1:], all=True):
+            counts[row['stat']][row['bucket']] = row['total']
+
+    ranges = [
+        RangeStats(field, *bounds.get(field, (None, None)), counts.get(field, []))
+        for field in RANGE_FIELDS
+    ]
+
+    wheel_sizes = {}
+    waterproof = {}
+    for wheel_size, rating, total in (
+        queryset.values_list('wheel_size', 'waterproof_rating').annotate(Count('pk'))
+    ):
+        if wheel_size is not None:
+            wheel_sizes[wheel_size] = wheel_sizes.get(wheel_size, 0) + total
+        if rating:
+            waterproof[rating] = waterproof.get(rating, 0) + total
+
+    return FilterStats(
+        totals['count'],
+        ranges,
+        [(plain(size), total) for size, total in sorted(wheel_sizes.items())],
+        sorted(waterproof.items()),
+    )
+
+
+def _available():
+    return Product.objects.filter(is_available=True)
+
+
+def for_catalog():
+    return caching.get_or_compute('ranges:all', lambda: compute(_available()), namespaces=['ranges:all'])
+
+
+def for_brand(brand_id):
+    namespace = f'ranges:brand:{brand_id}'
+    return caching.get_or_compute(
+        namespace, lambda: compute(_available().filter(brand_id=brand_id)), namespaces=[namespace],
+    )
+
+
+def for_category(category):
+    """category — Category или узел дерева; товары всех активных подкатегорий, как на странице"""
+    from .catalog import category_tree
+
+    def subtree():
+        node = category_tree().node(category.pk)
+        if node is not None:
+            return _available().filter(category_id__in=node.subtree_ids())
+        return _available().filter(category__in=Category.objects.get(pk=category.pk).get_descendants(include_self=True))
+
+    namespace = f'ranges:category:{category.pk}'
+    return caching.get_or_compute(namespace, lambda: compute(subtree()), namespaces=[namespace, 'ranges:tree'])
+
+
+def namespaces(scopes):
+    """Пространства имён областей, которые затрагивают товары с этими (brand_id, category_id)"""
+    scopes = list(scopes)
+    result = {'ranges:all'}
+    result.update(f'ranges:brand:{brand_id}' for brand_id, _ in scopes)
+    paths = Category.objects.filter(pk__in={category_id for _, category_id in scopes}).values_list('path', flat=True)
+    for path in paths:
+        # Категория и все её предки: их страницы показывают этот товар
+        result.update(f'ranges:category:{pk}' for pk in path.strip('/').split('/') if pk)
+    return result
+
+
+def bump(scopes):
+    caching.bump(*sorted(namespaces(scopes)))
+
+
+def bump_products(ids):
+    """Инвалидация после изменения товаров в обход save()"""
+    bump(Product.objects.filter(pk__in=ids).values_list('brand_id', 'category_id').distinct())
+
+
+def warm():
+    """Считает статистику всех областей заранее; возвращает их число"""
+    from .catalog import category_tree
+
+    for_catalog()
+    scopes = 1
+    for brand_id in Brand.objects.filter(is_active=True).values_list('pk', flat=True):
+        for_brand(brand_id)
+        scopes += 1
+    for node in category_tree():
+        for_category(node)
+        scopes += 1
+    return scopes
@@ -0,0 +1,84 @@
+"""
+Инвалидация кеша витрины (shop/catalog.py), статистики фильтров
+(shop/ranges.py) и пересборка снимка каталога (shop/snapshot.py)
+при изменении моделей.
+
+Штампы сбрасываются после коммита: иначе другой воркер успеет прочитать
+строку до коммита и закешировать её под новым штампом.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from scootermall import caching
+
+from . import ranges, snapshot
+from .bulk import products_bulk_updated
+from .catalog import brand_namespace, bump_products
+from .models import Banner, Brand, Category, Product, ProductImage, Review
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def bump_catalog(sender, instance, **kwargs):
+    transaction.on_commit(lambda: caching.bump('catalog'))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_category_tree(sender, instance, **kwargs):
+    # Пути поддерева Category.save() пишет после post_save: дерево — после коммита
+    transaction.on_commit(lambda: caching.bump('catalog', 'ranges:tree'))
+
+
+@receiver([post_save, post_delete], sender=Brand)
+def bump_brand(sender, instance, **kwargs):
+    namespace = brand_namespace(instance.pk)
+    transaction.on_commit(lambda: caching.bump('catalog', namespace))
+
+
+@receiver([post_save, post_delete], sender=Product)
+def bump_product(sender, instance, **kwargs):
+    # Меню показывает число товаров в категории, корзина — их цены
+    namespace = brand_namespace(instance.brand_id)
+    transaction.on_commit(lambda: caching.bump('catalog', namespace))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Review)
+def bump_product_card(sender, instance, **kwargs):
+    # Главное изображение и рейтинг выводятся в карточке товара
+    brand_id = Product.objects.filter(pk=instance.product_id).values_list('brand_id', flat=True).first()
+    if brand_id is not None:
+        namespace = brand_namespace(brand_id)
+        transaction.on_commit(lambda: caching.bump(namespace))
+
+
+@receiver(products_bulk_updated, sender=Product)
+def bump_bulk_updated(sender, ids, **kwargs):
+    bump_products(ids)
+    ranges.bump_products(ids)
+
+
+@receiver(pre_save, sender=Product)
+def remember_range_scope(sender, instance, **kwargs):
+    # При смене бренда или категории статистика меняется и в прежних областях
+    if instance.pk:
+        instance._old_range_scope = Product.objects.filter(pk=instance.pk).values_list(
+            'brand_id', 'category_id'
+        ).first()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def bump_ranges(sender, instance, **kwargs):
+    scopes = [(instance.brand_id, instance.category_id)]
+    old = getattr(instance, '_old_range_scope', None)
+    if old and old != scopes[0]:
+        scopes.append(old)
+    transaction.on_commit(lambda: ranges.bump(scopes))
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver(products_bulk_updated, sender=Product)
+def rebuild_snapshot(sender, **kwargs):
+    transaction.on_commit(snapshot.schedule_rebuild)
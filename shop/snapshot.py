@@ -0,0 +1,280 @@
+"""
+Снимок каталога в общем для воркеров файле.
+
+Числовые характеристики, флаги, цены, id бренда и категории всех товаров
+пишутся колонками (array) в один бинарный файл CATALOG_SNAPSHOT_PATH,
+строки — смещениями и общим блоком UTF-8. Воркеры отображают файл в память
+только для чтения (mmap) и читают колонки через memoryview без копирования:
+страницы файла общие для всех процессов.
+
+Новое поколение собирается во временный файл и подменяет старый атомарным
+os.replace(). current() на каждом обращении сверяет inode и mtime файла
+и при изменении открывает новый снимок; старый закрывается сборщиком
+мусора, когда на него не останется ссылок.
+
+Пересборка запускается после изменения товаров (shop/signals.py) в фоновом
+потоке сохранившего процесса, с задержкой CATALOG_SNAPSHOT_REBUILD_DELAY,
+чтобы серия сохранений дала одну сборку, и командой build_catalog_snapshot.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CSNP'
+FORMAT_VERSION = 2
+# magic, версия формата, поколение, число строк, число колонок
+HEADER = struct.Struct('<4sIQII')
+# имя колонки, typecode, смещение, длина в байтах
+ENTRY = struct.Struct('<24sc7xQQ')
+ALIGN = 8
+
+# Колонка -> (typecode, множитель); -1 в колонке означает NULL
+NUMERIC = {
+    'id': ('q', None),
+    'brand_id': ('q', None),
+    'category_id': ('q', None),
+    'price': ('q', None),
+    'old_price': ('q', None),
+    'stock': ('q', None),
+    'max_speed': ('i', None),
+    'max_range': ('i', None),
+    'motor_power': ('i', None),
+    'max_load': ('i', None),
+    'battery_capacity': ('i', 10),
+    'weight': ('i', 100),
+    'wheel_size': ('i', 10),
+    'created_at': ('q', None),
+    # Степень защиты числом: IP54 -> 54 (пыль — десятки, вода — единицы)
+    'waterproof': ('h', None),
+    'flags': ('B', None),
+}
+FLAGS = ('is_available', 'is_featured', 'is_new', 'has_app', 'has_cruise_control')
+TEXT = ('name', 'slug', 'title', 'image', 'search')
+SCALAR = [name for name in NUMERIC if name not in ('flags', 'created_at', 'waterproof')]
+ROW_FIELDS = SCALAR + list(FLAGS) + ['created_at', 'waterproof_rating', 'name', 'slug', 'brand_name', 'main_image']
+
+
+def flag(name):
+    return 1 << FLAGS.index(name)
+
+
+def waterproof_code(rating):
+    """'IP54' -> 54, пустая или нестандартная строка -> -1"""
+    digits = (rating or '')[2:]
+    return int(digits) if len(digits) == 2 and digits.isdigit() else -1
+
+
+def encode(value, scale):
+    if value is None:
+        return -1
+    if scale:
+        return int(value * scale)
+    return int(value)
+
+
+def _rows():
+    """Товары в порядке витрины (новые первыми), только нужные снимку поля"""
+    from .models import Product, ProductImage
+
+    image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('-is_main', 'order', 'id')
+    return Product.objects.order_by('-created_at', '-id').annotate(
+        brand_name=F('brand__name'),
+        main_image=Subquery(image.values('image')[:1]),
+    ).values_list(*ROW_FIELDS).iterator(chunk_size=5000)
+
+
+def build(path=None):
+    """Собирает снимок и атомарно подменяет файл; возвращает число товаров"""
+    path = str(path or settings.CATALOG_SNAPSHOT_PATH)
+    columns = {name: array(typecode) for name, (typecode, _) in NUMERIC.items()}
+    texts = {name: (array('I', [0]), bytearray()) for name in TEXT}
+
+    count = 0
+    for row in _rows():
+        values = dict(zip(ROW_FIELDS, row))
+        for name in SCALAR:
+            columns[name].append(encode(values[name], NUMERIC[name][1]))
+        columns['flags'].append(sum(flag(name) for name in FLAGS if values[name]))
+        columns['created_at'].append(int(values['created_at'].timestamp()))
+        columns['waterproof'].append(waterproof_code(values['waterproof_rating']))
+        title = f"{values['brand_name']} {values['name']}"
+        strings = {
+            'name': values['name'], 'slug': values['slug'], 'title': title,
+            'image': values['main_image'] or '',
+            # Перевод строки завершает запись: поиск не пересекает границы товаров
+            'search': title.lower().replace('\n', ' ') + '\n',
+        }
+        for name, value in strings.items():
+            offsets, data = texts[name]
+            data += value.encode()
+            offsets.append(len(data))
+        count += 1
+
+    blocks = []
+    for name, column in columns.items():
+        blocks.append((name, column.typecode, column.tobytes()))
+    for name, (offsets, data) in texts.items():
+        blocks.append((f'{name}.offsets', 'I', offsets.tobytes()))
+        blocks.append((f'{name}.data', 'B', bytes(data)))
+
+    offset = HEADER.size + ENTRY.size * len(blocks)
+    directory = []
+    for name, typecode, data in blocks:
+        offset += -offset % ALIGN
+        directory.append((name, typecode, offset, len(data)))
+        offset += len(data)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, time.time_ns(), count, len(blocks)))
+        for name, typecode, start, size in directory:
+            f.write(ENTRY.pack(name.encode(), typecode.encode(), start, size))
+        for (name, typecode, data), (_, _, start, _) in zip(blocks, directory):
+            f.write(b'\0' * (start - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    return count
+
+
+class Snapshot:
+    """Открытый только для чтения снимок; колонки — memoryview над mmap"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.key = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation, self.rows, ncols = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path}: не снимок каталога версии {FORMAT_VERSION}')
+        view = memoryview(self._mmap)
+        self._blocks = {}
+        self._columns = {}
+        for i in range(ncols):
+            name, typecode, start, size = ENTRY.unpack_from(self._mmap, HEADER.size + ENTRY.size * i)
+            name = name.rstrip(b'\0').decode()
+            self._blocks[name] = (start, size)
+            self._columns[name] = view[start:start + size].cast(typecode.decode())
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        return self._columns[name]
+
+    def value(self, name, row):
+        """Значение числовой колонки: None для NULL, Decimal для дробных"""
+        value = self._columns[name][row]
+        scale = NUMERIC[name][1]
+        if value == -1 and name != 'flags':
+            return None
+        return Decimal(value) / scale if scale else value
+
+    def text(self, name, row):
+        offsets = self._columns[f'{name}.offsets']
+        return bytes(self._columns[f'{name}.data'][offsets[row]:offsets[row + 1]]).decode()
+
+    def has_flag(self, row, name):
+        return bool(self._columns['flags'][row] & flag(name))
+
+    def search(self, query, limit=5, available=True):
+        """
+        Строки, у которых «бренд название» содержит query (без учёта регистра),
+        в порядке витрины. Поиск идёт по отображённому файлу без копирования.
+        """
+        needle = query.lower().replace('\n', ' ').encode()
+        if not needle:
+            return []
+        start, size = self._blocks['search.data']
+        offsets = self._columns['search.offsets']
+        position, end = start, start + size
+        found = []
+        while len(found) < limit:
+            position = self._mmap.find(needle, position, end)
+            if position == -1:
+                break
+            row = bisect_right(offsets, position - start) - 1
+            if not available or self.has_flag(row, 'is_available'):
+                found.append(row)
+            position = start + offsets[row + 1]
+        return found
+
+    def row(self, row):
+        values = {name: self.value(name, row) for name in NUMERIC if name != 'flags'}
+        values.update({name: self.has_flag(row, name) for name in FLAGS})
+        values.update({name: self.text(name, row) for name in TEXT if name != 'search'})
+        return values
+
+
+_current = None
+_open_lock = threading.Lock()
+
+
+def current():
+    """Актуальный снимок или None, если он выключен или файла ещё нет (тогда запускается сборка)"""
+    global _current
+    if not settings.CATALOG_SNAPSHOT_ENABLED:
+        return None
+    path = str(settings.CATALOG_SNAPSHOT_PATH)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        schedule_rebuild()
+        return None
+    snapshot = _current
+    if snapshot is not None and snapshot.key == (stat.st_ino, stat.st_mtime_ns):
+        return snapshot
+    with _open_lock:
+        if _current is None or _current.key != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                _current = Snapshot(path)
+            except (OSError, ValueError, struct.error):
+                # Файл старого формата или повреждён: пересобрать
+                logger.exception('Не удалось открыть снимок каталога %s', path)
+                schedule_rebuild()
+                return None
+        return _current
+
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _rebuild():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        build()
+    except Exception:
+        logger.exception('Не удалось собрать снимок каталога')
+    finally:
+        connection.close()
+
+
+def schedule_rebuild():
+    """Пересборка в фоне; повторные вызовы до её начала ничего не добавляют"""
+    global _timer
+    if not settings.CATALOG_SNAPSHOT_ENABLED:
+        return
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(settings.CATALOG_SNAPSHOT_REBUILD_DELAY, _rebuild)
+        _timer.daemon = True
+        _timer.start()
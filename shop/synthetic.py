@@ -0,0 +1,351 @@
+"""
+Синтетические данные для бенчмарков.
+
+Бенчмарки работают во временной тестовой базе (как manage.py test),
+поэтому рабочая db.sqlite3 не затрагивается.
+"""
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from scootermall import caching
+
+BATCH_SIZE = 5000
+
+WHEEL_SIZES = [Decimal('8'), Decimal('8.5'), Decimal('10'), Decimal('11'), Decimal('12')]
+WATERPROOF_RATINGS = ['', 'IP54', 'IP55', 'IP56', 'IP65', 'IP67']
+# Промокод и процент скидки в заказах
+PROMO_CODES = [('WELCOME5', 5), ('SPRING10', 10), ('VIP15', 15)]
+
+
+@contextmanager
+def synthetic_database(keepdb=False, name=None, verbosity=0):
+    """
+    Временные базы с применёнными миграциями для всех алиасов DATABASES.
+
+    name задаёт файл базы default; остальные алиасы получают имя
+    с префиксом алиаса рядом с ним, а зеркала (TEST MIRROR) указывают
+    на базу своего основного алиаса. Кеш на это время — LocMem процесса,
+    фоновая пересборка снимка каталога выключена.
+    """
+    created = []
+    mirrors = []
+    # Свой кеш и снимок каталога: данные временной базы не смешиваются с рабочими
+    isolated_cache = override_settings(
+        CACHES={
+            'default': {'BACKEND': 'monitoring.cache.InstrumentedLocMemCache', 'LOCATION': 'synthetic'},
+        },
+        CATALOG_SNAPSHOT_ENABLED=False,
+        CATALOG_SNAPSHOT_PATH=os.path.join(tempfile.gettempdir(), f'synthetic-{os.getpid()}.snapshot'),
+    )
+    isolated_cache.enable()
+    caching.clear_local()
+    try:
+        for alias in connections:
+            connection = connections[alias]
+            mirror = connection.settings_dict.get('TEST', {}).get('MIRROR')
+            if mirror:
+                mirrors.append((connection, mirror, dict(connection.settings_dict)))
+                continue
+            old_name = connection.settings_dict['NAME']
+            if name:
+                test_name = name if alias == DEFAULT_DB_ALIAS else f'{alias}_{name}'
+                connection.settings_dict.setdefault('TEST', {})['NAME'] = test_name
+            connection.creation.create_test_db(
+                verbosity=verbosity, autoclobber=True, keepdb=keepdb, serialize=False
+            )
+            created.append((connection, old_name))
+        # Реплики смотрят в ту же временную базу, что и их основная
+        for connection, mirror, _ in mirrors:
+            connection.creation.set_as_test_mirror(connections[mirror].settings_dict)
+        yield connections[DEFAULT_DB_ALIAS]
+    finally:
+        for connection, _, settings_dict in mirrors:
+            connection.close()
+            connection.settings_dict = settings_dict
+        for connection, old_name in reversed(created):
+            connection.creation.destroy_test_db(old_name, verbosity, keepdb)
+        caching.clear_local()
+        isolated_cache.disable()
+
+
+def analyze():
+    """ANALYZE во всех временных базах; зеркала только читают и пропускаются"""
+    for alias in connections:
+        connection = connections[alias]
+        if connection.settings_dict.get('TEST', {}).get('MIRROR'):
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """Позволяет задать created_at/updated_at вручную при bulk_create"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _batches(total, size=BATCH_SIZE):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def _spread(rng, now, days):
+    return now - timedelta(days=rng.random() * days)
+
+
+def populate_catalog(products, brands=20, categories=12, seed=0, progress=None):
+    """Бренды, категории (два уровня) и товары со случайными характеристиками"""
+    from .models import Brand, Category, Product
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    Brand.objects.bulk_create([
+        Brand(name=f'Brand {i}', slug=f'brand-{i}', country='Китай')
+        for i in range(brands)
+    ])
+    roots = max(1, categories // 3)
+    Category.objects.bulk_create([
+        Category(name=f'Category {i}', slug=f'category-{i}', order=i)
+        for i in range(roots)
+    ])
+    root_ids = list(Category.objects.values_list('id', flat=True))
+    Category.objects.bulk_create([
+        Category(
+            name=f'Category {i}', slug=f'category-{i}', order=i,
+            parent_id=root_ids[i % len(root_ids)]
+        )
+        for i in range(roots, categories)
+    ])
+    Category.rebuild_paths()
+    brand_ids = list(Brand.objects.values_list('id', flat=True))
+    category_ids = list(Category.objects.values_list('id', flat=True))
+
+    with explicit_timestamps(Product, 'created_at', 'updated_at'):
+        for start, end in _batches(products):
+            batch = []
+            for i in range(start, end):
+                price = rng.randrange(15000, 250000, 10)
+                created = _spread(rng, now, 1000)
+                batch.append(Product(
+                    name=f'Scooter {i}',
+                    slug=f'scooter-{i}',
+                    sku=f'SKU-{i:08d}',
+                    description='Описание электросамоката. ' * 20,
+                    short_description='Городской электросамокат',
+                    brand_id=rng.choice(brand_ids),
+                    category_id=rng.choice(category_ids),
+                    price=price,
+                    old_price=price + rng.randrange(1000, 20000, 10) if rng.random() < 0.3 else None,
+                    stock=rng.randrange(0, 50),
+                    is_available=rng.random() < 0.9,
+                    is_featured=rng.random() < 0.05,
+                    is_new=rng.random() < 0.1,
+                    max_speed=rng.randrange(20, 90),
+                    max_range=rng.randrange(15, 150),
+                    motor_power=rng.randrange(250, 6000, 50),
+                    battery_capacity=Decimal(rng.randrange(50, 400)) / 10,
+                    weight=Decimal(rng.randrange(1000, 4500)) / 100,
+                    max_load=rng.randrange(90, 160),
+                    wheel_size=rng.choice(WHEEL_SIZES),
+                    waterproof_rating=rng.choice(WATERPROOF_RATINGS),
+                    has_app=rng.random() < 0.6,
+                    has_cruise_control=rng.random() < 0.7,
+                    created_at=created,
+                    updated_at=created,
+                ))
+            Product.objects.bulk_create(batch)
+            if progress:
+                progress('products', end, products)
+
+
+def populate_users(users, seed=0, progress=None):
+    """Пользователи без пароля (хеширование слишком медленное для миллионов строк)"""
+    from accounts.models import User
+
+    now = timezone.now()
+    with explicit_timestamps(User, 'created_at'):
+        for start, end in _batches(users):
+            User.objects.bulk_create([
+                User(
+                    username=f'user{i}',
+                    email=f'user{i}@example.com',
+                    phone=f'+7900{i:07d}',
+                    password='!',
+                    newsletter_subscribed=i % 3 != 0,
+                    created_at=now,
+                )
+                for i in range(start, end)
+            ])
+            if progress:
+                progress('users', end, users)
+
+
+def _ids(model):
+    return list(model.objects.order_by('id').values_list('id', flat=True))
+
+
+def populate_reviews(reviews, seed=0, progress=None):
+    """Отзывы: пары (товар, пользователь) уникальны, как требует unique_together"""
+    from accounts.models import User
+    from .models import Product, Review
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    product_ids = _ids(Product)
+    user_ids = _ids(User)
+    if len(product_ids) * len(user_ids) < reviews:
+        raise ValueError('Недостаточно пар товар/пользователь для отзывов')
+    with explicit_timestamps(Review, 'created_at', 'updated_at'):
+        for start, end in _batches(reviews):
+            batch = []
+            for i in range(start, end):
+                created = _spread(rng, now, 1000)
+                batch.append(Review(
+                    product_id=product_ids[i % len(product_ids)],
+                    user_id=user_ids[i // len(product_ids)],
+                    rating=rng.randint(1, 5),
+                    title=f'Отзыв {i}',
+                    text='Отличный самокат, хватает заряда на всю неделю поездок.',
+                    is_approved=rng.random() < 0.8,
+                    created_at=created,
+                    updated_at=created,
+                ))
+            Review.objects.bulk_create(batch)
+            if progress:
+                progress('reviews', end, reviews)
+
+
+def populate_images(per_product=3, seed=0, progress=None):
+    """Изображения товаров (только пути, файлов нет); первое — главное"""
+    from .models import Product, ProductImage
+
+    product_ids = _ids(Product)
+    total = len(product_ids) * per_product
+    for start, end in _batches(total):
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product_id=product_ids[i // per_product],
+                image=f'products/scooter-{i // per_product}-{i % per_product}.jpg',
+                is_main=i % per_product == 0,
+                order=i % per_product,
+            )
+            for i in range(start, end)
+        ])
+        if progress:
+            progress('images', end, total)
+
+
+def populate_orders(orders, items_per_order=3, days=1095, seed=0, progress=None):
+    """Заказы с позициями, равномерно распределённые по последним days дням"""
+    from accounts.models import User
+    from cart.models import Order, OrderItem
+    from cart.snapshots import product_snapshots
+    from .models import Product
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    products = list(Product.objects.order_by('id').values_list('id', 'price'))
+    snapshots = product_snapshots()
+    user_ids = _ids(User)
+    statuses = [code for code, _ in Order.STATUS_CHOICES]
+    # Отдельный генератор: промокоды не сдвигают остальные случайные данные
+    promo_rng = random.Random(seed + 1)
+    with explicit_timestamps(Order, 'created_at', 'updated_at'):
+        for start, end in _batches(orders, BATCH_SIZE // items_per_order or 1):
+            batch = []
+            lines = []
+            for i in range(start, end):
+                created = _spread(rng, now, days)
+                picked = [rng.choice(products) for _ in range(items_per_order)]
+                quantities = [rng.randint(1, 2) for _ in picked]
+                total = sum(price * qty for (_, price), qty in zip(picked, quantities))
+                promo_code, percent = promo_rng.choice(PROMO_CODES) if promo_rng.random() < 0.1 else ('', 0)
+                discount = total * percent // 100
+                batch.append(Order(
+                    user_id=rng.choice(user_ids),
+                    order_number=f'ORD-{i:08d}',
+                    status=rng.choice(statuses),
+                    first_name='Иван',
+                    last_name='Петров',
+                    phone=f'+7901{i:07d}',
+                    email=f'order{i}@example.com',
+                    city='Москва',
+                    address='ул. Тверская, 1',
+                    total_amount=total - discount,
+                    discount=discount,
+                    promo_code=promo_code,
+                    created_at=created,
+                    updated_at=created,
+                ))
+                lines.append(list(zip(picked, quantities)))
+            created_orders = Order.objects.bulk_create(batch)
+            OrderItem.objects.bulk_create([
+                OrderItem(order_id=order.id, product_id=product_id, quantity=qty, price=price, **snapshots[product_id])
+                for order, order_lines in zip(created_orders, lines)
+                for (product_id, price), qty in order_lines
+            ])
+            if progress:
+                progress('orders', end, orders)
+
+
+def populate_carts(carts, items_per_cart=2, seed=0, progress=None):
+    """Анонимные корзины с позициями"""
+    from cart.models import Cart, CartItem
+    from .models import Product
+
+    rng = random.Random(seed)
+    product_ids = _ids(Product)
+    for start, end in _batches(carts, BATCH_SIZE // items_per_cart or 1):
+        created_carts = Cart.objects.bulk_create([
+            Cart(session_id=f'session{i:032d}') for i in range(start, end)
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart_id=cart.id, product_id=product_id, quantity=rng.randint(1, 3))
+            for cart in created_carts
+            for product_id in rng.sample(product_ids, min(items_per_cart, len(product_ids)))
+        ])
+        if progress:
+            progress('carts', end, carts)
+
+
+def populate_tickets(tickets, seed=0, progress=None):
+    """Обращения в поддержку от случайных пользователей"""
+    from accounts.models import SupportTicket, User
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    user_ids = _ids(User)
+    statuses = [code for code, _ in SupportTicket.STATUS_CHOICES]
+    with explicit_timestamps(SupportTicket, 'created_at', 'updated_at'):
+        for start, end in _batches(tickets):
+            batch = []
+            for i in range(start, end):
+                created = _spread(rng, now, 1000)
+                batch.append(SupportTicket(
+                    user_id=rng.choice(user_ids),
+                    ticket_number=f'TCK-{i:08d}',
+                    subject=f'Обращение {i}',
+                    message='Не заряжается батарея после поездки под дождём.',
+                    status=rng.choice(statuses),
+                    created_at=created,
+                    updated_at=created,
+                ))
+            SupportTicket.objects.bulk_create(batch)
+            if progress:
+                progress('tickets', end, tickets)
@@ -0,0 +1,10 @@
+"""Фоновые задачи магазина; регистрируются при запуске (tasks.apps)"""
+from tasks.queue import task
+
+from . import ranges
+
+
+@task(name='shop.warm_filter_stats', priority=-5)
+def warm_filter_stats():
+    """Статистика фильтров всех областей каталога (см. manage.py warm_filter_stats)"""
+    ranges.warm()
@@ -1,3 +1,30 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from monitoring import plans
+from scootermall import caching
+from shop import synthetic
+
+
+# Свой кеш: дерево категорий и карточки — из тестовой базы, а не из рабочего кеша
+@override_settings(
+    CACHES={'default': {'BACKEND': 'monitoring.cache.InstrumentedLocMemCache', 'LOCATION': 'query-plans'}},
+    CATALOG_SNAPSHOT_ENABLED=False,
+)
+class QueryPlanTests(TestCase):
+    """Горячие запросы читают индекс, а не всю таблицу (monitoring/plans.py)"""
+    # Без replica: она только читает, а TestCase открывает в каждой базе транзакцию на запись
+    databases = {'default', 'sessions', 'carts', 'tasks'}
+
+    @classmethod
+    def setUpTestData(cls):
+        plans.populate(3000)
+        synthetic.analyze()
+
+    def setUp(self):
+        caching.clear_local()
+
+    def test_hot_queries_use_indexes(self):
+        for title, queryset, index in plans.queries():
+            with self.subTest(title):
+                problems, plan = plans.check(queryset, index)
+                self.assertEqual(problems, [], '\n'.join(plan))
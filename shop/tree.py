@@ -0,0 +1,124 @@
+"""
+Дерево категорий для меню, хлебных крошек и страниц каталога.
+
+CategoryTree собирается двумя запросами (все категории по порядку и число
+доступных товаров в каждой) и целиком кешируется (catalog.category_tree()),
+поэтому меню в шапке, список категорий и страница категории обходятся без
+запросов к Category. В число товаров узла входят товары всех активных
+подкатегорий — столько же, сколько покажет страница категории.
+"""
+from django.db.models import Count
+from django.urls import reverse
+
+from .models import Category, Product
+
+NODE_FIELDS = ('id', 'name', 'slug', 'image', 'parent_id', 'path', 'depth', 'is_active')
+
+
+class CategoryNode:
+    """Категория в дереве: поля для вывода, дети и число товаров поддерева"""
+    __slots__ = NODE_FIELDS + ('parent', 'children', 'own_count', 'product_count')
+
+    def __init__(self, **row):
+        for name in NODE_FIELDS:
+            setattr(self, name, row[name])
+        self.parent = None
+        self.children = []
+        self.own_count = 0
+        self.product_count = 0
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<CategoryNode {self.path} {self.name}>'
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_absolute_url(self):
+        return reverse('shop:category_detail', kwargs={'category_slug': self.slug})
+
+    @property
+    def image_url(self):
+        if not self.image:
+            return ''
+        return Category._meta.get_field('image').storage.url(self.image)
+
+    @property
+    def active_children(self):
+        return [child for child in self.children if child.is_active]
+
+    def ancestors(self, include_self=False):
+        """Предки от корня — для хлебных крошек"""
+        chain = [self] if include_self else []
+        node = self.parent
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        chain.reverse()
+        return chain
+
+    def walk(self):
+        """Узел и его активные потомки в порядке вывода"""
+        yield self
+        for child in self.active_children:
+            yield from child.walk()
+
+    def subtree_ids(self):
+        """id категорий, товары которых показывает страница этого узла"""
+        return [node.id for node in self.walk()]
+
+
+class CategoryTree:
+    """Все категории: узлы по id и slug, корни в порядке вывода"""
+
+    def __init__(self, nodes, counts=()):
+        self.nodes = {node.id: node for node in nodes}
+        self.slugs = {node.slug: node for node in nodes}
+        self.all_roots = []
+        for node in nodes:
+            parent = self.nodes.get(node.parent_id)
+            if parent is None:
+                self.all_roots.append(node)
+            else:
+                node.parent = parent
+                parent.children.append(node)
+        for category_id, count in counts:
+            if category_id in self.nodes:
+                self.nodes[category_id].own_count = count
+        for root in self.all_roots:
+            self._count(root)
+
+    def _count(self, node):
+        node.product_count = node.own_count
+        for child in node.children:
+            count = self._count(child)
+            if child.is_active:
+                node.product_count += count
+        return node.product_count
+
+    @property
+    def roots(self):
+        """Активные корневые категории — меню и список категорий"""
+        return [node for node in self.all_roots if node.is_active]
+
+    def get(self, slug):
+        return self.slugs.get(slug)
+
+    def node(self, pk):
+        return self.nodes.get(pk)
+
+    def __iter__(self):
+        for root in self.roots:
+            yield from root.walk()
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+def build_tree():
+    rows = Category.objects.order_by('depth', 'order', 'name').values(*NODE_FIELDS)
+    counts = Product.objects.filter(is_available=True).values_list('category_id').annotate(Count('id')).order_by()
+    return CategoryTree([CategoryNode(**row) for row in rows], counts)
@@ -23,6 +23,10 @@ urlpatterns = [
     # Поиск
     path('search/ajax/', views.search_ajax, name='search_ajax'),
     
+    # Подбор самоката
+    path('finder/', views.FinderView.as_view(), name='finder'),
+    path('finder/api/', views.finder_api, name='finder_api'),
+    
     # Статические страницы
     path('sales/', views.SalesView.as_view(), name='sales'),
     path('delivery/', views.DeliveryView.as_view(), name='delivery'),
@@ -31,4 +35,6 @@ urlpatterns = [
     path('compare/add/<int:product_id>/', views.add_to_compare, name='add_to_compare'),
     path('compare/remove/<int:product_id>/', views.remove_from_compare, name='remove_from_compare'),
     path('orders/', views.OrdersView.as_view(), name='orders'),
+    path('orders/<slug:order_number>/', views.OrderDetailView.as_view(), name='order_detail'),
+    path('orders/<slug:order_number>/status/', views.order_status_api, name='order_status_api'),
 ]
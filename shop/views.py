@@ -1,12 +1,20 @@
+from decimal import Decimal
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Avg
+from django.db.models import F, Q, Avg
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
-from .models import Product, Category, Brand, Banner, Review
-from .forms import ReviewForm, ProductFilterForm
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from monitoring import metrics
+from . import catalog, finder, ranges, snapshot
+from .cards import product_cards
+from .models import Product, ProductImage, Category, Brand, Review
+from .forms import FinderForm, ReviewForm, ProductFilterForm
 
 
 class HomeView(TemplateView):
@@ -15,22 +23,51 @@ class HomeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['banners'] = Banner.objects.filter(is_active=True)[:3]
-        context['featured_products'] = Product.objects.filter(
+        context['banners'] = catalog.active_banners()
+        context['featured_products'] = product_cards(Product.objects.filter(
             is_available=True, is_featured=True
-        ).select_related('brand')[:8]
-        context['new_products'] = Product.objects.filter(
+        ))[:8]
+        context['new_products'] = product_cards(Product.objects.filter(
             is_available=True, is_new=True
-        ).select_related('brand')[:8]
+        ))[:8]
         context['top_rated'] = Product.objects.filter(
             is_available=True
         ).annotate(
             avg_rating=Avg('reviews__rating')
         ).filter(avg_rating__gte=4).select_related('brand')[:4]
-        context['brands'] = Brand.objects.filter(is_active=True)[:8]
+        context['brands'] = catalog.active_brands()[:8]
         return context
 
 
+# Пределы INTEGER в SQLite: число длиннее не передать параметром запроса
+_INT_LIMIT = 2 ** 63 - 1
+
+
+def _filter_value(field, value):
+    """Значение фильтра из адреса, приведённое к типу поля товара; None — пустое или некорректное"""
+    try:
+        value = Product._meta.get_field(field).to_python(value.strip())
+    except ValidationError:
+        return None
+    if isinstance(value, Decimal):
+        return value if value.is_finite() else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return max(-_INT_LIMIT, min(value, _INT_LIMIT))
+    return value
+
+
+def _filter_values(field, values):
+    return [value for value in (_filter_value(field, value) for value in values) if value is not None]
+
+
+def _ancestors(category):
+    """Предки категории для хлебных крошек, по возможности из дерева в кеше"""
+    node = catalog.category_tree().node(category.pk)
+    if node is not None:
+        return node.ancestors()
+    return list(category.get_ancestors())
+
+
 class ProductListView(ListView):
     """Список товаров с фильтрами"""
     model = Product
@@ -39,7 +76,7 @@ class ProductListView(ListView):
     paginate_by = 12
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_available=True).select_related('brand', 'category')
+        queryset = Product.objects.filter(is_available=True)
         
         # Поиск
         search = self.request.GET.get('search')
@@ -54,8 +91,14 @@ class ProductListView(ListView):
         # Фильтр по категории
         category_slug = self.kwargs.get('category_slug')
         if category_slug:
-            category = get_object_or_404(Category, slug=category_slug)
-            queryset = queryset.filter(category=category)
+            # Страница категории показывает и товары всех её подкатегорий
+            category = catalog.category_tree().get(category_slug)
+            if category is not None:
+                queryset = queryset.filter(category_id__in=category.subtree_ids())
+            else:
+                # Категория новее закешированного дерева: поддерево по пути одним подзапросом
+                category = get_object_or_404(Category, slug=category_slug)
+                queryset = queryset.filter(category__in=category.get_descendants(include_self=True))
             self.category = category
         
         # Фильтр по бренду
@@ -65,39 +108,31 @@ class ProductListView(ListView):
             queryset = queryset.filter(brand=brand)
             self.brand = brand
         
-        # Фильтр по цене
-        price_min = self.request.GET.get('price_min')
-        price_max = self.request.GET.get('price_max')
-        if price_min:
-            queryset = queryset.filter(price__gte=price_min)
-        if price_max:
-            queryset = queryset.filter(price__lte=price_max)
+        # Диапазоны характеристик: <поле>_min / <поле>_max (см. shop/ranges.py)
+        for field in ranges.RANGE_FIELDS:
+            # Некорректное значение (?price_min=abc) фильтр не задаёт
+            value_min = _filter_value(field, self.request.GET.get(f'{field}_min', ''))
+            value_max = _filter_value(field, self.request.GET.get(f'{field}_max', ''))
+            if value_min is not None:
+                queryset = queryset.filter(**{f'{field}__gte': value_min})
+            if value_max is not None:
+                queryset = queryset.filter(**{f'{field}__lte': value_max})
         
         # Фильтр по брендам (множественный)
-        brands = self.request.GET.getlist('brand')
+        brands = _filter_values('brand_id', self.request.GET.getlist('brand'))
         if brands:
             queryset = queryset.filter(brand__id__in=brands)
         
-        # Фильтр по мощности
-        motor_power_min = self.request.GET.get('motor_power_min')
-        if motor_power_min:
-            queryset = queryset.filter(motor_power__gte=motor_power_min)
-        
-        # Фильтр по скорости
-        max_speed_min = self.request.GET.get('max_speed_min')
-        if max_speed_min:
-            queryset = queryset.filter(max_speed__gte=max_speed_min)
-        
-        # Фильтр по запасу хода
-        max_range_min = self.request.GET.get('max_range_min')
-        if max_range_min:
-            queryset = queryset.filter(max_range__gte=max_range_min)
-        
         # Фильтр по размеру колёс
-        wheel_sizes = self.request.GET.getlist('wheel_size')
+        wheel_sizes = _filter_values('wheel_size', self.request.GET.getlist('wheel_size'))
         if wheel_sizes:
             queryset = queryset.filter(wheel_size__in=wheel_sizes)
         
+        # Фильтр по степени защиты
+        waterproof = self.request.GET.getlist('waterproof_rating')
+        if waterproof:
+            queryset = queryset.filter(waterproof_rating__in=waterproof)
+        
         # Фильтр по приложению
         has_app = self.request.GET.get('has_app')
         if has_app:
@@ -115,28 +150,44 @@ class ProductListView(ListView):
             'price_desc': '-price',
             'name_asc': 'name',
             'name_desc': '-name',
-            'rating': '-reviews__rating',
             'newest': '-created_at',
         }
-        queryset = queryset.order_by(sort_options.get(sort, '-created_at'))
-        
-        return queryset.distinct()
+        queryset = product_cards(queryset)
+        if sort == 'rating':
+            # Рейтинг уже посчитан для карточки: без JOIN с отзывами и DISTINCT
+            return queryset.order_by(F('rating').desc(nulls_last=True), '-created_at')
+        return queryset.order_by(sort_options.get(sort, '-created_at'))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True, parent=None)
-        context['brands'] = Brand.objects.filter(is_active=True)
+        context['brands'] = catalog.active_brands()
         context['filter_form'] = ProductFilterForm(self.request.GET or None)
         context['filter_form'].fields['brand'].choices = [
-            (b.id, b.name) for b in Brand.objects.filter(is_active=True)
+            (b.id, b.name) for b in context['brands']
         ]
         
-        # Размеры колёс для фильтра
-        context['wheel_sizes'] = ['8', '8.5', '10', '11', '12']
+        # Границы слайдеров, гистограммы и значения для фильтров — из кеша
+        if hasattr(self, 'category'):
+            stats = ranges.for_category(self.category)
+        elif hasattr(self, 'brand'):
+            stats = ranges.for_brand(self.brand.pk)
+        else:
+            stats = ranges.for_catalog()
+        context['filter_stats'] = stats
+        context['range_filters'] = [
+            (item, self.request.GET.get(f'{item.field}_min', ''), self.request.GET.get(f'{item.field}_max', ''))
+            for item in stats.ranges if item
+        ]
+        context['filter_form'].fields['wheel_size'].choices = [
+            (size, f'{size}"') for size, _ in stats.wheel_sizes
+        ]
+        context['selected_wheel_sizes'] = self.request.GET.getlist('wheel_size')
+        context['selected_waterproof'] = self.request.GET.getlist('waterproof_rating')
         
         # Добавляем выбранную категорию/бренд в контекст
         if hasattr(self, 'category'):
             context['current_category'] = self.category
+            context['category_ancestors'] = _ancestors(self.category)
         if hasattr(self, 'brand'):
             context['current_brand'] = self.brand
         
@@ -160,12 +211,14 @@ class ProductDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         product = self.get_object()
+        metrics.funnel('product_view')
+        context['category_ancestors'] = _ancestors(product.category)
         
         # Похожие товары
-        context['related_products'] = Product.objects.filter(
+        context['related_products'] = product_cards(Product.objects.filter(
             category=product.category,
             is_available=True
-        ).exclude(id=product.id).select_related('brand')[:4]
+        ).exclude(id=product.id))[:4]
         
         # Отзывы
         context['reviews'] = product.reviews.filter(is_approved=True).select_related('user')
@@ -228,10 +281,7 @@ class BrandDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        brand = self.get_object()
-        context['products'] = Product.objects.filter(
-            brand=brand, is_available=True
-        ).select_related('category')[:12]
+        context['products'] = catalog.brand_cards(self.object)
         return context
 
 
@@ -242,7 +292,8 @@ class CategoryListView(ListView):
     context_object_name = 'categories'
 
     def get_queryset(self):
-        return Category.objects.filter(is_active=True, parent=None).prefetch_related('children')
+        # Всё дерево с числом товаров в каждом узле — из кеша, без запросов
+        return catalog.category_tree().roots
 
 
 def search_ajax(request):
@@ -250,7 +301,19 @@ def search_ajax(request):
     query = request.GET.get('q', '')
     results = []
     
-    if len(query) >= 2:
+    catalog_snapshot = snapshot.current()
+    if len(query) >= 2 and catalog_snapshot is not None:
+        # Без обращения к базе: поиск по снимку каталога в общей памяти
+        storage = ProductImage._meta.get_field('image').storage
+        for row in catalog_snapshot.search(query, limit=5):
+            image = catalog_snapshot.text('image', row)
+            results.append({
+                'name': catalog_snapshot.text('title', row),
+                'slug': catalog_snapshot.text('slug', row),
+                'price': catalog_snapshot.value('price', row),
+                'image': storage.url(image) if image else None,
+            })
+    elif len(query) >= 2:
         products = Product.objects.filter(
             Q(name__icontains=query) |
             Q(brand__name__icontains=query)
@@ -272,13 +335,56 @@ class SalesView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['sale_products'] = Product.objects.filter(
+        context['sale_products'] = product_cards(Product.objects.filter(
             is_available=True,
             old_price__isnull=False
-        ).select_related('brand')[:20]
+        ))[:20]
         return context
 
 
+def _find(request):
+    """Форма подбора и ранжированные карточки [(карточка, оценка, разбор)]"""
+    form = FinderForm(request.GET or None)
+    if request.GET and not form.is_valid():
+        return form, None, []
+    query = form.get_query() if form.is_bound else {}
+    result = finder.find(**query)
+    cards = {card.id: card for card in product_cards(Product.objects.filter(pk__in=[pk for pk, _, _ in result.items]))}
+    items = [(cards[pk], score, explanation) for pk, score, explanation in result.items if pk in cards]
+    return form, result, items
+
+
+class FinderView(TemplateView):
+    """Подбор самоката по требованиям"""
+    template_name = 'shop/finder.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form'], context['result'], context['items'] = _find(self.request)
+        return context
+
+
+def finder_api(request):
+    """Подбор самоката: JSON с оценкой и разбором по каждому критерию"""
+    form, result, items = _find(request)
+    if result is None:
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse({
+        'matched': result.matched,
+        'total': result.total,
+        'elapsed_ms': round(result.elapsed_ms, 2),
+        'results': [{
+            'id': card.id,
+            'name': str(card),
+            'url': card.get_absolute_url(),
+            'price': card.price,
+            'image': card.image_url or None,
+            'score': score,
+            'criteria': [criterion.as_dict() for criterion in explanation],
+        } for card, score, explanation in items],
+    })
+
+
 class DeliveryView(TemplateView):
     """Страница доставки"""
     template_name = 'shop/delivery.html'
@@ -332,11 +438,51 @@ def remove_from_compare(request, product_id):
     return redirect('shop:compare')
 
 
-class OrdersView(LoginRequiredMixin, ListView):
-    """Страница моих заказов"""
+class OrdersView(LoginRequiredMixin, TemplateView):
+    """Страница моих заказов: keyset-страницы из кеша (cart/history.py)"""
     template_name = 'shop/orders.html'
-    context_object_name = 'orders'
-    
+
+    def get_context_data(self, **kwargs):
+        from cart import history
+
+        context = super().get_context_data(**kwargs)
+        if 'before' in self.request.GET:
+            page = history.page(self.request.user.pk, self.request.GET['before'], 'newer')
+        else:
+            page = history.page(self.request.user.pk, self.request.GET.get('after'))
+        context['page'] = page
+        context['orders'] = page.orders
+        return context
+
+
+class OrderDetailView(LoginRequiredMixin, DetailView):
+    """Заказ покупателя: позиции из снимков и история статусов"""
+    template_name = 'shop/order_detail.html'
+    context_object_name = 'order'
+    slug_field = 'order_number'
+    slug_url_kwarg = 'order_number'
+
     def get_queryset(self):
         from cart.models import Order
-        return Order.objects.filter(user=self.request.user).prefetch_related('items__product')
+        return Order.objects.filter(user=self.request.user).prefetch_related('items', 'status_history')
+
+
+def order_status_api(request, order_number):
+    """
+    Статус заказа для опроса: JSON с историей и ETag. Повтор запроса
+    с If-None-Match неизменившегося заказа получает 304 из кеша.
+    """
+    from cart import history
+
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Требуется авторизация'}, status=401)
+    data = history.status(request.user.pk, order_number)
+    if data is None:
+        return JsonResponse({'error': 'Заказ не найден'}, status=404)
+    response = get_conditional_response(request, etag=data['etag'])
+    if response is None:
+        response = HttpResponse(data['body'], content_type='application/json')
+    response['ETag'] = data['etag']
+    # Ответ личный; клиент каждый раз сверяет ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,38 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from . import queue
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'priority', 'attempts_display', 'run_at', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key']
+    readonly_fields = [
+        'name', 'args', 'kwargs', 'priority', 'dedupe_key', 'status', 'attempts', 'max_attempts',
+        'run_at', 'locked_by', 'locked_until', 'last_error', 'created_at', 'started_at', 'finished_at',
+    ]
+    actions = ['retry_tasks', 'cancel_tasks']
+
+    @admin.display(description='Попытки')
+    def attempts_display(self, obj):
+        return f'{obj.attempts}/{obj.max_attempts}'
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry_tasks(self, request, queryset):
+        retried = queue.retry(queryset)
+        self.message_user(request, f'Возвращено в очередь задач: {retried}', messages.SUCCESS)
+
+    @admin.action(description='Отменить ожидающие задачи')
+    def cancel_tasks(self, request, queryset):
+        cancelled = queryset.filter(status='queued').update(status='cancelled', finished_at=timezone.now())
+        self.message_user(request, f'Отменено задач: {cancelled}', messages.SUCCESS)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'queue_stats': queue.stats()}
+        return super().changelist_view(request, extra_context)
@@ -0,0 +1,92 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import queue
+from tasks.models import Task
+from tasks.worker import Worker
+
+
+def _run_worker(options):
+    worker = Worker(
+        threads=options['threads'], poll_interval=options['poll_interval'],
+        names=options['queue'], burst=options['burst'],
+    )
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: worker.stop())
+    return worker.run()
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает обработчики фоновых задач (tasks/queue.py): пул потоков, '
+        'при --processes больше 1 — в нескольких процессах. SIGTERM/SIGINT '
+        'дожидаются текущих задач'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Потоков в процессе')
+        parser.add_argument('--processes', type=int, default=1, help='Процессов-обработчиков')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Пауза, с, когда готовых задач нет (TASKS_POLL_INTERVAL)')
+        parser.add_argument('--queue', action='append', default=None, metavar='NAME',
+                            help='Выполнять только эти задачи; можно указать несколько раз')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать состояние очереди и выйти')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.show_stats()
+            return
+
+        registered = ', '.join(sorted(queue.registry)) or 'нет'
+        self.stdout.write(f'Задачи: {registered}')
+        started = time.perf_counter()
+        if options['processes'] <= 1:
+            processed = _run_worker(options)
+            self.stdout.write(
+                f'Выполнено задач: {processed}, {time.perf_counter() - started:.1f} с'
+            )
+            return
+
+        # Дочерние процессы откроют свои соединения
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=_run_worker, args=(options,), name=f'task-worker-{index}')
+            for index in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, forward)
+
+        for child in children:
+            child.join()
+        self.stdout.write(f'Обработчики остановлены, {time.perf_counter() - started:.1f} с')
+
+    def show_stats(self):
+        stats = queue.stats()
+        labels = dict(Task.STATUS_CHOICES)
+        for status, count in stats['by_status'].items():
+            self.stdout.write(f'{labels[status]:<14}{count:>8}')
+        self.stdout.write(
+            f'Готовы к запуску: {stats["ready"]}, отложены: {stats["scheduled"]}, '
+            f'ожидание старейшей: {stats["oldest_wait"]:.0f} с, ошибок за сутки: {stats["failed_day"]}'
+        )
+        for row in stats['by_name']:
+            style = self.style.ERROR if row['failed'] else str
+            self.stdout.write(style(
+                f'  {row["name"]:<40} в очереди {row["queued"]:>6} готовы {row["ready"]:>6} '
+                f'выполняются {row["running"]:>4} ошибок {row["failed"]:>4}'
+            ))
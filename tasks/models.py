@@ -0,0 +1,51 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+
+
+class Task(models.Model):
+    """Задача в очереди (tasks/queue.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+        ('cancelled', 'Отменена'),
+    ]
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField('Именованные аргументы', default=dict, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField('Приоритет', default=0, help_text='Больше — раньше')
+    dedupe_key = models.CharField(
+        'Ключ дедупликации', max_length=200, null=True, blank=True,
+        help_text='В очереди не бывает двух задач с одинаковым ключом'
+    )
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Макс. попыток', default=3)
+    run_at = models.DateTimeField('Выполнить после')
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    locked_until = models.DateTimeField('Занята до', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    started_at = models.DateTimeField('Начата', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ['-created_at']
+        indexes = [
+            # Выбор следующей задачи: статус, приоритет, время запуска
+            models.Index(fields=['status', '-priority', 'run_at'], name='task_queue_idx'),
+            models.Index(fields=['status', 'finished_at'], name='task_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=Q(status='queued'), name='task_queued_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,349 @@
+"""
+Очередь фоновых задач без внешнего брокера.
+
+Задачи хранятся в таблице tasks.Task; DATABASE_ROUTING держит её
+в отдельном файле SQLite (tasks.sqlite3), поэтому постановка задачи
+и её захват не делят блокировку записи с заказами и каталогом.
+
+    @task(priority=5, max_attempts=5)
+    def send_order_email(order_id):
+        ...
+
+    send_order_email.delay(order.pk)
+    send_order_email.enqueue(args=[order.pk], dedupe_key=f'order-email:{order.pk}', countdown=60)
+
+Внутри транзакции основной базы задача ставится после её коммита —
+обработчик не увидит заказ, которого ещё нет. Ключ дедупликации
+сливает повторные постановки, пока задача ждёт в очереди. Аргументы
+сохраняются в JSON, поэтому передаются id, а не объекты моделей.
+
+Обработчик (manage.py run_workers, tasks/worker.py) захватывает задачу
+условным UPDATE: из нескольких обработчиков строку получит один.
+Захват — это аренда на lease секунд; если процесс упал, по истечении
+аренды задача возвращается в очередь. Задача, которая может работать
+дольше lease, продлевает аренду вызовами renew() по ходу работы.
+Ошибка ставит задачу на повтор с экспоненциальной паузой, после
+max_attempts попыток она остаётся в статусе failed с текстом
+исключения — её видно в админке — и вызывается её on_failure.
+"""
+import json
+import logging
+import random
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, router, transaction
+from django.db.models import Count, F, Min, Q
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from monitoring import metrics
+
+from .models import Task
+
+logger = logging.getLogger('tasks')
+
+# Имя задачи -> TaskFunction
+registry = {}
+
+# Выполняемая в этом потоке задача: (pk, обработчик, lease, время продления)
+_current = ContextVar('tasks_current', default=None)
+
+
+class TaskFunction:
+    """Функция, зарегистрированная декоратором @task"""
+
+    def __init__(self, func, name, priority, max_attempts, backoff, lease, on_failure=None):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.on_failure = on_failure
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+
+    def __repr__(self):
+        return f'<TaskFunction {self.name}>'
+
+    def __call__(self, *args, **kwargs):
+        # Прямой вызов выполняет функцию синхронно
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args=args, kwargs=kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, dedupe_key=None, countdown=0):
+        """Ставит задачу в очередь; в транзакции default — после коммита"""
+        return enqueue(
+            self.name, args, kwargs,
+            priority=self.priority if priority is None else priority,
+            dedupe_key=dedupe_key, countdown=countdown, max_attempts=self.max_attempts,
+        )
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=None, backoff=None, lease=None, on_failure=None):
+    """
+    Регистрирует функцию как фоновую задачу.
+
+    name — имя в очереди (по умолчанию модуль.функция); priority — больше
+    выполняется раньше; backoff — пауза перед первым повтором, с;
+    lease — сколько секунд задача может выполняться, прежде чем её
+    отдадут другому обработчику (см. renew); on_failure(error, *args,
+    **kwargs) вызывается, когда задача окончательно завершилась ошибкой,
+    в том числе по истечении аренды.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        wrapper = TaskFunction(
+            func, task_name, priority,
+            max_attempts or settings.TASKS_MAX_ATTEMPTS,
+            settings.TASKS_RETRY_BACKOFF if backoff is None else backoff,
+            lease or settings.TASKS_LEASE_SECONDS, on_failure,
+        )
+        registry[task_name] = wrapper
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def _database():
+    return router.db_for_write(Task)
+
+
+def _json(value):
+    # Те же значения, что получит обработчик после чтения из базы
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def enqueue(name, args=(), kwargs=None, priority=0, dedupe_key=None, countdown=0, max_attempts=None):
+    """
+    Ставит задачу name в очередь.
+
+    Возвращает Task (существующую, если ключ дедупликации уже в очереди)
+    или None, если постановка отложена до коммита транзакции default.
+    """
+    if name not in registry:
+        raise ValueError(f'Неизвестная задача: {name}')
+    args, kwargs = _json(list(args)), _json(kwargs or {})
+
+    def insert():
+        if settings.TASKS_EAGER:
+            registry[name].func(*args, **kwargs)
+            return None
+        run_at = timezone.now() + timedelta(seconds=countdown)
+        alias = _database()
+        try:
+            with transaction.atomic(using=alias):
+                created = Task.objects.using(alias).create(
+                    name=name, args=args, kwargs=kwargs, priority=priority, dedupe_key=dedupe_key,
+                    max_attempts=max_attempts or registry[name].max_attempts, run_at=run_at,
+                )
+        except IntegrityError:
+            if dedupe_key is None:
+                raise
+            existing = Task.objects.using(alias).filter(status='queued', dedupe_key=dedupe_key).first()
+            if existing is None:
+                # Задачу с этим ключом только что забрал обработчик — ставим заново
+                return insert()
+            # Повторная постановка может только ускорить ждущую задачу
+            Task.objects.using(alias).filter(pk=existing.pk, status='queued').update(
+                priority=Greatest(F('priority'), priority), run_at=Least(F('run_at'), run_at),
+            )
+            metrics.TASKS.inc(name, 'deduplicated')
+            return existing
+        metrics.TASKS.inc(name, 'enqueued')
+        return created
+
+    if transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block:
+        transaction.on_commit(insert, using=DEFAULT_DB_ALIAS)
+        return None
+    return insert()
+
+
+def claim(worker_id, names=None):
+    """
+    Захватывает следующую готовую задачу: сначала больший приоритет,
+    затем более ранний run_at. Возвращает Task или None, если ждать нечего.
+    """
+    alias = _database()
+    while True:
+        now = timezone.now()
+        queued = Task.objects.using(alias).filter(status='queued', run_at__lte=now)
+        if names:
+            queued = queued.filter(name__in=names)
+        candidate = queued.order_by('-priority', 'run_at', 'pk').values_list('pk', 'name').first()
+        if candidate is None:
+            return None
+        pk, name = candidate
+        lease = registry[name].lease if name in registry else settings.TASKS_LEASE_SECONDS
+        # Условный UPDATE: из конкурирующих обработчиков строку получит один
+        claimed = Task.objects.using(alias).filter(pk=pk, status='queued').update(
+            status='running', attempts=F('attempts') + 1, locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease), started_at=now,
+        )
+        if claimed:
+            return Task.objects.using(alias).get(pk=pk)
+
+
+def _retry_delay(task_function, attempts):
+    backoff = task_function.backoff if task_function else settings.TASKS_RETRY_BACKOFF
+    delay = min(backoff * 2 ** (attempts - 1), settings.TASKS_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _fail(job, worker_id, error, task_function=None):
+    """Повтор с паузой или окончательная ошибка после max_attempts"""
+    alias = _database()
+    owned = Task.objects.using(alias).filter(pk=job.pk, status='running', locked_by=worker_id)
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        run_at = now + timedelta(seconds=_retry_delay(task_function, job.attempts))
+        try:
+            with transaction.atomic(using=alias):
+                retried = owned.update(
+                    status='queued', run_at=run_at, locked_by='', locked_until=None, last_error=error,
+                )
+        except IntegrityError:
+            # В очереди уже ждёт такая же задача — повтор не нужен
+            owned.update(status='cancelled', finished_at=now, locked_until=None, last_error=error)
+            return 'cancelled'
+        if retried:
+            return 'retry'
+    if owned.update(status='failed', finished_at=now, locked_until=None, last_error=error):
+        _failed(job, error, task_function)
+    return 'failed'
+
+
+def _failed(job, error, task_function):
+    if task_function is None or task_function.on_failure is None:
+        return
+    try:
+        task_function.on_failure(error, *job.args, **job.kwargs)
+    except Exception:
+        logger.exception('on_failure задачи %s #%s завершился ошибкой', job.name, job.pk)
+
+
+def renew():
+    """
+    Продлевает аренду выполняемой в этом потоке задачи ещё на lease секунд.
+
+    Вызывается из долгой задачи по ходу работы (например, после каждой
+    пачки); пишет в базу не чаще раза в треть lease. Возвращает False,
+    если аренду уже забрали (задачу вернул в очередь recover) — работу
+    стоит прервать. Вне обработчика ничего не делает.
+    """
+    current = _current.get()
+    if current is None:
+        return True
+    pk, worker_id, lease, renewed = current
+    if time.monotonic() - renewed < lease / 3:
+        return True
+    held = Task.objects.using(_database()).filter(pk=pk, status='running', locked_by=worker_id).update(
+        locked_until=timezone.now() + timedelta(seconds=lease),
+    )
+    _current.set((pk, worker_id, lease, time.monotonic()))
+    return bool(held)
+
+
+def execute(job, worker_id):
+    """Выполняет захваченную задачу и записывает результат; возвращает итог"""
+    task_function = registry.get(job.name)
+    started = time.perf_counter()
+    if task_function is None:
+        job.max_attempts = job.attempts
+        result = _fail(job, worker_id, f'Задача {job.name} не зарегистрирована')
+    else:
+        token = _current.set((job.pk, worker_id, task_function.lease, time.monotonic()))
+        try:
+            task_function.func(*job.args, **job.kwargs)
+        except Exception:
+            logger.exception('Задача %s #%s завершилась ошибкой', job.name, job.pk)
+            result = _fail(job, worker_id, traceback.format_exc(), task_function)
+        else:
+            Task.objects.using(_database()).filter(pk=job.pk, locked_by=worker_id).update(
+                status='done', finished_at=timezone.now(), locked_until=None,
+            )
+            result = 'done'
+        finally:
+            _current.reset(token)
+    metrics.TASKS.inc(job.name, result)
+    metrics.TASK_DURATION.observe(time.perf_counter() - started, job.name)
+    return result
+
+
+def recover():
+    """
+    Возвращает в очередь задачи с истёкшей арендой (обработчик упал
+    или завис); исчерпавшие попытки помечаются ошибкой. Возвращает число задач.
+    """
+    alias = _database()
+    now = timezone.now()
+    expired = Task.objects.using(alias).filter(status='running', locked_until__lt=now)
+    recovered = 0
+    for job in expired:
+        _fail(
+            job, job.locked_by, f'Аренда истекла: обработчик {job.locked_by} не завершил задачу',
+            registry.get(job.name),
+        )
+        recovered += 1
+    return recovered
+
+
+def purge(days=None):
+    """Удаляет выполненные и отменённые задачи старше TASKS_KEEP_DONE_DAYS"""
+    days = settings.TASKS_KEEP_DONE_DAYS if days is None else days
+    deleted, _ = Task.objects.using(_database()).filter(
+        status__in=['done', 'cancelled'], finished_at__lt=timezone.now() - timedelta(days=days),
+    ).delete()
+    return deleted
+
+
+def retry(queryset):
+    """Возвращает задачи с ошибкой в очередь с новым запасом попыток"""
+    retried = 0
+    for pk in queryset.filter(status__in=['failed', 'cancelled']).values_list('pk', flat=True):
+        try:
+            with transaction.atomic(using=queryset.db):
+                retried += Task.objects.using(queryset.db).filter(pk=pk).update(
+                    status='queued', attempts=0, run_at=timezone.now(), finished_at=None, locked_by='',
+                )
+        except IntegrityError:
+            # Задача с тем же ключом уже ждёт в очереди
+            continue
+    return retried
+
+
+def stats():
+    """Глубина очереди и ошибки для админки и run_workers --stats"""
+    alias = _database()
+    now = timezone.now()
+    by_status = dict(Task.objects.using(alias).values_list('status').annotate(Count('pk')).order_by())
+    queued = Task.objects.using(alias).filter(status='queued')
+    oldest = queued.filter(run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+    day_ago = now - timedelta(days=1)
+    by_name = (
+        Task.objects.using(alias).filter(Q(status='queued') | Q(status='running') | Q(status='failed', finished_at__gte=day_ago))
+        .values('name').order_by('name')
+        .annotate(
+            queued=Count('pk', filter=Q(status='queued')),
+            ready=Count('pk', filter=Q(status='queued', run_at__lte=now)),
+            running=Count('pk', filter=Q(status='running')),
+            failed=Count('pk', filter=Q(status='failed')),
+        )
+    )
+    return {
+        'by_status': {status: by_status.get(status, 0) for status, _ in Task.STATUS_CHOICES},
+        'ready': queued.filter(run_at__lte=now).count(),
+        'scheduled': queued.filter(run_at__gt=now).count(),
+        'oldest_wait': (now - oldest).total_seconds() if oldest else 0,
+        'failed_day': Task.objects.using(alias).filter(status='failed', finished_at__gte=day_ago).count(),
+        'by_name': list(by_name),
+    }
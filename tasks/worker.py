@@ -0,0 +1,88 @@
+"""
+Обработчик очереди задач: пул потоков в одном процессе.
+
+Каждый поток в цикле захватывает задачу (queue.claim), выполняет её
+и, когда готовых задач нет, ждёт poll_interval секунд. Главный поток
+раз в TASKS_MAINTENANCE_INTERVAL секунд возвращает в очередь задачи
+упавших обработчиков и удаляет старые выполненные. stop() дожидается
+текущих задач: новые уже не захватываются.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from monitoring import metrics
+
+from . import queue
+
+logger = logging.getLogger('tasks')
+
+
+class Worker:
+    def __init__(self, threads=1, poll_interval=None, names=None, burst=False):
+        self.threads = threads
+        self.poll_interval = settings.TASKS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.names = names
+        # burst: выполнить готовые задачи и завершиться
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+        self.maintenance()
+        pool = [
+            threading.Thread(target=self.loop, args=(f'{self.name}:{index}',), name=f'task-worker-{index}')
+            for index in range(self.threads)
+        ]
+        for thread in pool:
+            thread.start()
+        last_maintenance = time.monotonic()
+        while any(thread.is_alive() for thread in pool):
+            self.stopping.wait(1.0)
+            if time.monotonic() - last_maintenance >= settings.TASKS_MAINTENANCE_INTERVAL:
+                self.maintenance()
+                last_maintenance = time.monotonic()
+            metrics.REGISTRY.maybe_flush()
+        for thread in pool:
+            thread.join()
+        connections.close_all()
+        return self.processed
+
+    def loop(self, worker_id):
+        try:
+            while not self.stopping.is_set():
+                # Как между запросами: закрыть устаревшие и сломанные соединения
+                close_old_connections()
+                job = queue.claim(worker_id, self.names)
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                result = queue.execute(job, worker_id)
+                logger.info('%s #%s: %s', job.name, job.pk, result)
+                with self._lock:
+                    self.processed += 1
+        finally:
+            connections.close_all()
+
+    def maintenance(self):
+        try:
+            recovered = queue.recover()
+            purged = queue.purge()
+        except Exception:
+            logger.exception('Обслуживание очереди задач не удалось')
+            return
+        if recovered or purged:
+            logger.info('Возвращено в очередь: %s, удалено выполненных: %s', recovered, purged)
+        close_old_connections()